@@ -19,7 +19,7 @@ from rich.text import Text
 
 import asf_tools
 from asf_tools.io.data_management import DataTypeMode
-from asf_tools.io.storage_interface import InterfaceType, StorageInterface
+from asf_tools.io.storage_interface import SCAN_CACHE_TTL, InterfaceType, StorageInterface
 
 
 # Set up logging as the root logger
@@ -204,6 +204,48 @@ def pipeline(ctx):
     default=None,
     help="Set the version of Nextflow to use in the sbatch header",
 )
+@click.option(
+    "--api_cache",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Persistent Clarity API cache file shared between invocations. Omit to bypass the cache.",
+)
+@click.option(
+    "--refresh_api_cache",
+    is_flag=True,
+    default=False,
+    help="Invalidate the persistent Clarity API cache before running",
+)
+@click.option(
+    "--profile_api",
+    is_flag=True,
+    default=False,
+    help="Print a per endpoint summary of Clarity API requests when finished",
+)
+@click.option(
+    "--profile_api_output",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Export the Clarity API request profile as JSON to this file",
+)
+@click.option(
+    "--run_workers",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of runs to process concurrently",
+)
+@click.option(
+    "--record_api",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Record the Clarity API traffic of this invocation to a replay archive",
+)
+@click.option(
+    "--replay_api",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="Answer Clarity API requests from a replay archive instead of the LIMS",
+)
 def gen_demux_run(ctx,  # pylint: disable=W0613 disable=too-many-positional-arguments
                       source_dir,
                       target_dir,
@@ -216,18 +258,58 @@ def gen_demux_run(ctx,  # pylint: disable=W0613 disable=too-many-positional-argu
                       use_api,
                       contains,
                       samplesheet_only,
-                      nextflow_version):
+                      nextflow_version,
+                      api_cache,
+                      refresh_api_cache,
+                      profile_api,
+                      profile_api_output,
+                      run_workers,
+                      record_api,
+                      replay_api):
     """
     Create run directory for the ONT demux pipeline
     """
     # from nf_core.modules import ModuleInstall
+    from asf_tools.api.clarity.cache import DEFAULT_MEMORY_TTL, ChainedCache, DiskResponseCache, ResponseCache  # pylint: disable=C0415
     from asf_tools.api.clarity.clarity_helper_lims import ClarityHelperLims  # pylint: disable=C0415
+    from asf_tools.api.clarity.profiler import ApiProfiler  # pylint: disable=C0415
+    from asf_tools.api.clarity.replay import TrafficArchive  # pylint: disable=C0415
+    from asf_tools.api.clarity.retry import CircuitBreaker, RetryPolicy  # pylint: disable=C0415
     from asf_tools.io.data_management import DataManagement  # pylint: disable=C0415
     from asf_tools.nextflow.gen_demux_run import run_cli  # pylint: disable=C0415
 
+    if record_api is not None and replay_api is not None:
+        raise click.UsageError("--record_api and --replay_api cannot be used together")
+    if api_cache is not None and (record_api is not None or replay_api is not None):
+        # Disk cache hits would bypass the recording and the replay archive
+        raise click.UsageError("--api_cache cannot be used with --record_api or --replay_api")
+    if refresh_api_cache and api_cache is None:
+        raise click.UsageError("--refresh_api_cache requires --api_cache")
+
+    profiler = None
+    archive = None
     try:
-        api = ClarityHelperLims()
-        storage_interface = StorageInterface(InterfaceType.LOCAL)
+        # Share one response cache and entity cache across all runs processed in this invocation, expiring
+        # responses so that LIMS changes made while a long invocation runs are picked up
+        cache = ResponseCache(ttl=DEFAULT_MEMORY_TTL)
+        if api_cache is not None:
+            disk_cache = DiskResponseCache(api_cache)
+            if refresh_api_cache:
+                disk_cache.clear()
+            cache = ChainedCache(cache, disk_cache)
+        # Retry transient LIMS failures so that one dropped request does not fail a run, and stop
+        # requesting once the LIMS is clearly down
+        api = ClarityHelperLims(cache=cache, entity_cache={}, retry=RetryPolicy(max_attempts=4), circuit_breaker=CircuitBreaker())
+        if replay_api is not None:
+            archive = TrafficArchive(replay_api)
+            archive.replay(api)
+        elif record_api is not None:
+            archive = TrafficArchive(record_api)
+            archive.record(api)
+        if profile_api or profile_api_output is not None:
+            profiler = ApiProfiler()
+            profiler.attach(api)
+        storage_interface = StorageInterface(InterfaceType.LOCAL, cache_ttl=SCAN_CACHE_TTL)
         data_management = DataManagement(storage_interface)
         exit_status = run_cli(
             api,
@@ -245,6 +327,7 @@ def gen_demux_run(ctx,  # pylint: disable=W0613 disable=too-many-positional-argu
             container_cache,
             pipeline_dir,
             runs_dir,
+            run_workers,
         )
 
         if not exit_status:
@@ -252,6 +335,14 @@ def gen_demux_run(ctx,  # pylint: disable=W0613 disable=too-many-positional-argu
     except (UserWarning, LookupError) as e:
         log.error(e)
         sys.exit(1)
+    finally:
+        if profiler is not None:
+            if profile_api:
+                profiler.print_summary(stderr)
+            if profile_api_output is not None:
+                profiler.to_json(profile_api_output)
+        if record_api is not None and archive is not None:
+            archive.save()
 
 # asf-tools ont deliver-to-targets
 @pipeline.command("deliver-to-targets")
@@ -296,7 +387,7 @@ def deliver_to_targets(
     """  # pylint: disable=too-many-positional-arguments
     from asf_tools.io.data_management import DataManagement  # pylint: disable=C0415
 
-    dm = DataManagement(StorageInterface(InterfaceType.LOCAL))
+    dm = DataManagement(StorageInterface(InterfaceType.LOCAL, cache_ttl=SCAN_CACHE_TTL))
     if interactive is False:
         # Take the source / target literally and deliver
         dm.deliver_to_targets(
@@ -411,7 +502,7 @@ def scan_run_state(  # pylint: disable=too-many-positional-arguments
     from asf_tools.io.data_management import DataManagement  # pylint: disable=C0415
 
     # Scan for run id states
-    dm = DataManagement(StorageInterface(InterfaceType.LOCAL))
+    dm = DataManagement(StorageInterface(InterfaceType.LOCAL, cache_ttl=SCAN_CACHE_TTL))
     scan_result = dm.scan_run_state(
         raw_dir,
         run_dir,
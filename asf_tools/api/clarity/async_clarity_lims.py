@@ -0,0 +1,191 @@
+"""
+Asyncio interface to the Clarity API
+"""
+
+import asyncio
+import threading
+import weakref
+from typing import Dict, Optional
+
+from asf_tools.api.clarity.clarity_lims import ClarityLims
+from asf_tools.api.clarity.models import ClarityBaseModel
+
+
+class AsyncClarityLims:
+    """
+    Asyncio interface to the Clarity API with the same request surface as ClarityLims.
+
+    Requests are delegated to a ClarityLims client and run on worker threads, so they share its pooled
+    session, response cache, retry policy and circuit breaker. A semaphore limits the number of requests
+    in flight, which lets callers gather hundreds of independent lookups without overloading the LIMS.
+    The get_* helpers accept a list of ids as search_id and look them up concurrently.
+    """
+
+    def __init__(self, client: Optional[ClarityLims] = None, max_concurrency: int = 16, **kwargs):
+        """
+        Args:
+            client (Optional[ClarityLims]): The client requests are delegated to. Created from kwargs if not given.
+            max_concurrency (int): Maximum number of requests in flight.
+            **kwargs: Arguments used to create the ClarityLims client.
+        """
+        self.client = ClarityLims(**kwargs) if client is None else client
+        self.max_concurrency = max_concurrency
+        self.semaphores = weakref.WeakKeyDictionary()
+        self.lock = threading.Lock()
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Run a blocking client call on a worker thread once a concurrency slot is free.
+
+        Args:
+            func (Callable): The client method to call.
+            *args: Positional arguments for the call.
+            **kwargs: Keyword arguments for the call.
+
+        Returns:
+            The result of the call.
+        """
+        # A semaphore is bound to the event loop it is used in, so each loop gets its own
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            semaphore = self.semaphores.get(loop)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(self.max_concurrency)
+                self.semaphores[loop] = semaphore
+
+        async with semaphore:
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+    async def get_with_uri(self, uri: str, params: Optional[Dict[str, str]] = None, accept_status_codes=[200]) -> bytes:
+        """
+        Perform a GET request to a specified URI with optional query parameters.
+        """
+        return await self.run(self.client.get_with_uri, uri, params, accept_status_codes)
+
+    async def get(self, endpoint: str, params: Optional[Dict[str, str]] = None, accept_status_codes=[200]) -> bytes:
+        """
+        Perform a GET request to a specified API endpoint with optional query parameters.
+        """
+        return await self.run(self.client.get, endpoint, params, accept_status_codes)
+
+    async def get_instances(
+        self,
+        outer_key: str,
+        inner_key: str,
+        model_type: ClarityBaseModel,
+        endpoint: str,
+        params: Optional[Dict[str, str]] = None,
+        accept_status_codes=[200],
+    ) -> list[ClarityBaseModel]:
+        """
+        Retrieve all pages of instances of a model type from an API endpoint.
+        """
+        return await self.run(self.client.get_instances, outer_key, inner_key, model_type, endpoint, params, accept_status_codes)
+
+    async def expand_stub(self, stub: ClarityBaseModel, expansion_type: ClarityBaseModel = ClarityBaseModel) -> ClarityBaseModel:
+        """
+        Expand a stub instance to a full instance by retrieving additional data from the API.
+        """
+        return await self.run(self.client.expand_stub, stub, expansion_type)
+
+    async def expand_stubs(
+        self, stubs: list[ClarityBaseModel], expansion_type: ClarityBaseModel = ClarityBaseModel, batch_size: Optional[int] = None
+    ) -> list[ClarityBaseModel]:
+        """
+        Expand a list of stub instances concurrently, in batch requests where the expansion type supports it.
+
+        Args:
+            stubs (list[ClarityBaseModel]): The stub instances to expand.
+            expansion_type (ClarityBaseModel): The model type to instantiate for the expanded data.
+            batch_size (Optional[int]): Number of stubs per batch request. Defaults to the client batch_size.
+
+        Returns:
+            list[ClarityBaseModel]: The expanded instances in the order of the input stubs.
+        """
+        size = self.client.batch_size if batch_size is None else batch_size
+        if size and expansion_type.__name__ in self.client.BATCH_EXP_KEY:
+            batches = [stubs[i : i + size] for i in range(0, len(stubs), size)]
+            results = await asyncio.gather(*(self.run(self.client.batch_retrieve, batch, expansion_type) for batch in batches))
+            return [instance for batch in results for instance in batch]
+
+        return list(await asyncio.gather(*(self.expand_stub(stub, expansion_type) for stub in stubs)))
+
+    async def lookup(self, func, *args, **kwargs):
+        """
+        Run a get_* client call, gathering one call per id when search_id is a list of ids.
+
+        Args:
+            func (Callable): The get_* client method to call.
+            *args: Positional arguments for the call, starting with search_id.
+            **kwargs: Keyword arguments for the call.
+
+        Returns:
+            The result of the call, or a list of the results in the order of the ids.
+        """
+        if args:
+            search_id, args = args[0], args[1:]
+        else:
+            search_id = kwargs.pop("search_id", None)
+        if isinstance(search_id, (list, tuple)):
+            return list(await asyncio.gather(*(self.run(func, item_id, *args, **kwargs) for item_id in search_id)))
+        return await self.run(func, search_id, *args, **kwargs)
+
+    async def get_labs(self, *args, **kwargs):
+        """
+        Retrieve lab instances, see ClarityLims.get_labs.
+        """
+        return await self.lookup(self.client.get_labs, *args, **kwargs)
+
+    async def get_researchers(self, *args, **kwargs):
+        """
+        Retrieve researcher instances, see ClarityLims.get_researchers.
+        """
+        return await self.lookup(self.client.get_researchers, *args, **kwargs)
+
+    async def get_projects(self, *args, **kwargs):
+        """
+        Retrieve project instances, see ClarityLims.get_projects.
+        """
+        return await self.lookup(self.client.get_projects, *args, **kwargs)
+
+    async def get_containers(self, *args, **kwargs):
+        """
+        Retrieve container instances, see ClarityLims.get_containers.
+        """
+        return await self.lookup(self.client.get_containers, *args, **kwargs)
+
+    async def get_artifacts(self, *args, **kwargs):
+        """
+        Retrieve artifact instances, see ClarityLims.get_artifacts.
+        """
+        return await self.lookup(self.client.get_artifacts, *args, **kwargs)
+
+    async def get_samples(self, *args, **kwargs):
+        """
+        Retrieve sample instances, see ClarityLims.get_samples.
+        """
+        return await self.lookup(self.client.get_samples, *args, **kwargs)
+
+    async def get_processes(self, *args, **kwargs):
+        """
+        Retrieve process instances, see ClarityLims.get_processes.
+        """
+        return await self.lookup(self.client.get_processes, *args, **kwargs)
+
+    async def get_workflows(self, *args, **kwargs):
+        """
+        Retrieve workflow instances, see ClarityLims.get_workflows.
+        """
+        return await self.lookup(self.client.get_workflows, *args, **kwargs)
+
+    async def get_protocols(self, *args, **kwargs):
+        """
+        Retrieve protocol instances, see ClarityLims.get_protocols.
+        """
+        return await self.lookup(self.client.get_protocols, *args, **kwargs)
+
+    async def get_queues(self, *args, **kwargs):
+        """
+        Retrieve queue instances, see ClarityLims.get_queues.
+        """
+        return await self.lookup(self.client.get_queues, *args, **kwargs)
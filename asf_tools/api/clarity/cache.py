@@ -0,0 +1,300 @@
+"""
+Response caches for the Clarity API client
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Optional
+from urllib.parse import urlencode, urlparse
+
+
+# Default time to live in seconds for slow changing entity types in the persistent cache
+DEFAULT_DISK_TTLS = {
+    "configuration/workflows": 86400,
+    "configuration/protocols": 86400,
+    "reagenttypes": 86400,
+    "labs": 3600,
+    "researchers": 3600,
+}
+
+# Default time to live in seconds for the in-memory cache shared by the runs of one CLI invocation
+DEFAULT_MEMORY_TTL = 60
+
+
+def cache_key(uri: str, params: Optional[Dict[str, str]] = None) -> str:
+    """
+    Build the cache key for a request from its URI and query parameters.
+
+    Args:
+        uri (str): The request URI.
+        params (Optional[Dict[str, str]]): Optional dictionary of query parameters.
+
+    Returns:
+        str: The full request URI including the encoded query parameters.
+    """
+    if params:
+        return uri + "?" + urlencode(params)
+    return uri
+
+
+def endpoint_category(uri: str) -> str:
+    """
+    Get the entity type of a request from its URI, e.g. labs, samples or configuration/workflows.
+
+    Args:
+        uri (str): The request URI or cache key.
+
+    Returns:
+        str: The endpoint category.
+    """
+    path = urlparse(uri).path
+    if "/api/" in path:
+        path = path.split("/api/", 1)[1].split("/", 1)[-1]
+    parts = [part for part in path.split("/") if part]
+    if not parts:
+        return ""
+    if parts[0] == "configuration" and len(parts) > 1:
+        return "/".join(parts[:2])
+    return parts[0]
+
+
+class ResponseCache:
+    """
+    Thread safe in-memory LRU cache of raw API responses with an optional time to live.
+
+    Any object exposing the same get, set and clear methods can be passed to ClarityLims
+    as a cache backend.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: Optional[float] = None):
+        """
+        Args:
+            max_entries (int): Maximum number of responses held before the least recently used is evicted.
+            ttl (Optional[float]): Seconds a response stays valid. None keeps responses until evicted.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Get a response from the cache.
+
+        Args:
+            key (str): The request key.
+
+        Returns:
+            Optional[bytes]: The cached response or None if missing or expired.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: bytes):
+        """
+        Store a response in the cache, evicting the least recently used entries if full.
+
+        Args:
+            key (str): The request key.
+            value (bytes): The response content.
+        """
+        with self.lock:
+            self.entries[key] = (time.monotonic(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove all responses from the cache.
+        """
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Return the cache counters.
+
+        Returns:
+            dict: The number of hits, misses and held entries.
+        """
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
+
+
+class DiskResponseCache:
+    """
+    Persistent SQLite cache of compressed API responses shared across CLI invocations.
+
+    Each entity type (see endpoint_category) has its own time to live; responses for types
+    without a positive time to live are not stored. A new connection is opened per operation
+    and the database runs in WAL mode so that threads and concurrent processes can share it.
+    """
+
+    def __init__(self, path: str, ttls: Optional[Dict[str, float]] = None, default_ttl: float = 0, max_entries: int = 50000):
+        """
+        Args:
+            path (str): Path of the SQLite database file.
+            ttls (Optional[Dict[str, float]]): Time to live in seconds per entity type. Defaults to DEFAULT_DISK_TTLS.
+            default_ttl (float): Time to live for entity types not in ttls. 0 disables caching for them.
+            max_entries (int): Maximum number of responses held before the oldest are evicted.
+        """
+        self.path = path
+        self.ttls = DEFAULT_DISK_TTLS if ttls is None else ttls
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        # Create database
+        parent_dir = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent_dir, exist_ok=True)
+        with self.connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, category TEXT, created REAL, data BLOB)")
+            connection.execute("CREATE INDEX IF NOT EXISTS responses_created ON responses (created)")
+
+    @contextmanager
+    def connect(self):
+        """
+        Open a connection to the cache database, committing and closing it on exit.
+        """
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def ttl(self, category: str) -> float:
+        """
+        Get the time to live of an entity type.
+        """
+        return self.ttls.get(category, self.default_ttl)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Get a response from the cache.
+
+        Args:
+            key (str): The request key.
+
+        Returns:
+            Optional[bytes]: The cached response or None if missing or expired.
+        """
+        with self.connect() as connection:
+            row = connection.execute("SELECT category, created, data FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and time.time() - row[1] > self.ttl(row[0]):
+                connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return zlib.decompress(row[2])
+
+    def set(self, key: str, value: bytes):
+        """
+        Store a response if its entity type is cacheable, evicting the oldest entries if full.
+
+        Args:
+            key (str): The request key.
+            value (bytes): The response content.
+        """
+        category = endpoint_category(key)
+        if self.ttl(category) <= 0:
+            return
+        with self.connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses (key, category, created, data) VALUES (?, ?, ?, ?)",
+                (key, category, time.time(), zlib.compress(value)),
+            )
+            connection.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self, category: Optional[str] = None):
+        """
+        Remove responses from the cache.
+
+        Args:
+            category (Optional[str]): Only remove responses of this entity type.
+        """
+        with self.connect() as connection:
+            if category is None:
+                connection.execute("DELETE FROM responses")
+            else:
+                connection.execute("DELETE FROM responses WHERE category = ?", (category,))
+
+    def stats(self) -> dict:
+        """
+        Return the cache counters.
+
+        Returns:
+            dict: The number of hits, misses and held entries.
+        """
+        with self.connect() as connection:
+            entries = connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+
+class ChainedCache:
+    """
+    Combine caches so that lookups try each in order, e.g. in-memory first and then on disk.
+
+    A hit in a later cache is copied into the earlier ones and new responses are offered to all.
+    """
+
+    def __init__(self, *caches):
+        self.caches = caches
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Get a response from the first cache that holds it.
+        """
+        for index, cache in enumerate(self.caches):
+            value = cache.get(key)
+            if value is not None:
+                for earlier_cache in self.caches[:index]:
+                    earlier_cache.set(key, value)
+                return value
+        return None
+
+    def set(self, key: str, value: bytes):
+        """
+        Store a response in all caches.
+        """
+        for cache in self.caches:
+            cache.set(key, value)
+
+    def clear(self):
+        """
+        Remove all responses from all caches.
+        """
+        for cache in self.caches:
+            cache.clear()
+
+    def stats(self) -> dict:
+        """
+        Return the counters of each cache.
+        """
+        return {type(cache).__name__: cache.stats() for cache in self.caches}
@@ -3,14 +3,17 @@ Clarity API Child class with helper functions
 """
 
 import logging
-import queue
 import re
+import time
+from collections.abc import MutableMapping
+from typing import Optional
 
-import xmltodict
 from requests.exceptions import HTTPError
 
 from asf_tools.api.clarity.clarity_lims import ClarityLims
-from asf_tools.api.clarity.models import Artifact, Lab, Process, Sample
+from asf_tools.api.clarity.models import Artifact, ClarityBaseModel, Lab, Process, Project, Researcher, Sample, Stub
+from asf_tools.api.clarity.reagent_type_index import ReagentTypeIndex
+from asf_tools.api.clarity.run_graph import EntityCache, RunGraph
 
 
 log = logging.getLogger(__name__)
@@ -35,6 +38,31 @@ class ClarityHelperLims(ClarityLims):
             Collect detailed information for all samples associated with a given run ID.
     """
 
+    def __init__(self, *args, reagent_type_ttl: Optional[float] = 86400, entity_cache: Optional[dict] = None, **kwargs):
+        """
+        Args:
+            reagent_type_ttl (Optional[float]): Seconds a resolved reagent type barcode is kept in memory.
+                None keeps them for the lifetime of the client.
+            entity_cache (Optional[MutableMapping]): Identity map shared by the run graphs loaded by this client.
+                None gives every run graph its own.
+        """
+        super().__init__(*args, **kwargs)
+        self.entity_cache = entity_cache
+        self.reagent_types = ReagentTypeIndex(self, ttl=reagent_type_ttl)
+
+    @property
+    def entity_cache(self) -> Optional[EntityCache]:
+        """
+        The identity map shared by the run graphs loaded by this client, or None.
+
+        A mapping that is set is wrapped in an EntityCache, so run graphs loaded concurrently share one lock.
+        """
+        return self._entity_cache
+
+    @entity_cache.setter
+    def entity_cache(self, entity_cache: Optional[MutableMapping]):
+        self._entity_cache = entity_cache if entity_cache is None or isinstance(entity_cache, EntityCache) else EntityCache(entity_cache)
+
     def get_artifacts_from_runid(self, run_id: str) -> list:
         """
         Retrieve a list of artifacts associated with a given run ID.
@@ -65,7 +93,7 @@ class ClarityHelperLims(ClarityLims):
         run_artifacts = run_containers.placements
         return run_artifacts
 
-    def get_lane_from_runid(self, run_id: str) -> dict:
+    def get_lane_from_runid(self, run_id: str, graph: Optional[RunGraph] = None, max_workers: Optional[int] = None) -> dict:
         """
         Retrieve a dictionary mapping artifact URIs to lane information for a given run ID.
 
@@ -77,6 +105,10 @@ class ClarityHelperLims(ClarityLims):
         Args:
             run_id (str): The unique identifier for the run whose artifact placements
                         are to be retrieved.
+            graph (Optional[RunGraph]): Run graph to read the run objects from. Only the container and pool
+                artifacts are loaded if not given.
+            max_workers (Optional[int]): Maximum number of concurrent pool artifact requests when loading.
+                Defaults to the client setting.
 
         Returns:
             dict: A dictionary where each key is an artifact URI, and the value is
@@ -87,33 +119,30 @@ class ClarityHelperLims(ClarityLims):
             ValueError: If the provided run_id is None or empty.
             KeyError: If the specified run_id does not exist in the Clarity system.
         """
-        if run_id is None:
-            raise ValueError("run_id is None")
+        if graph is None:
+            graph = self.load_run_graph(run_id, include_submitters=False, include_samples=False, max_workers=max_workers)
+        return self.build_lane_map(run_id, graph.container.placements, graph.pools)
 
-        # Check that the run ID exists in clarity
-        run_containers = self.get_containers(name=run_id)
-        if run_containers is None:
-            raise KeyError("run_id does not exist")
+    def build_lane_map(self, run_id: str, placements: list, pools: list) -> dict:
+        """
+        Map the lanes of a run to their pool artifact and sample ids.
+
+        The sample ids are taken from the sample stubs of the pool artifacts, so no sample is expanded.
+
+        Args:
+            run_id (str): The unique identifier for the run.
+            placements (list): The placements of the run container.
+            pools (list): The expanded pool artifacts in placement order.
 
-        placement_list = run_containers.placements
+        Returns:
+            dict: The artifact URI, lane and sample ids keyed by run id and lane.
+        """
         lane_artifacts = {}
         # Extract lane value, its corresponding samples and assign them to the corresponding artifact
-        for entry in placement_list:
+        for entry, artifact in zip(placements, pools):
             lane = entry.value.split(":")[0]
             name = run_id + "_" + str(lane)
-            lane_artifacts[name] = {"artifact_uri": entry.uri, "lane": lane, "samples": []}
-
-            # Extract sample limsid for each artifact
-            artifact = self.expand_stub(entry, expansion_type=Artifact)
-            sample_stubs = artifact.samples
-            samples = self.expand_stubs(sample_stubs, expansion_type=Sample)
-
-            sample_list = []
-            for entry in samples:
-                ids = entry.id
-                sample_list.append(ids if ids else None)
-
-            lane_artifacts[name]["samples"] = sample_list
+            lane_artifacts[name] = {"artifact_uri": entry.uri, "lane": lane, "samples": [stub.id if stub.id else None for stub in artifact.samples]}
         return lane_artifacts
 
     def get_samples_from_artifacts(self, artifacts_list: list) -> list:
@@ -178,20 +207,188 @@ class ClarityHelperLims(ClarityLims):
         try:
             # Expand sample stub
             sample = self.get_samples(search_id=sample_id)
-
-            dropoff_sample_info = {}
-            # Check if the sample has a drop-off field and return values if it does
-            for entry in sample.udf_fields:
-                entry_name = entry.name
-                entry_value = entry.value
-
-                if "Drop-Off" in entry_name:
-                    dropoff_sample_info[entry_name] = entry_value
-            return dropoff_sample_info
+            return self.get_dropoff_info(sample)
         except HTTPError:
             raise ValueError("Sample not found")
 
-    def get_sample_info(self, sample: str) -> dict:
+    def get_dropoff_info(self, sample: Sample) -> dict:
+        """
+        Extract the drop-off UDF fields of an expanded sample.
+
+        Args:
+            sample (Sample): The expanded sample.
+
+        Returns:
+            dict: The names and values of the sample UDF fields containing "Drop-Off".
+        """
+        dropoff_sample_info = {}
+        # Check if the sample has a drop-off field and return values if it does
+        for entry_name, entry_value in sample.udfs.items():
+            if "Drop-Off" in entry_name:
+                dropoff_sample_info[entry_name] = entry_value
+        return dropoff_sample_info
+
+    def expand_stubs_with_graph(self, graph: RunGraph, stubs: list, expansion_type: ClarityBaseModel, max_workers: Optional[int] = None) -> list:
+        """
+        Expand stubs through a run graph, fetching only those not already in it.
+
+        The missing stubs are expanded together with expand_stubs, so they use the client
+        concurrency and batch settings.
+
+        Args:
+            graph (RunGraph): The run graph to read from and add to.
+            stubs (list): The stub instances to expand.
+            expansion_type (ClarityBaseModel): The model type to instantiate for the expanded data.
+            max_workers (Optional[int]): Maximum number of concurrent requests. Defaults to the client setting.
+
+        Returns:
+            list: The expanded instances in the order of the input stubs.
+        """
+        missing = list({stub.id: stub for stub in stubs if (expansion_type.__name__, stub.id) not in graph}.values())
+        if missing:
+            for stub, instance in zip(missing, self.expand_stubs(missing, expansion_type=expansion_type, max_workers=max_workers)):
+                graph.add(expansion_type, stub.id, instance)
+        return [graph.get(expansion_type, stub.id) for stub in stubs]
+
+    def load_run_graph(
+        self, run_id: str, include_submitters: bool = True, include_samples: bool = True, max_workers: Optional[int] = None
+    ) -> RunGraph:
+        """
+        Fetch the Clarity objects of a run once into a run graph.
+
+        The run container and its pool artifacts are always loaded, and with include_samples their samples.
+        With include_submitters the projects of the samples, the submitting researchers of samples without drop-off information and
+        their labs are loaded as well. Independent lookups are run through map_requests so they follow the
+        client concurrency setting.
+
+        Args:
+            run_id (str): The unique identifier for the run.
+            include_submitters (bool): Also load the projects, researchers and labs used by get_sample_info.
+                Implies include_samples.
+            include_samples (bool): Also load the samples of the pool artifacts.
+            max_workers (Optional[int]): Maximum number of concurrent pool artifact requests. Defaults to the
+                client setting.
+
+        Returns:
+            RunGraph: The loaded run graph.
+
+        Raises:
+            ValueError: If the provided run_id is None.
+            KeyError: If the specified run_id does not exist in the Clarity system.
+            TypeError: If the samples of a pool artifact are not a list.
+        """
+        if run_id is None:
+            raise ValueError("run_id is None")
+
+        # Check that the run ID exists in clarity
+        run_container = self.get_containers(name=run_id)
+        if run_container is None:
+            raise KeyError("run_id does not exist")
+        graph = RunGraph(run_id, run_container, self.entity_cache)
+
+        # Pool artifacts in placement order
+        graph.pools = self.expand_stubs_with_graph(graph, run_container.placements, Artifact, max_workers)
+
+        # Unique samples in order of first appearance
+        sample_stubs = []
+        for pool in graph.pools:
+            if not isinstance(pool.samples, list):
+                raise TypeError("run_samples should be a list of sample objects")
+            sample_stubs.extend(pool.samples)
+        graph.sample_ids = list(dict.fromkeys(stub.id for stub in sample_stubs))
+        if not include_samples and not include_submitters:
+            return graph
+
+        samples = self.expand_stubs_with_graph(graph, sample_stubs, Sample)
+        if include_submitters:
+            self.load_sample_submitters(graph, samples)
+        return graph
+
+    def load_sample_submitters(self, graph: RunGraph, samples: list):
+        """
+        Load the projects, submitting researchers and labs of samples into a graph.
+
+        Each project, researcher and lab is fetched once however many samples share it, and only
+        those not already in the graph are requested.
+
+        Args:
+            graph (RunGraph): The graph to read from and add to.
+            samples (list): The expanded sample instances.
+        """
+        # Projects
+        project_ids = list(dict.fromkeys(sample.project.id for sample in samples if sample.project))
+        project_ids = [project_id for project_id in project_ids if (Project.__name__, project_id) not in graph]
+        projects = self.map_requests(lambda project_id: self.get_or_none(self.get_projects, project_id), project_ids, self.max_workers)
+        for project_id, project in zip(project_ids, projects):
+            if project is not None:
+                graph.add(Project, project_id, project)
+
+        # Submitting researchers of samples without drop-off information. Projects and researchers that
+        # could not be fetched are not stored, so get_sample_info looks them up again itself.
+        researcher_ids = []
+        for sample in samples:
+            if not self.get_dropoff_info(sample):
+                submitter = sample.submitter
+                if sample.project:
+                    key = (Project.__name__, sample.project.id)
+                    submitter = graph.get(Project, sample.project.id).researcher if key in graph else None
+                if submitter is not None:
+                    researcher_ids.append(submitter.id)
+        researcher_ids = [researcher_id for researcher_id in dict.fromkeys(researcher_ids) if (Researcher.__name__, researcher_id) not in graph]
+        researchers = self.map_requests(lambda researcher_id: self.get_or_none(self.get_researchers, researcher_id), researcher_ids, self.max_workers)
+        researchers = [(researcher_id, researcher) for researcher_id, researcher in zip(researcher_ids, researchers) if researcher is not None]
+        for researcher_id, researcher in researchers:
+            graph.add(Researcher, researcher_id, researcher)
+
+        # Labs
+        self.expand_stubs_with_graph(graph, [researcher.lab for _, researcher in researchers if researcher.lab is not None], Lab)
+
+    @staticmethod
+    def get_or_none(getter, search_id: str):
+        """
+        Look up an entity by id, returning None instead of raising if it is not found.
+
+        Args:
+            getter (Callable): The lookup method, such as get_projects.
+            search_id (str): The id of the entity.
+
+        Returns:
+            ClarityBaseModel: The entity, or None if the lookup failed.
+        """
+        try:
+            return getter(search_id=search_id)
+        except HTTPError as e:
+            log.warning(f"{search_id} not found: {e}")
+            return None
+
+    def get_sample_info_bulk(self, sample_ids: list, graph: Optional[RunGraph] = None) -> dict:
+        """
+        Retrieve detailed information for many samples at once.
+
+        The samples are expanded together and their projects, researchers and labs are fetched once
+        per unique id, so the number of requests grows with the number of projects rather than samples.
+
+        Args:
+            sample_ids (list): The unique identifiers of the samples.
+            graph (Optional[RunGraph]): Graph used to look up and store the fetched objects.
+
+        Returns:
+            dict: Detailed information keyed by sample id, as returned by collect_sample_info_from_runid.
+        """
+        if graph is None:
+            graph = RunGraph()
+
+        sample_ids = list(dict.fromkeys(sample_id for sample_id in sample_ids if sample_id is not None))
+        stubs = [Stub(uri=f"{self.construct_uri('samples')}/{sample_id}", limsid=sample_id) for sample_id in sample_ids]
+        samples = self.expand_stubs_with_graph(graph, stubs, Sample)
+        self.load_sample_submitters(graph, samples)
+
+        sample_info = {}
+        for sample_id in sample_ids:
+            sample_info.update(self.get_sample_info(sample_id, graph))
+        return sample_info
+
+    def get_sample_info(self, sample: str, graph: Optional[RunGraph] = None) -> dict:
         """
         Retrieve detailed information for a given sample.
 
@@ -201,6 +398,7 @@ class ClarityHelperLims(ClarityLims):
 
         Args:
             sample (str): The unique identifier for the sample whose information is to be retrieved.
+            graph (Optional[RunGraph]): Run graph used to look up and store the sample, project, researcher and lab.
 
         Returns:
             dict: A dictionary containing detailed information about the sample, including:
@@ -219,22 +417,25 @@ class ClarityHelperLims(ClarityLims):
         """
         if sample is None:
             return None
+        if graph is None:
+            graph = RunGraph()
 
         # Expand sample stub and get name which is the ASF sample id
-        sample = self.get_samples(search_id=sample)
+        search_id = sample
+        sample = graph.get(Sample, search_id, lambda: self.get_samples(search_id=search_id))
         sample_id = sample.id
         sample_name = sample.name
 
         # Extract project wide info
         sample_project = sample.project
         if sample_project:
-            project = self.get_projects(search_id=sample.project.id)
+            project = graph.get(Project, sample_project.id, lambda: self.get_projects(search_id=sample_project.id))
             project_name = project.name
             project_limsid = project.id
-            project_type = next((item.value for item in project.udf_fields if item.name == "Project Type"), None)
-            reference_genome = next((item.value for item in project.udf_fields if item.name == "Reference Genome"), None)
-            data_analysis_type = next((item.value for item in project.udf_fields if item.name == "Data Analysis Pipeline"), None)
-            library_type = next((item.value for item in project.udf_fields if item.name == "Library Type"), None)
+            project_type = project.get_udf("Project Type")
+            reference_genome = project.get_udf("Reference Genome")
+            data_analysis_type = project.get_udf("Data Analysis Pipeline")
+            library_type = project.get_udf("Library Type")
         else:
             project_name = None
             project_limsid = None
@@ -248,7 +449,7 @@ class ClarityHelperLims(ClarityLims):
         user_fullname = None
 
         # first check if the sample has drop-off information
-        dropoff_info = self.check_sample_dropoff_info(sample_id)
+        dropoff_info = self.get_dropoff_info(sample)
         if "Drop-Off Lab Name" in dropoff_info:
             lab_name = dropoff_info["Drop-Off Lab Name"]
         if "Drop-Off Researcher Name" in dropoff_info:
@@ -257,10 +458,8 @@ class ClarityHelperLims(ClarityLims):
 
         # if no drop-off information, get the submitter details from the project information
         if not dropoff_info:
-            if sample_project:
-                user = self.get_researchers(search_id=project.researcher.id)
-            else:
-                user = self.get_researchers(search_id=sample.submitter.id)
+            researcher_id = project.researcher.id if sample_project else sample.submitter.id
+            user = graph.get(Researcher, researcher_id, lambda: self.get_researchers(search_id=researcher_id))
 
             # these get the submitter, not the scientist, info
             user_firstname = user.first_name
@@ -268,7 +467,7 @@ class ClarityHelperLims(ClarityLims):
             user_fullname = (user_firstname + "." + user_lastname).lower()
 
             # Get the lab details
-            lab = self.expand_stub(user.lab, expansion_type=Lab)
+            lab = graph.get(Lab, user.lab.id, lambda: self.expand_stub(user.lab, expansion_type=Lab))
             lab_name = lab.name
 
         # Store obtained information in a dictionary
@@ -287,7 +486,7 @@ class ClarityHelperLims(ClarityLims):
 
         return sample_info
 
-    def collect_sample_info_from_runid(self, run_id: str) -> dict:
+    def collect_sample_info_from_runid(self, run_id: str, graph: Optional[RunGraph] = None) -> dict:
         """
         Collect detailed information for all samples associated with a given run ID.
 
@@ -297,6 +496,7 @@ class ClarityHelperLims(ClarityLims):
 
         Args:
             run_id (str): The unique identifier for the run whose sample information is to be collected.
+            graph (Optional[RunGraph]): Run graph to read the run objects from. Loaded if not given.
 
         Returns:
             dict: A dictionary containing detailed information for all samples associated with the run ID.
@@ -314,14 +514,13 @@ class ClarityHelperLims(ClarityLims):
             ValueError: If the provided run_id is None or invalid.
             KeyError: If the run_id does not exist in the system.
         """
-        # Obtain an artifacts list and then use it as input to obtain a sample list
-        artifacts_list = self.get_artifacts_from_runid(run_id)
-        sample_list = self.get_samples_from_artifacts(artifacts_list)
+        if graph is None:
+            graph = self.load_run_graph(run_id)
 
-        # Store detailed information from all samples in sample_list within a dictionary
+        # Store detailed information from all samples of the run within a dictionary
         sample_info = {}
-        for sample_id in sample_list:
-            info = self.get_sample_info(sample_id.id)
+        for sample_id in graph.sample_ids:
+            info = self.get_sample_info(sample_id, graph)
             if info is None:
                 pass
             else:
@@ -345,45 +544,14 @@ class ClarityHelperLims(ClarityLims):
         Warns:
             UserWarning: If there are issues accessing the XML data structure or API responses.
         """
-        # Construct URI for reagent types
-        base_uri = "https://asf-claritylims.thecrick.org/api/v2/reagenttypes"
-        uri = f"{base_uri}?name={sample_barcode}"
-
-        # Fetch and parse reagent type data
-        xml_data = self.get_with_uri(uri)
-        data_dict = xmltodict.parse(xml_data, process_namespaces=False, attr_prefix="")
-
-        # Validate reagent-types and reagent-type keys
-        reagent_types = data_dict.get("rtp:reagent-types")
-        if not reagent_types:
-            log.warning("Missing 'rtp:reagent-types' in Clarity XML response. Returning fallback barcode.")
-            return sample_barcode
-
-        reagent_type = reagent_types.get("reagent-type")
-        if not reagent_type or "uri" not in reagent_type:
-            log.warning("Missing 'reagent-type' or 'uri' in reagent-type data. Returning fallback barcode.")
-            return sample_barcode
-        data_dict_uri = reagent_type["uri"]
-
-        # Fetch and parse detailed reagent type data
-        xml_uri = self.get_with_uri(data_dict_uri)
-        uri_xml = xmltodict.parse(xml_uri, process_namespaces=False, attr_prefix="")
-
-        # Validate special-type and attribute keys
-        special_type = uri_xml.get("rtp:reagent-type", {}).get("special-type")
-        if not special_type or "attribute" not in special_type:
-            log.warning("Missing 'special-type' or 'attribute' field in Clarity. Returning fallback barcode.")
+        # Resolve from the reagent type index, querying the LIMS on a miss
+        barcode, warning = self.reagent_types.lookup(sample_barcode)
+        if warning is not None:
+            log.warning(warning)
             return sample_barcode
-        attribute = special_type["attribute"]
+        return barcode
 
-        # Validate attribute name and value
-        if attribute.get("name") == "Sequence":
-            return attribute.get("value", "None")
-        else:
-            log.warning("Attribute 'name' is not 'Sequence'. Returning fallback barcode.")
-            return sample_barcode
-
-    def get_sample_custom_barcode_from_sampleid(self, sample_id: str) -> str:
+    def get_sample_custom_barcode_from_sampleid(self, sample_id: str, graph: Optional[RunGraph] = None) -> str:
         """
         Retrieve the custom barcode associated with a specific sample ID.
 
@@ -394,6 +562,7 @@ class ClarityHelperLims(ClarityLims):
 
         Args:
             sample_id (str): The unique identifier of the sample for which the custom barcode is to be retrieved.
+            graph (Optional[RunGraph]): Run graph used to look up and store the sample and its artifact.
 
         Returns:
             str: The custom barcode associated with the specified sample.
@@ -402,21 +571,23 @@ class ClarityHelperLims(ClarityLims):
             ValueError: If the provided sample ID is None or invalid.
             KeyError: If required keys (e.g., artifact ID or UDF field) are missing in the system data.
         """
+        if graph is None:
+            graph = RunGraph()
 
         # Extract barcodes
-        info = self.get_samples(search_id=sample_id)
-        artifact_uri = self.get_artifacts(search_id=info.artifact.id)
+        info = graph.get(Sample, sample_id, lambda: self.get_samples(search_id=sample_id))
+        artifact_uri = graph.get(Artifact, info.artifact.id, lambda: self.get_artifacts(search_id=info.artifact.id))
         reagent_barcode = ""
         if artifact_uri.reagent_labels:
             reagent = artifact_uri.reagent_labels[0]
             reagent_barcode = self.get_barcode_from_reagenttypes(reagent)
         else:
-            reagent_barcode = next((entry.value for entry in info.udf_fields if entry.name == "Index"), "")
+            reagent_barcode = info.get_udf("Index", "")
         reagent_barcode_from_reagenttypes = self.get_barcode_from_reagenttypes(reagent_barcode)
 
         return reagent_barcode_from_reagenttypes
 
-    def get_sample_barcode_from_runid(self, run_id: str, get_bc_from_name: bool = False) -> dict:
+    def get_sample_barcode_from_runid(self, run_id: str, get_bc_from_name: bool = False, graph: Optional[RunGraph] = None) -> dict:
         """
         Retrieve a mapping of sample barcodes for all samples associated with a given run ID.
 
@@ -424,8 +595,15 @@ class ClarityHelperLims(ClarityLims):
         the parent processes to find the "T Custom Indexing" process, and collects barcode
         information for each sample. The collected information is returned as a dictionary.
 
+        The traversal is level-synchronous: the artifacts read by each generation of parent
+        processes, and the next generation of processes, are expanded together so they can be
+        fetched concurrently or in batches. Processes are handled in the same order as a
+        breadth-first queue and the time spent on each generation is recorded in graph.lineage_levels.
+
         Args:
             run_id (str): The unique identifier for the run whose sample barcodes are to be retrieved.
+            get_bc_from_name (bool): Use the reagent label names as barcodes instead of looking up their sequence.
+            graph (Optional[RunGraph]): Run graph to read the run objects from. Loaded if not given.
 
         Returns:
             dict: A dictionary containing the mapping of sample names to their barcodes.
@@ -441,16 +619,17 @@ class ClarityHelperLims(ClarityLims):
             ValueError: If the provided run_id is None or invalid.
             ValueError: If the initial process is None.
         """
+        if graph is None:
+            graph = self.load_run_graph(run_id, include_submitters=False)
+
         # Extract parent_process information from each artifact of the original pooled samples artifacts
-        pools_list = self.get_artifacts_from_runid(run_id)
-        pools_list_expanded = self.expand_stubs(pools_list, expansion_type=Artifact)
+        pools_list_expanded = graph.pools
 
         # Extract sample names and the corresponding Library Type value associated with the pool artifacts
         pool_sample_dict = {}
         for process in pools_list_expanded:
-            for sample in process.samples:
-                sample = self.expand_stub(sample, expansion_type=Sample)
-                library_type = next((item.value for item in sample.udf_fields if item.name == "Library Type"), None)
+            for sample in self.expand_stubs_with_graph(graph, process.samples, Sample):
+                library_type = sample.get_udf("Library Type")
                 pool_sample_dict[sample.id] = {"library_type": library_type}
 
         non_pooled_sample_list = []
@@ -459,69 +638,109 @@ class ClarityHelperLims(ClarityLims):
         # Collect a list of all the initial parent processes required for initiating the binary search tree
         initial_parent_process_list = []
         initial_parent_process_list.extend(artifact.parent_process for artifact in pools_list_expanded if artifact.parent_process is not None)
-        initial_process = self.expand_stubs(initial_parent_process_list, expansion_type=Process)
+        initial_process = self.expand_stubs_with_graph(graph, initial_parent_process_list, Process)
 
         if initial_process is None:
             raise ValueError("Initial process is None")
 
-        # Set up for a binary search tree
+        # Walk back through the parent processes one generation at a time until the "T Custom Indexing"
         visited_processes = set()
-        process_queue = queue.Queue()
-        for item in initial_process:
-            process_queue.put(item)
-
-        # Loop through parent process until the "T Custom Indexing"
-        while process_queue.qsize() > 0:
-            process = process_queue.get()
-            if process.id in visited_processes:
-                continue
-
-            visited_processes.add(process.id)
-
-            if process.process_type.name != "T Custom Indexing":
-                for input_output in process.input_output_map:
-                    if input_output.output.output_type == "Analyte":
-
-                        # Obtain a list of the samples being processed at this step
-                        input_stub_expand = self.expand_stub(input_output.input, expansion_type=Artifact)
-                        sample_stud = input_stub_expand.samples
-                        sample_list = []
-                        for sample in sample_stud:
-                            sample_list.append(sample.id)
-
-                        # For each sample in each artifact, check if it is also present in the original pooled samples
-                        for sample in sample_list:
-                            if sample in pool_sample_dict:
-                                # Filter for samples that do not have premade libraries
-                                if pool_sample_dict[sample]["library_type"] != "Premade":
-                                    # Add parent processes to the stack for further processing
-                                    parent_process = input_output.input.parent_process
-                                    if parent_process:
-                                        parent_process = self.expand_stub(parent_process, expansion_type=Process)
-                                        process_queue.put(parent_process)
+        process_level = initial_process
+        depth = 0
+        while process_level:
+            depth += 1
+            level_start = time.perf_counter()
+
+            # Expand the artifacts needed by this generation together
+            self.prefetch_lineage_level(graph, process_level, visited_processes)
+
+            parent_process_list = []
+            level_size = 0
+            for process in process_level:
+                if process.id in visited_processes:
+                    continue
+
+                visited_processes.add(process.id)
+                level_size += 1
+
+                if process.process_type.name != "T Custom Indexing":
+                    for input_output in process.input_output_map:
+                        if input_output.output.output_type == "Analyte":
+
+                            # Obtain a list of the samples being processed at this step
+                            input_stub_expand = graph.get(Artifact, input_output.input.id)
+                            sample_stud = input_stub_expand.samples
+                            sample_list = []
+                            for sample in sample_stud:
+                                sample_list.append(sample.id)
+
+                            # For each sample in each artifact, check if it is also present in the original pooled samples
+                            for sample in sample_list:
+                                if sample in pool_sample_dict:
+                                    # Filter for samples that do not have premade libraries
+                                    if pool_sample_dict[sample]["library_type"] != "Premade":
+                                        # Add parent processes to the next generation for further processing
+                                        parent_process = input_output.input.parent_process
+                                        if parent_process:
+                                            parent_process_list.append(parent_process)
+                                    else:
+                                        # Process premade sample barcodes as custom
+                                        barcode_from_sampleid = self.get_sample_custom_barcode_from_sampleid(sample, graph)
+                                        sample_barcode_match[sample] = {"barcode": barcode_from_sampleid}
                                 else:
-                                    # Process premade sample barcodes as custom
-                                    barcode_from_sampleid = self.get_sample_custom_barcode_from_sampleid(sample)
-                                    sample_barcode_match[sample] = {"barcode": barcode_from_sampleid}
-                            else:
-                                non_pooled_sample_list.append(sample)
-                                continue  # Skip to the next sample
-            else:
-                # Extract barcode information and store it in "sample_barcode_match"
-                for input_output in process.input_output_map:
-                    if input_output.output.output_type == "Analyte":
-                        output_expanded = self.expand_stub(input_output.output, expansion_type=Artifact)
-                        sample_stub = output_expanded.samples[0]
-                        sample_info = self.expand_stub(sample_stub, expansion_type=Sample)
+                                    non_pooled_sample_list.append(sample)
+                                    continue  # Skip to the next sample
+                else:
+                    # Extract barcode information and store it in "sample_barcode_match"
+                    outputs = [graph.get(Artifact, io.output.id) for io in process.input_output_map if io.output.output_type == "Analyte"]
+                    if get_bc_from_name is False:
+                        # Resolve the reagent labels of the whole step together
+                        self.reagent_types.lookup_all([output.reagent_labels[0] for output in outputs])
+                    for output_expanded in outputs:
+                        sample_info = graph.get(Sample, output_expanded.samples[0].id)
                         sample_name = sample_info.limsid
                         reagent_barcode = output_expanded.reagent_labels[0]
                         if get_bc_from_name is False:
                             reagent_barcode = self.get_barcode_from_reagenttypes(reagent_barcode)
                         sample_barcode_match[sample_name] = {"barcode": reagent_barcode}
 
+            # Expand the next generation of parent processes together
+            process_level = self.expand_stubs_with_graph(graph, parent_process_list, Process)
+            seconds = time.perf_counter() - level_start
+            graph.lineage_levels.append({"level": depth, "processes": level_size, "seconds": seconds})
+            log.debug(f"Lineage level {depth} of {run_id}: {level_size} processes in {seconds:.2f}s")
+
         return sample_barcode_match
 
-    def get_sample_custom_barcode_from_runid(self, run_id: str) -> dict:
+    def prefetch_lineage_level(self, graph: RunGraph, processes: list, visited_processes: set):
+        """
+        Expand the artifacts read while processing one generation of the lineage traversal.
+
+        Input artifacts of analyte outputs are expanded for ordinary processes, and the analyte output
+        artifacts and their first samples for "T Custom Indexing" processes. Processes already visited
+        are skipped, so only artifacts the traversal reads are requested.
+
+        Args:
+            graph (RunGraph): The run graph to add the expanded artifacts and samples to.
+            processes (list): The expanded processes of the generation.
+            visited_processes (set): Ids of the processes handled in earlier generations.
+        """
+        input_stubs = []
+        output_stubs = []
+        for process in processes:
+            if process.id in visited_processes:
+                continue
+            for input_output in process.input_output_map:
+                if input_output.output.output_type == "Analyte":
+                    if process.process_type.name != "T Custom Indexing":
+                        input_stubs.append(input_output.input)
+                    else:
+                        output_stubs.append(input_output.output)
+        self.expand_stubs_with_graph(graph, input_stubs + output_stubs, Artifact)
+        outputs = [graph.get(Artifact, stub.id) for stub in output_stubs]
+        self.expand_stubs_with_graph(graph, [output.samples[0] for output in outputs], Sample)
+
+    def get_sample_custom_barcode_from_runid(self, run_id: str, graph: Optional[RunGraph] = None) -> dict:
         """
         Retrieve a mapping of custom barcodes for all samples associated with a given run ID.
 
@@ -532,6 +751,7 @@ class ClarityHelperLims(ClarityLims):
 
         Args:
             run_id (str): The unique identifier for the run whose sample barcodes are to be retrieved.
+            graph (Optional[RunGraph]): Run graph to read the run objects from. Loaded if not given.
 
         Returns:
             dict: A dictionary where each key is the sample name (str), and the value is a dictionary containing:
@@ -541,25 +761,23 @@ class ClarityHelperLims(ClarityLims):
             ValueError: If the provided run_id is None or invalid.
             KeyError: If the run_id does not exist in the system.
         """
+        if graph is None:
+            graph = self.load_run_graph(run_id, include_submitters=False)
 
-        # Obtain an artifacts list and then use it as input to obtain a sample list
-        artifacts_list = self.get_artifacts_from_runid(run_id)
-        sample_list = self.get_samples_from_artifacts(artifacts_list)
-
-        # Extract barcodes
-        sample_barcode = {}
-        for sample_id in sample_list:
-            info = self.get_samples(search_id=sample_id.id)
-            sample_name = info.limsid
-            artifact_uri = self.get_artifacts(search_id=info.artifact.id)
+        # Collect the reagent label of each sample, falling back to its Index UDF
+        labels = {}
+        for info in graph.samples:
+            artifact_uri = graph.get(Artifact, info.artifact.id, lambda: self.get_artifacts(search_id=info.artifact.id))  # pylint: disable=cell-var-from-loop
             if artifact_uri.reagent_labels:
-                reagent = artifact_uri.reagent_labels[0]
-                reagent_barcode_from_reagenttypes = self.get_barcode_from_reagenttypes(reagent)
-                sample_barcode[sample_name] = {"barcode": reagent_barcode_from_reagenttypes}
+                labels[info.limsid] = artifact_uri.reagent_labels[0]
             else:
-                reagent_barcode_from_sample = next((entry.value for entry in info.udf_fields if entry.name == "Index"), "")
-                reagent_barcode_from_reagenttypes = self.get_barcode_from_reagenttypes(reagent_barcode_from_sample)
-                sample_barcode[sample_name] = {"barcode": reagent_barcode_from_reagenttypes}
+                labels[info.limsid] = info.get_udf("Index", "")
+
+        # Resolve the labels of the whole run together and extract barcodes
+        self.reagent_types.lookup_all(list(labels.values()))
+        sample_barcode = {}
+        for sample_name, reagent in labels.items():
+            sample_barcode[sample_name] = {"barcode": self.get_barcode_from_reagenttypes(reagent)}
 
         return sample_barcode
 
@@ -637,8 +855,11 @@ class ClarityHelperLims(ClarityLims):
         with the specified run ID, and merges this information into a single dictionary. The merged
         information is useful for generating an ONT samplesheet.
 
+        The run objects are fetched once with load_run_graph and shared by all sections.
+
         Args:
             run_id (str): The unique identifier for the run whose samplesheet information is to be collected.
+            get_bc_from_name (bool): Use the reagent label names as barcodes instead of looking up their sequence.
 
         Returns:
             dict: A dictionary containing merged information for all samples associated with the run ID.
@@ -659,18 +880,21 @@ class ClarityHelperLims(ClarityLims):
         Raises:
             ValueError: If the provided run_id is None or invalid.
         """
+        # Load the run objects once
+        graph = self.load_run_graph(run_id)
+
         # Collect sample info
-        sample_metadata = self.collect_sample_info_from_runid(run_id)
-        barcode_info = self.get_sample_barcode_from_runid(run_id, get_bc_from_name)
-        lane_info = self.get_lane_from_runid(run_id)
+        sample_metadata = self.collect_sample_info_from_runid(run_id, graph)
+        barcode_info = self.get_sample_barcode_from_runid(run_id, get_bc_from_name, graph)
+        lane_info = self.get_lane_from_runid(run_id, graph)
         # Check if barcode_info is empty; if so, use get_sample_custom_barcode to fetch it
         if not barcode_info:
-            barcode_info = self.get_sample_custom_barcode_from_runid(run_id)
+            barcode_info = self.get_sample_custom_barcode_from_runid(run_id, graph)
 
         # Check that all samples have barcode information, add it if missing
         for sample in sample_metadata:
             if sample not in barcode_info:
-                barcode_from_sample_id = self.get_sample_custom_barcode_from_sampleid(sample)
+                barcode_from_sample_id = self.get_sample_custom_barcode_from_sampleid(sample, graph)
                 barcode_info[sample] = {"barcode": barcode_from_sample_id}
 
         # Initialize an empty dictionary for the final merged output
@@ -735,10 +959,10 @@ class ClarityHelperLims(ClarityLims):
             if proj_info is None:
                 raise ValueError("Project not found")
 
-            for field in proj_info.udf_fields:
-                if pipeline_params_field_name in field.name.lower():
+            for field_name, field_value in proj_info.udfs.items():
+                if pipeline_params_field_name in field_name.lower():
                     key_value_pairs = []
-                    key_value_pairs = field.value.split(";") if ";" in field.value else [field.value]
+                    key_value_pairs = field_value.split(";") if ";" in field_value else [field_value]
 
                     param_values_dict = {}
                     for pair in key_value_pairs:
@@ -748,7 +972,7 @@ class ClarityHelperLims(ClarityLims):
                         else:
                             log.warning(f'Missing saparator value in "{pair}" parameter. Returning as NA.')
                             param_values_dict[pair.strip()] = "NA"
-                    pipeline_params[field.name] = param_values_dict
+                    pipeline_params[field_name] = param_values_dict
         except HTTPError:
             log.warning(f"Project {project_name} not found.")
         except ValueError:
@@ -4,14 +4,19 @@ Clarity Lims API Class
 
 import logging
 import os
-from typing import Dict, Optional
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, Optional
 from xml.etree import ElementTree
+from xml.sax.saxutils import unescape
 
 import requests
 import toml
-import xmltodict
 from pydantic import ValidationError
 
+from asf_tools.api.clarity.cache import ResponseCache, cache_key, endpoint_category
 from asf_tools.api.clarity.models import (
     Artifact,
     ClarityBaseModel,
@@ -27,10 +32,15 @@ from asf_tools.api.clarity.models import (
     Stub,
     Workflow,
 )
+from asf_tools.api.clarity.retry import CircuitBreaker, CircuitOpenError, RequestMetrics, RetryPolicy
+from asf_tools.api.clarity.transport import RateLimiter, create_session, shared_session
+from asf_tools.api.clarity.xml_decoder import XML_DECODERS
 
 
 log = logging.getLogger(__name__)
 
+NEXT_PAGE_PATTERN = re.compile(r'<next-page\s+uri="([^"]*)"')
+
 
 class ClarityLims:
     """
@@ -51,14 +61,46 @@ class ClarityLims:
         "Protocol": "protcnf:protocol",
         "QueueStep": "que:queue",
     }
+    TRUSTED_MODELS = (Stub, ResearcherStub)
+    BATCH_EXP_KEY = {
+        "Artifact": ("artifacts", "art:details", "art:artifact"),
+        "Sample": ("samples", "smp:details", "smp:sample"),
+        "Container": ("containers", "con:details", "con:container"),
+    }
 
     def __init__(
-        self, credentials_path: Optional[str] = None, baseuri: Optional[str] = None, username: Optional[str] = None, password: Optional[str] = None
+        self,
+        credentials_path: Optional[str] = None,
+        baseuri: Optional[str] = None,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        max_workers: int = 1,
+        batch_size: Optional[int] = None,
+        cache: Optional[ResponseCache] = None,
+        xml_decoder: str = "xmltodict",
+        trusted_payloads: bool = False,
+        retry: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        pool_size: int = 100,
+        rate_limit: Optional[float] = None,
+        share_session: bool = False,
     ):
         # Init self
         self.baseuri = ""
         self.username = ""
         self.password = ""
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.cache = cache
+        self.xml_decoder = xml_decoder
+        self.parse_xml = XML_DECODERS[xml_decoder]
+        self.trusted_payloads = trusted_payloads
+        self.retry = RetryPolicy() if retry is None else retry
+        self.circuit_breaker = circuit_breaker
+        self.rate_limiter = None if rate_limit is None else RateLimiter(rate_limit)
+        self.metrics = RequestMetrics()
+        self.hooks = {"pre_request": [], "post_request": [], "post_parse": []}
+        self.local = threading.local()
 
         # Resolve credentials path
         resolved_cred_path = credentials_path
@@ -86,10 +128,11 @@ class ClarityLims:
         if password is not None:
             self.password = password
 
-        # Setup API Connection
-        self.request_session = requests.Session()
-        self.adapter = requests.adapters.HTTPAdapter(pool_connections=100, pool_maxsize=100)
-        self.request_session.mount("http://", self.adapter)
+        # Setup API Connection, the pool is mounted for http and https
+        if share_session:
+            self.request_session = shared_session(pool_size)
+        else:
+            self.request_session = create_session(pool_size)
 
     def load_credentials(self, file_path: str) -> dict:
         """
@@ -178,19 +221,199 @@ class ClarityLims:
         Returns:
             bytes: The content of the response.
         """
-        # Try to call api
+        key = cache_key(uri, params)
+        info = self.start_request("GET", key)
         try:
+            # Check the response cache
+            if self.cache is not None:
+                content = self.cache.get(key)
+                if content is not None:
+                    log.debug(f"CACHE: {key}")
+                    info["cache_hit"] = True
+                    info["bytes"] = len(content)
+                    return content
+
+            # Try to call api
             log.debug(f"GET: {uri}")
-            response = self.request_session.get(
-                uri, params=params, auth=(self.username, self.password), headers={"accept": "application/xml"}, timeout=self.API_TIMEOUT
+            response = self.send_request(
+                self.request_session.get, uri, params=params, auth=(self.username, self.password), headers={"accept": "application/xml"}
             )
-        except requests.exceptions.Timeout as e:
-            raise type(e)(f"{str(e)}, Error trying to reach {uri}")
+            info["status"] = response.status_code
+            info["bytes"] = len(response.content)
+
+            # Validate the response
+            self.validate_response(uri, response, accept_status_codes)
+
+            # Only successful responses are cached
+            if self.cache is not None and response.status_code == 200:
+                self.cache.set(key, response.content)
+
+            return response.content
+        finally:
+            self.end_request(info)
+
+    def post_with_uri(self, uri: str, data: bytes, accept_status_codes=[200], idempotent: bool = False) -> bytes:
+        """
+        Perform a POST request with an XML body to a specified URI.
+
+        Args:
+            uri (str): The URI to send the POST request to.
+            data (bytes): The XML request body.
+            accept_status_codes (list): List of acceptable status codes.
+            idempotent (bool): Whether the request only reads data and can be safely retried.
+
+        Returns:
+            bytes: The content of the response.
+        """
+        info = self.start_request("POST", uri)
+        try:
+            # Try to call api
+            log.debug(f"POST: {uri}")
+            response = self.send_request(
+                self.request_session.post,
+                uri,
+                idempotent=idempotent,
+                data=data,
+                auth=(self.username, self.password),
+                headers={"content-type": "application/xml", "accept": "application/xml"},
+            )
+            info["status"] = response.status_code
+            info["bytes"] = len(response.content)
+
+            # Validate the response
+            self.validate_response(uri, response, accept_status_codes)
+
+            return response.content
+        finally:
+            self.end_request(info)
 
-        # Validate the response
-        self.validate_response(uri, response, accept_status_codes)
+    def add_hook(self, event: str, callback):
+        """
+        Register a callback for a request event.
+
+        pre_request and post_request callbacks receive a dictionary describing the request with the keys
+        method, uri, category, start, cache_hit, status, bytes and latency (the last four are only final
+        in post_request). post_parse callbacks receive a dictionary with the category of the last request
+        made on the calling thread and the parse_time in seconds.
+
+        Args:
+            event (str): One of pre_request, post_request or post_parse.
+            callback (Callable): Function called with the event dictionary.
+        """
+        if event not in self.hooks:
+            raise ValueError(f"Unknown hook event {event}, expected one of {list(self.hooks)}")
+        self.hooks[event].append(callback)
 
-        return response.content
+    def start_request(self, method: str, uri: str) -> dict:
+        """
+        Describe a new request and call the pre_request hooks.
+        """
+        category = endpoint_category(uri)
+        self.local.category = category
+        info = {
+            "method": method,
+            "uri": uri,
+            "category": category,
+            "start": time.perf_counter(),
+            "cache_hit": False,
+            "status": None,
+            "bytes": 0,
+            "latency": 0.0,
+        }
+        for callback in self.hooks["pre_request"]:
+            callback(info)
+        return info
+
+    def end_request(self, info: dict):
+        """
+        Complete a request description and call the post_request hooks.
+        """
+        info["latency"] = time.perf_counter() - info["start"]
+        for callback in self.hooks["post_request"]:
+            callback(info)
+
+    def decode_xml(self, xml_data) -> dict:
+        """
+        Decode an XML response with the configured decoder, reporting the parse time to the post_parse hooks.
+
+        Args:
+            xml_data (Union[str, bytes]): The XML data.
+
+        Returns:
+            dict: The decoded document.
+        """
+        if not self.hooks["post_parse"]:
+            return self.parse_xml(xml_data)
+        start = time.perf_counter()
+        decoded = self.parse_xml(xml_data)
+        info = {"category": getattr(self.local, "category", ""), "parse_time": time.perf_counter() - start}
+        for callback in self.hooks["post_parse"]:
+            callback(info)
+        return decoded
+
+    def send_request(self, method, uri: str, idempotent: bool = True, **kwargs) -> requests.Response:
+        """
+        Send a request through the rate limiter and circuit breaker, retrying failed idempotent requests with backoff.
+
+        Args:
+            method: The session method to call, e.g. self.request_session.get.
+            uri (str): The URI to send the request to.
+            idempotent (bool): Whether the request can be safely retried.
+            **kwargs: Arguments passed to the session method.
+
+        Returns:
+            requests.Response: The last response received.
+        """
+        self.metrics.increment("requests")
+        attempt = 0
+        while True:
+            attempt += 1
+            can_retry = idempotent and attempt < self.retry.max_attempts
+            if self.circuit_breaker is not None:
+                try:
+                    self.circuit_breaker.before_request(uri)
+                except CircuitOpenError:
+                    self.metrics.increment("rejected")
+                    raise
+
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+
+            self.metrics.increment("attempts")
+            try:
+                response = method(uri, timeout=self.API_TIMEOUT, **kwargs)
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.record_failure()
+                if not can_retry:
+                    self.metrics.increment("failures")
+                    if isinstance(e, requests.exceptions.Timeout):
+                        raise type(e)(f"{str(e)}, Error trying to reach {uri}")
+                    raise
+                delay = self.retry.backoff(attempt)
+                log.warning(f"Attempt {attempt} for {uri} failed: {e}, retrying in {delay:.1f}s")
+            except Exception:
+                # Any other error still ends a trial request, so the breaker cannot stay half open
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.record_failure()
+                self.metrics.increment("failures")
+                raise
+            else:
+                self.metrics.record_status(response.status_code)
+                if response.status_code not in self.retry.retry_status_codes:
+                    if self.circuit_breaker is not None:
+                        self.circuit_breaker.record_success()
+                    return response
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.record_failure()
+                if not can_retry:
+                    self.metrics.increment("failures")
+                    return response
+                delay = self.retry.backoff(attempt, response.headers.get("Retry-After"))
+                log.warning(f"Attempt {attempt} for {uri} returned {response.status_code}, retrying in {delay:.1f}s")
+
+            self.metrics.increment("retries")
+            time.sleep(delay)
 
     def get(self, endpoint: str, params: Optional[Dict[str, str]] = None, accept_status_codes=[200]) -> bytes:
         """
@@ -223,7 +446,14 @@ class ClarityLims:
     def initialise_model(self, model_type: ClarityBaseModel, data: dict) -> ClarityBaseModel:
         """
         Initialise a model instance and check for validation error. if deteced give a rich error message
+
+        With trusted_payloads enabled, flat models listed in TRUSTED_MODELS are built without validation
+        and fall back to full validation if a required field is missing.
         """
+        if self.trusted_payloads and model_type in self.TRUSTED_MODELS:
+            model = model_type.construct_trusted(data)
+            if model is not None:
+                return model
         try:
             model = model_type(**data)
         except ValidationError as e:
@@ -237,45 +467,116 @@ class ClarityLims:
             raise e
         return model
 
-    def get_single_page_instances(self, xml_data: str, outer_key: str, inner_key: str, model_type: ClarityBaseModel) -> list[ClarityBaseModel]:
+    def parse_page(self, xml_data: str, outer_key: str, inner_key: str) -> tuple[list[dict], Optional[str]]:
         """
-        Parse XML data to get instances of a specified model from a single page.
+        Parse XML data of a single list page into item dictionaries.
 
         Args:
             xml_data (str): The XML data as a string.
             outer_key (str): The outer key in the XML structure.
             inner_key (str): The inner key in the XML structure.
-            model_type (ClarityBaseModel): The model type to instantiate.
 
         Returns:
-            list[ClarityBaseModel]: A list of instances of the model type.
+            tuple[list[dict], Optional[str]]: The parsed items and the uri of the next page if there is one.
         """
         # Parse data
-        data_dict = xmltodict.parse(xml_data, process_namespaces=False, attr_prefix="")
+        data_dict = self.decode_xml(xml_data)
         inner_dict = data_dict[outer_key]
-        if inner_key not in inner_dict:
+        if inner_dict is None or inner_key not in inner_dict:
             return [], None
-        inner_dict = inner_dict[inner_key]
-
-        # Create instances
-        instances = []
-        if isinstance(inner_dict, list):
-            for item in inner_dict:
-                # Create type
-                data_item = self.initialise_model(model_type, item)
-                instances.append(data_item)
-        if isinstance(inner_dict, dict):
-            data_item = self.initialise_model(model_type, inner_dict)
-            instances.append(data_item)
 
         # Look for next page
-        next_page = data_dict[outer_key].get("next-page")
+        next_page = inner_dict.get("next-page")
         if next_page is not None:
             next_page = next_page["uri"]
 
+        # Return items and next page hook
+        items = inner_dict[inner_key]
+        if isinstance(items, dict):
+            items = [items]
+        return items, next_page
+
+    def get_single_page_instances(self, xml_data: str, outer_key: str, inner_key: str, model_type: ClarityBaseModel) -> list[ClarityBaseModel]:
+        """
+        Parse XML data to get instances of a specified model from a single page.
+
+        Args:
+            xml_data (str): The XML data as a string.
+            outer_key (str): The outer key in the XML structure.
+            inner_key (str): The inner key in the XML structure.
+            model_type (ClarityBaseModel): The model type to instantiate.
+
+        Returns:
+            list[ClarityBaseModel]: A list of instances of the model type.
+        """
+        items, next_page = self.parse_page(xml_data, outer_key, inner_key)
+        instances = [self.initialise_model(model_type, item) for item in items]
+
         # Return data and next page hook
         return instances, next_page
 
+    def find_next_page(self, xml_data) -> Optional[str]:
+        """
+        Find the next page link of a list page without parsing the whole document.
+
+        Args:
+            xml_data (Union[str, bytes]): The XML data.
+
+        Returns:
+            Optional[str]: The uri of the next page if there is one.
+        """
+        if isinstance(xml_data, bytes):
+            xml_data = xml_data.decode("utf-8")
+        match = NEXT_PAGE_PATTERN.search(xml_data)
+        if match is None:
+            return None
+        return unescape(match.group(1), {"&quot;": '"', "&apos;": "'"})
+
+    def iter_instances(
+        self,
+        outer_key: str,
+        inner_key: str,
+        model_type: ClarityBaseModel,
+        endpoint: str,
+        params: Optional[Dict[str, str]] = None,
+        accept_status_codes=[200],
+    ) -> Iterator[ClarityBaseModel]:
+        """
+        Yield instances of a specified model from an API endpoint as the pages arrive.
+
+        The request for page N+1 is issued in the background as soon as its link is found in page N,
+        so fetching the next page overlaps with parsing and validating the current one.
+
+        Args:
+            outer_key (str): The outer key in the XML structure.
+            inner_key (str): The inner key in the XML structure.
+            model_type (ClarityBaseModel): The model type to instantiate.
+            endpoint (str): The API endpoint.
+            params (Optional[Dict[str, str]]): Optional dictionary of query parameters.
+            accept_status_codes (list): List of acceptable status codes.
+
+        Yields:
+            ClarityBaseModel: Instances of the model type in page order.
+        """
+        # Get first page
+        xml_data = self.get(endpoint, params, accept_status_codes)
+
+        # Cycle through pages, prefetching the next one
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            while xml_data is not None:
+                next_page = self.find_next_page(xml_data)
+                future = None
+                if next_page is not None:
+                    future = executor.submit(self.get_with_uri, next_page, params, accept_status_codes)
+
+                instances, _ = self.get_single_page_instances(xml_data, outer_key, inner_key, model_type)
+                yield from instances
+
+                xml_data = future.result() if future is not None else None
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
     def get_instances(
         self,
         outer_key: str,
@@ -299,17 +600,7 @@ class ClarityLims:
         Returns:
             list[ClarityBaseModel]: A list of instances of the model type.
         """
-        # Get first page
-        xml_data = self.get(endpoint, params, accept_status_codes)
-        instances, next_page = self.get_single_page_instances(xml_data, outer_key, inner_key, model_type)
-
-        # Cycle through pages
-        while next_page is not None:
-            xml_data = self.get_with_uri(next_page, params, accept_status_codes)
-            new_instances, next_page = self.get_single_page_instances(xml_data, outer_key, inner_key, model_type)
-            instances.extend(new_instances)
-
-        return instances
+        return list(self.iter_instances(outer_key, inner_key, model_type, endpoint, params, accept_status_codes))
 
     def get_single_instance(self, xml_data: str, outer_key: str, model_type: ClarityBaseModel) -> ClarityBaseModel:
         """
@@ -324,9 +615,20 @@ class ClarityLims:
             ClarityBaseModel: An instance of the model type.
         """
         # Parse data
-        data_dict = xmltodict.parse(xml_data, process_namespaces=False, attr_prefix="")
-        data_dict = data_dict[outer_key]
+        data_dict = self.decode_xml(xml_data)
+        return self.initialise_instance(data_dict[outer_key], model_type)
 
+    def initialise_instance(self, data_dict: dict, model_type: ClarityBaseModel) -> ClarityBaseModel:
+        """
+        Create a model instance from the parsed dictionary of a single entity.
+
+        Args:
+            data_dict (dict): The parsed entity data.
+            model_type (ClarityBaseModel): The model type to instantiate.
+
+        Returns:
+            ClarityBaseModel: An instance of the model type.
+        """
         # Set hyphons to underscores
         data_dict = {key.replace("-", "_"): value for key, value in data_dict.items()}
 
@@ -334,6 +636,31 @@ class ClarityLims:
         instance = self.initialise_model(model_type, data_dict)
         return instance
 
+    def get_batch_instances(self, xml_data: str, outer_key: str, inner_key: str, model_type: ClarityBaseModel) -> list[ClarityBaseModel]:
+        """
+        Parse the XML details document returned by a batch retrieve into model instances.
+
+        Args:
+            xml_data (str): The XML data as a string.
+            outer_key (str): The outer key in the XML structure, e.g. art:details.
+            inner_key (str): The inner key in the XML structure, e.g. art:artifact.
+            model_type (ClarityBaseModel): The model type to instantiate.
+
+        Returns:
+            list[ClarityBaseModel]: A list of instances of the model type in document order.
+        """
+        # Parse data
+        data_dict = self.decode_xml(xml_data)
+        details = data_dict[outer_key]
+        if details is None or inner_key not in details:
+            return []
+        items = details[inner_key]
+        if isinstance(items, dict):
+            items = [items]
+
+        # Create instances
+        return [self.initialise_instance(item, model_type) for item in items]
+
     def expand_stub(self, stub: ClarityBaseModel, expansion_type: ClarityBaseModel = ClarityBaseModel) -> ClarityBaseModel:
         """
         Expand a stub instance to a full instance by retrieving additional data from the API.
@@ -349,22 +676,100 @@ class ClarityLims:
         xml_data = self.get_with_uri(stub.uri)
         return self.get_single_instance(xml_data, self.STUB_EXP_KEY[expansion_type.__name__], expansion_type)
 
-    def expand_stubs(self, stubs: list[ClarityBaseModel], expansion_type: ClarityBaseModel = ClarityBaseModel) -> ClarityBaseModel:
+    def expand_stubs(
+        self,
+        stubs: list[ClarityBaseModel],
+        expansion_type: ClarityBaseModel = ClarityBaseModel,
+        max_workers: Optional[int] = None,
+        batch_size: Optional[int] = None,
+    ) -> list[ClarityBaseModel]:
         """
         Expand a list of stub instances to a full instance by retrieving additional data from the API.
 
+        When more than one worker is requested the stubs are fetched concurrently on a bounded thread pool
+        sharing the session connection pool. When a batch size is set and the expansion type has a batch
+        retrieve endpoint (artifacts, samples and containers) the stubs are grouped into batch requests
+        instead of one GET per stub. The returned list keeps the order of the input stubs and the first
+        error encountered (in input order) is raised, as in the sequential path.
+
         Args:
-            stub (ClarityBaseModel): The stub instance to expand.
+            stubs (list[ClarityBaseModel]): The stub instances to expand.
             expansion_type (ClarityBaseModel): The model type to instantiate for the expanded data.
+            max_workers (Optional[int]): Number of concurrent requests. Defaults to the client max_workers.
+            batch_size (Optional[int]): Number of stubs per batch request. Defaults to the client batch_size.
 
         Returns:
             ClarityBaseModels: A list of instances of the model type.
         """
-        # Get expanded stub
+        workers = self.max_workers if max_workers is None else max_workers
+        size = self.batch_size if batch_size is None else batch_size
+
+        # Group into batch retrieve requests where supported
+        if size and expansion_type.__name__ in self.BATCH_EXP_KEY:
+            batches = [stubs[i : i + size] for i in range(0, len(stubs), size)]
+            results = self.map_requests(lambda batch: self.batch_retrieve(batch, expansion_type), batches, workers)
+            return [instance for batch in results for instance in batch]
+
+        return self.map_requests(lambda stub: self.expand_stub(stub, expansion_type), stubs, workers)
+
+    def map_requests(self, func, items: list, max_workers: int) -> list:
+        """
+        Apply a request function to each item, sequentially or on a bounded thread pool.
+
+        Args:
+            func (Callable): The function to call for each item.
+            items (list): The items to process.
+            max_workers (int): Maximum number of concurrent calls.
+
+        Returns:
+            list: The results in input order.
+        """
+        # Sequential path
+        if max_workers <= 1 or len(items) <= 1:
+            return [func(item) for item in items]
+
+        # Concurrent path, map preserves input order and re-raises the first failure
+        executor = ThreadPoolExecutor(max_workers=min(max_workers, len(items)))
+        try:
+            return list(executor.map(func, items))
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def batch_retrieve(self, stubs: list[ClarityBaseModel], expansion_type: ClarityBaseModel) -> list[ClarityBaseModel]:
+        """
+        Expand a list of stubs with a single call to the batch retrieve endpoint of the expansion type.
+
+        Args:
+            stubs (list[ClarityBaseModel]): The stub instances to expand.
+            expansion_type (ClarityBaseModel): One of the model types listed in BATCH_EXP_KEY.
+
+        Returns:
+            list[ClarityBaseModel]: The expanded instances in the order of the input stubs.
+
+        Raises:
+            KeyError: If a requested stub is missing from the batch response.
+        """
+        if not stubs:
+            return []
+        endpoint, outer_key, inner_key = self.BATCH_EXP_KEY[expansion_type.__name__]
+
+        # Build the links document
+        root = ElementTree.Element("ri:links", {"xmlns:ri": "http://genologics.com/ri"})
+        for uri in dict.fromkeys(stub.uri for stub in stubs):
+            ElementTree.SubElement(root, "link", {"uri": uri, "rel": endpoint})
+        body = ElementTree.tostring(root, encoding="utf-8", xml_declaration=True)
+
+        # Retrieve and index the instances by limsid, the response uris may carry a different state
+        xml_data = self.post_with_uri(self.construct_uri(f"{endpoint}/batch/retrieve"), body, idempotent=True)
+        instances = {instance.limsid: instance for instance in self.get_batch_instances(xml_data, outer_key, inner_key, expansion_type)}
+
+        # Return in input order
         expansions = []
         for stub in stubs:
-            xml_data = self.get_with_uri(stub.uri)
-            expansions.append(self.get_single_instance(xml_data, self.STUB_EXP_KEY[expansion_type.__name__], expansion_type))
+            limsid = stub.uri.split("/")[-1].split("?")[0]
+            if limsid not in instances:
+                raise KeyError(f"{stub.uri} missing from batch retrieve response")
+            expansions.append(instances[limsid])
         return expansions
 
     def get_stub_list(self, model_type, stub_type, endpoint, outer_key, inner_key, search_id=None, expand_stubs=True, **kwargs):
@@ -404,7 +809,7 @@ class ClarityLims:
             list[Stub] or Lab: A list of lab stubs or a single expanded lab instance if only one result is found.
         """
         return self.get_stub_list(
-            Lab, Stub, "labs", "lab:labs", "lab", search_id=search_id, name=name, last_modifie=last_modified, expand_stubs=expand_stubs
+            Lab, Stub, "labs", "lab:labs", "lab", search_id=search_id, name=name, last_modified=last_modified, expand_stubs=expand_stubs
         )
 
     def get_researchers(self, search_id=None, expand_stubs=True, firstname=None, lastname=None, last_modified=None):
@@ -0,0 +1,276 @@
+"""
+Local mirror of Clarity objects kept up to date by last-modified polling
+"""
+
+import logging
+import threading
+from collections.abc import MutableMapping
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import Column, DateTime, LargeBinary, String, select
+
+from asf_tools.api.clarity.models import Artifact, ClarityBaseModel, Process, Project, Sample
+from asf_tools.database.base_model import BaseModel
+from asf_tools.database.db import Database
+
+
+log = logging.getLogger(__name__)
+
+
+class MirrorRecord(BaseModel):
+    """
+    The last fetched XML document of a Clarity object.
+    """
+
+    __tablename__ = "clarity_mirror_records"
+
+    entity = Column(String, primary_key=True)
+    id = Column(String, primary_key=True)
+    uri = Column(String, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    synced_at = Column(DateTime, nullable=False)
+
+
+class MirrorWatermark(BaseModel):
+    """
+    The last-modified timestamp up to which an entity has been synced.
+    """
+
+    __tablename__ = "clarity_mirror_watermarks"
+
+    entity = Column(String, primary_key=True)
+    last_modified = Column(String, nullable=False)
+
+
+def as_list(result) -> list:
+    """
+    Normalise the None, single stub or list result of a get_stub_list query to a list.
+    """
+    if result is None:
+        return []
+    if isinstance(result, list):
+        return result
+    return [result]
+
+
+class ClarityMirror:
+    """
+    Local database mirror of Clarity projects, samples, artifacts and processes.
+
+    Projects and processes are polled with the last-modified filter since a stored watermark. Samples are
+    refetched for each changed project and artifacts for the outputs of each changed process, as Clarity
+    does not filter those endpoints by modification date. The raw XML documents are stored, so objects
+    are rebuilt with the current models when read. Objects deleted in Clarity are not removed.
+
+    The watermarks come from the local clock, so they are set back by an overlap to cover clock skew
+    with the server. Objects changed within the overlap are refetched on the next sync and replace their
+    records.
+    """
+
+    MODELS = {"Project": Project, "Sample": Sample, "Artifact": Artifact, "Process": Process}
+    TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.000Z"
+
+    def __init__(self, api, database: Database, overlap: float = 300):
+        """
+        Args:
+            api (ClarityLims): The client used to poll Clarity.
+            database (Database): The database holding the mirror tables, created if missing.
+            overlap (float): Seconds the watermarks are set back from the local sync start time.
+        """
+        self.api = api
+        self.database = database
+        self.overlap = overlap
+        self.instances = {}
+        self.lock = threading.Lock()
+        BaseModel.metadata.create_all(database.engine, tables=[MirrorRecord.__table__, MirrorWatermark.__table__])
+
+    @staticmethod
+    def record_id(item_id: str) -> str:
+        """
+        Strip the artifact state from an id so each object has one record.
+        """
+        return item_id.split("?")[0]
+
+    def now(self) -> str:
+        """
+        The current time formatted for the last-modified filter.
+        """
+        return datetime.now(timezone.utc).strftime(self.TIMESTAMP_FORMAT)
+
+    def rewind(self, timestamp: str) -> str:
+        """
+        Set a last-modified timestamp back by the overlap.
+        """
+        rewound = datetime.strptime(timestamp, self.TIMESTAMP_FORMAT) - timedelta(seconds=self.overlap)
+        return rewound.strftime(self.TIMESTAMP_FORMAT)
+
+    def get_watermark(self, entity: str) -> Optional[str]:
+        """
+        Get the last-modified watermark of an entity, None if it has never been synced.
+        """
+        with self.database.db_session() as session:
+            watermark = session.get(MirrorWatermark, entity)
+            return None if watermark is None else watermark.last_modified
+
+    def set_watermark(self, entity: str, last_modified: str):
+        """
+        Store the last-modified watermark of an entity.
+        """
+        with self.database.db_session() as session:
+            session.merge(MirrorWatermark(entity=entity, last_modified=last_modified))
+
+    def get(self, model_type: ClarityBaseModel, item_id: str) -> Optional[ClarityBaseModel]:
+        """
+        Get a mirrored object without contacting Clarity.
+
+        Args:
+            model_type (ClarityBaseModel): One of the mirrored model types.
+            item_id (str): The id of the object.
+
+        Returns:
+            Optional[ClarityBaseModel]: The object, None if it is not mirrored.
+        """
+        key = (model_type.__name__, self.record_id(item_id))
+        with self.lock:
+            if key in self.instances:
+                return self.instances[key]
+
+        with self.database.db_session() as session:
+            record = session.get(MirrorRecord, key)
+            data = None if record is None else record.data
+        if data is None:
+            return None
+
+        instance = self.api.get_single_instance(data, self.api.STUB_EXP_KEY[model_type.__name__], model_type)
+        with self.lock:
+            self.instances[key] = instance
+        return instance
+
+    def ids(self, model_type: ClarityBaseModel) -> list:
+        """
+        List the ids of the mirrored objects of a model type.
+        """
+        with self.database.db_session() as session:
+            return list(session.scalars(select(MirrorRecord.id).where(MirrorRecord.entity == model_type.__name__)))
+
+    def store(self, model_type: ClarityBaseModel, uris: list) -> list:
+        """
+        Fetch objects from Clarity and replace their mirrored records.
+
+        The documents are fetched through map_requests so they follow the client concurrency setting.
+
+        Args:
+            model_type (ClarityBaseModel): The model type of the objects.
+            uris (list): The object uris.
+
+        Returns:
+            list: The fetched objects.
+        """
+        uris = list(dict.fromkeys(uri.split("?")[0] for uri in uris))
+        documents = self.api.map_requests(self.api.get_with_uri, uris, self.api.max_workers)
+
+        synced_at = datetime.now(timezone.utc)
+        instances = []
+        records = []
+        for uri, data in zip(uris, documents):
+            data = data.encode("utf-8") if isinstance(data, str) else data
+            instance = self.api.get_single_instance(data, self.api.STUB_EXP_KEY[model_type.__name__], model_type)
+            instances.append(instance)
+            records.append(MirrorRecord(entity=model_type.__name__, id=self.record_id(instance.id), uri=uri, data=data, synced_at=synced_at))
+
+        with self.database.db_session() as session:
+            for record in records:
+                session.merge(record)
+        with self.lock:
+            for instance in instances:
+                self.instances[(model_type.__name__, self.record_id(instance.id))] = instance
+        return instances
+
+    def poll(self, query, model_type: ClarityBaseModel, since: Optional[str]) -> list:
+        """
+        Fetch the objects modified since a watermark.
+
+        Args:
+            query (Callable): A get_stub_list wrapper accepting last_modified and expand_stubs.
+            model_type (ClarityBaseModel): The model type of the objects.
+            since (Optional[str]): The watermark, None for a full load.
+
+        Returns:
+            list: The fetched objects.
+        """
+        stubs = as_list(query(last_modified=since, expand_stubs=False))
+        return self.store(model_type, [stub.uri for stub in stubs])
+
+    def sync(self) -> dict:
+        """
+        Apply the changes made in Clarity since the last sync.
+
+        The watermarks are advanced to the start of the sync, less the overlap, only after all changes
+        are stored, so an interrupted sync is repeated in full on the next call.
+
+        Returns:
+            dict: The number of objects refetched for each mirrored model type.
+        """
+        started = self.rewind(self.now())
+        project_since = self.get_watermark("Project")
+        process_since = self.get_watermark("Process")
+        log.debug(f"Syncing Clarity mirror, projects since {project_since}, processes since {process_since}")
+
+        # Projects and their samples
+        projects = self.poll(self.api.get_projects, Project, project_since)
+        sample_stubs = []
+        for project in projects:
+            sample_stubs.extend(as_list(self.api.get_samples(projectlimsid=project.id, expand_stubs=False)))
+        samples = self.store(Sample, [stub.uri for stub in sample_stubs])
+
+        # Processes and their output artifacts
+        processes = self.poll(self.api.get_processes, Process, process_since)
+        artifact_uris = [item.output.uri for process in processes for item in process.input_output_map if item.output is not None]
+        artifacts = self.store(Artifact, artifact_uris)
+
+        self.set_watermark("Project", started)
+        self.set_watermark("Process", started)
+        counts = {"Project": len(projects), "Sample": len(samples), "Process": len(processes), "Artifact": len(artifacts)}
+        log.info(f"Synced Clarity mirror: {counts}")
+        return counts
+
+    def entity_cache(self) -> "MirrorEntityCache":
+        """
+        An entity cache for ClarityHelperLims that serves the mirrored objects locally.
+        """
+        return MirrorEntityCache(self)
+
+
+class MirrorEntityCache(MutableMapping):
+    """
+    Identity map keyed by (model name, id) that falls back to the mirror for mirrored model types.
+
+    Objects stored by the run graphs are kept in memory only.
+    """
+
+    def __init__(self, mirror: ClarityMirror):
+        self.mirror = mirror
+        self.local = {}
+
+    def __getitem__(self, key: tuple) -> ClarityBaseModel:
+        if key in self.local:
+            return self.local[key]
+        model_type = self.mirror.MODELS.get(key[0])
+        instance = None if model_type is None else self.mirror.get(model_type, key[1])
+        if instance is None:
+            raise KeyError(key)
+        self.local[key] = instance
+        return instance
+
+    def __setitem__(self, key: tuple, instance: ClarityBaseModel):
+        self.local[key] = instance
+
+    def __delitem__(self, key: tuple):
+        del self.local[key]
+
+    def __iter__(self):
+        return iter(self.local)
+
+    def __len__(self) -> int:
+        return len(self.local)
@@ -6,7 +6,7 @@ Clarity API Data Models
 
 from typing import List, Optional, Union
 
-from pydantic import BaseModel, Field, field_validator, model_validator
+from pydantic import BaseModel, Field, PrivateAttr, field_validator, model_validator
 
 
 class ClarityBaseModel(BaseModel):
@@ -28,6 +28,33 @@ class ClarityBaseModel(BaseModel):
         """
         return "\n" + "\n".join(f"{key}: {value}" for key, value in self.model_dump().items())
 
+    @classmethod
+    def construct_trusted(cls, data: dict):
+        """
+        Build an instance from a trusted payload without running validation.
+
+        Only suitable for flat models whose fields are plain strings, such as stubs from list pages.
+        Returns None if a required field is missing so the caller can fall back to full validation.
+        """
+        values = {}
+        for name, field in cls.model_fields.items():
+            if field.alias is not None and field.alias in data:
+                values[name] = data[field.alias]
+            elif name in data:
+                values[name] = data[name]
+            elif field.is_required():
+                return None
+        uri = values.get("uri")
+        if uri:
+            values["id"] = uri.split("/")[-1]
+        return cls.model_construct(**values)
+
+    def validated(self):
+        """
+        Return a fully validated copy of an instance built with construct_trusted.
+        """
+        return type(self).model_validate(self.model_dump(by_alias=True, exclude_unset=True))
+
 
 class Stub(ClarityBaseModel):
     uri: str
@@ -47,6 +74,32 @@ class FileField(BaseModel):
     limsid: str
 
 
+class UdfModel(ClarityBaseModel):
+    """
+    Base for models carrying UDF fields, with a name to value index built on first use.
+    """
+
+    _udf_index: Optional[dict] = PrivateAttr(default=None)
+
+    @property
+    def udfs(self) -> dict:
+        """
+        The UDF values keyed by name. The first field wins if a name is repeated.
+        """
+        if self._udf_index is None:
+            index = {}
+            for item in self.udf_fields or []:
+                index.setdefault(item.name, item.value)
+            self._udf_index = index
+        return self._udf_index
+
+    def get_udf(self, name: str, default=None):
+        """
+        Get the value of a UDF field by name, or the default if the field is not set.
+        """
+        return self.udfs.get(name, default)
+
+
 class Address(ClarityBaseModel):
     street: Optional[str] = None
     city: Optional[str] = None
@@ -96,7 +149,7 @@ class Container(ClarityBaseModel):
         return values
 
 
-class Project(ClarityBaseModel):
+class Project(UdfModel):
     uri: str
     limsid: str
     name: str
@@ -153,7 +206,7 @@ class Researcher(ClarityBaseModel):
     lab: Stub
 
 
-class Artifact(ClarityBaseModel):
+class Artifact(UdfModel):
     limsid: str
     uri: str
     name: str
@@ -222,7 +275,7 @@ class Artifact(ClarityBaseModel):
         return values
 
 
-class Sample(ClarityBaseModel):
+class Sample(UdfModel):
     limsid: str
     uri: str
     name: str
@@ -266,7 +319,7 @@ class InputOutputMap(ClarityBaseModel):
     output: Optional[Output] = None
 
 
-class Process(ClarityBaseModel):
+class Process(UdfModel):
     limsid: str
     uri: str
     process_type: Stub = Field(alias="type")
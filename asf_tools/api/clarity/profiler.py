@@ -0,0 +1,118 @@
+"""
+Request profiling for the Clarity API client
+"""
+
+import json
+import threading
+from typing import Optional
+
+from rich.console import Console
+from rich.table import Table
+
+
+class ApiProfiler:
+    """
+    Collect request and parse events from ClarityLims hooks and summarise them per endpoint category.
+
+    Repeated requests for the same URI are counted so that N+1 query patterns in the helpers stand out.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.parse_times = {}
+        self.lock = threading.Lock()
+
+    def attach(self, api):
+        """
+        Register the collector hooks on a ClarityLims client.
+
+        Args:
+            api (ClarityLims): The client to profile.
+        """
+        api.add_hook("post_request", self.record_request)
+        api.add_hook("post_parse", self.record_parse)
+
+    def record_request(self, info: dict):
+        """
+        Record a completed request.
+        """
+        with self.lock:
+            self.requests.append(dict(info))
+
+    def record_parse(self, info: dict):
+        """
+        Record the time spent decoding a response.
+        """
+        with self.lock:
+            self.parse_times[info["category"]] = self.parse_times.get(info["category"], 0.0) + info["parse_time"]
+
+    def summary(self) -> dict:
+        """
+        Summarise the recorded requests per endpoint category.
+
+        Returns:
+            dict: Per category the number of requests, cache hits, errors, repeated URIs, bytes received,
+            total, mean and max latency and total parse time in seconds, sorted by total latency.
+        """
+        with self.lock:
+            requests = list(self.requests)
+            parse_times = dict(self.parse_times)
+
+        summary = {}
+        seen = set()
+        for info in requests:
+            row = summary.setdefault(
+                info["category"],
+                {"requests": 0, "cache_hits": 0, "errors": 0, "repeated": 0, "bytes": 0, "total_latency": 0.0, "max_latency": 0.0},
+            )
+            row["requests"] += 1
+            row["cache_hits"] += int(info["cache_hit"])
+            row["errors"] += int(not info["cache_hit"] and info["status"] != 200)
+            row["repeated"] += int(info["uri"] in seen)
+            row["bytes"] += info["bytes"]
+            row["total_latency"] += info["latency"]
+            row["max_latency"] = max(row["max_latency"], info["latency"])
+            seen.add(info["uri"])
+
+        for category, row in summary.items():
+            row["mean_latency"] = row["total_latency"] / row["requests"]
+            row["parse_time"] = parse_times.get(category, 0.0)
+        return dict(sorted(summary.items(), key=lambda item: item[1]["total_latency"], reverse=True))
+
+    def print_summary(self, console: Optional[Console] = None):
+        """
+        Print the per category summary as a table.
+
+        Args:
+            console (Optional[Console]): The rich console to print to. Defaults to stderr.
+        """
+        table = Table(title="Clarity API Profile", show_header=True, header_style="bold magenta")
+        table.add_column("Endpoint", style="bold")
+        for column in ["Requests", "Cache Hits", "Errors", "Repeated", "KB", "Total (s)", "Mean (ms)", "Max (ms)", "Parse (s)"]:
+            table.add_column(column, justify="right")
+        for category, row in self.summary().items():
+            table.add_row(
+                category,
+                str(row["requests"]),
+                str(row["cache_hits"]),
+                str(row["errors"]),
+                str(row["repeated"]),
+                f"{row['bytes'] / 1024:.1f}",
+                f"{row['total_latency']:.2f}",
+                f"{row['mean_latency'] * 1000:.1f}",
+                f"{row['max_latency'] * 1000:.1f}",
+                f"{row['parse_time']:.2f}",
+            )
+        (console or Console(stderr=True)).print(table)
+
+    def to_json(self, path: str):
+        """
+        Export the summary and every recorded request as JSON.
+
+        Args:
+            path (str): The output file path.
+        """
+        with self.lock:
+            requests = list(self.requests)
+        with open(path, "w", encoding="UTF-8") as file:
+            json.dump({"summary": self.summary(), "requests": requests}, file, indent=4)
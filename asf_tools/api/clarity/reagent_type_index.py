@@ -0,0 +1,193 @@
+"""
+Memoised reagent type barcode resolution for the Clarity API
+"""
+
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+from asf_tools.api.clarity.models import Stub
+
+
+def ambiguous_warning(name: str, count: int) -> str:
+    """
+    Build the warning for a reagent type name shared by several reagent types.
+    """
+    return f"{count} reagent types named '{name}' in Clarity. Returning fallback barcode."
+
+
+class ReagentTypeIndex:
+    """
+    In-memory map of reagent type names to their index sequence.
+
+    Each name is resolved to a (sequence, warning) pair: the sequence if the reagent type has a
+    Sequence attribute, otherwise the warning explaining why it could not be resolved. Lookups are
+    served from memory until the entry is older than the time to live. preload fills the map for all
+    reagent types, or those of one category, in one pass, and lookup_all uses it when resolving many
+    names at once is cheaper that way.
+    """
+
+    def __init__(self, api, ttl: Optional[float] = 86400):
+        """
+        Args:
+            api (ClarityLims): The client used to query reagent types.
+            ttl (Optional[float]): Seconds an entry stays valid. None keeps entries until cleared.
+        """
+        self.api = api
+        self.ttl = ttl
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, name: str) -> Optional[tuple]:
+        """
+        Get a resolved entry from the map if it has not expired.
+        """
+        with self.lock:
+            entry = self.entries.get(name)
+            if entry is None or (self.ttl is not None and time.monotonic() - entry[0] > self.ttl):
+                return None
+            return entry[1]
+
+    def set(self, name: str, resolved: tuple):
+        """
+        Store a resolved entry.
+        """
+        with self.lock:
+            self.entries[name] = (time.monotonic(), resolved)
+
+    def clear(self):
+        """
+        Remove all entries.
+        """
+        with self.lock:
+            self.entries.clear()
+
+    def lookup(self, name: str) -> tuple:
+        """
+        Resolve a reagent type name, querying the API on a miss.
+
+        Args:
+            name (str): The reagent type name, e.g. a reagent label.
+
+        Returns:
+            tuple: The sequence (or None) and the warning message (or None).
+        """
+        resolved = self.get(name)
+        if resolved is None:
+            resolved = self.fetch(name)
+            self.set(name, resolved)
+        return resolved
+
+    def lookup_all(self, names: list) -> dict:
+        """
+        Resolve several reagent type names, preloading all reagent types if that takes fewer requests.
+
+        Each name missing from the map costs two requests when looked up on its own, while preloading
+        costs one request per reagent type, so the reagent type list is used to pick the cheaper option.
+        Names still missing after a preload, e.g. labels that are not reagent types, are looked up.
+
+        Args:
+            names (list): The reagent type names, e.g. the reagent labels of a run.
+
+        Returns:
+            dict: The sequence (or None) and the warning message (or None) keyed by name.
+        """
+        missing = {name for name in names if self.get(name) is None}
+        if missing:
+            stubs = self.list_stubs()
+            if len(stubs) <= 2 * len(missing):
+                self.preload(stubs=stubs)
+        return {name: self.lookup(name) for name in names}
+
+    def list_stubs(self) -> list:
+        """
+        Get the stubs of all reagent types.
+        """
+        return self.api.get_instances("rtp:reagent-types", "reagent-type", Stub, "reagenttypes")
+
+    def fetch(self, name: str) -> tuple:
+        """
+        Query the API for a reagent type by name and resolve its sequence.
+
+        Args:
+            name (str): The reagent type name.
+
+        Returns:
+            tuple: The sequence (or None) and the warning message (or None).
+        """
+        # Fetch and parse reagent type data
+        xml_data = self.api.get_with_uri(self.api.construct_uri("reagenttypes"), params={"name": name})
+        data_dict = self.api.decode_xml(xml_data)
+
+        # Validate reagent-types and reagent-type keys
+        reagent_types = data_dict.get("rtp:reagent-types")
+        if not reagent_types:
+            return None, "Missing 'rtp:reagent-types' in Clarity XML response. Returning fallback barcode."
+
+        reagent_type = reagent_types.get("reagent-type")
+        if isinstance(reagent_type, list):
+            return None, ambiguous_warning(name, len(reagent_type))
+        if not reagent_type or "uri" not in reagent_type:
+            return None, "Missing 'reagent-type' or 'uri' in reagent-type data. Returning fallback barcode."
+
+        # Fetch and parse detailed reagent type data
+        return self.resolve_detail(self.api.decode_xml(self.api.get_with_uri(reagent_type["uri"])))
+
+    def resolve_detail(self, detail_dict: dict) -> tuple:
+        """
+        Resolve the sequence from a decoded reagent type document.
+
+        Args:
+            detail_dict (dict): The decoded rtp:reagent-type document.
+
+        Returns:
+            tuple: The sequence (or None) and the warning message (or None).
+        """
+        # Validate special-type and attribute keys
+        special_type = detail_dict.get("rtp:reagent-type", {}).get("special-type")
+        if not special_type or "attribute" not in special_type:
+            return None, "Missing 'special-type' or 'attribute' field in Clarity. Returning fallback barcode."
+        attribute = special_type["attribute"]
+
+        # Validate attribute name and value
+        if attribute.get("name") == "Sequence":
+            return attribute.get("value", "None"), None
+        return None, "Attribute 'name' is not 'Sequence'. Returning fallback barcode."
+
+    def preload(self, category: Optional[str] = None, stubs: Optional[list] = None) -> int:
+        """
+        Resolve all reagent types, or those of one category, into the map.
+
+        Names shared by several reagent types are stored as ambiguous without fetching their details,
+        as lookup would report them. The remaining details are fetched through map_requests so they
+        follow the client concurrency setting. The list stubs only carry the name and URI, so the
+        category is checked on the fetched details.
+
+        Args:
+            category (Optional[str]): Only keep reagent types of this reagent category.
+            stubs (Optional[list]): Reagent type stubs already listed. Listed from the API if not given.
+
+        Returns:
+            int: The number of reagent types stored.
+        """
+        if stubs is None:
+            stubs = self.list_stubs()
+        counts = Counter(stub.name for stub in stubs)
+        stubs = [stub for stub in stubs if stub.name is not None and counts[stub.name] == 1]
+        details = self.api.map_requests(lambda stub: self.api.decode_xml(self.api.get_with_uri(stub.uri)), stubs, self.api.max_workers)
+
+        resolved = {name: (None, ambiguous_warning(name, count)) for name, count in counts.items() if name is not None and count > 1}
+        for detail_dict in details:
+            reagent_type = detail_dict.get("rtp:reagent-type") or {}
+            name = reagent_type.get("name")
+            if name is None or (category is not None and reagent_type.get("reagent-category") != category):
+                continue
+            resolved[name] = self.resolve_detail(detail_dict)
+
+        for name, entry in resolved.items():
+            self.set(name, entry)
+        return len(resolved)
@@ -0,0 +1,253 @@
+"""
+Record and replay of Clarity API traffic
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import zipfile
+from typing import Dict, Optional
+
+import requests
+
+from asf_tools.api.clarity.cache import ResponseCache, cache_key
+
+
+log = logging.getLogger(__name__)
+
+ARCHIVE_VERSION = 1
+
+
+class ReplayMissError(KeyError):
+    """
+    Raised when a replayed request is not in the traffic archive.
+    """
+
+
+def request_key(method: str, uri: str, params: Optional[Dict[str, str]] = None, data: Optional[bytes] = None) -> str:
+    """
+    Build the archive key of a request from its method, URI, query parameters and body.
+
+    Args:
+        method (str): The HTTP method.
+        uri (str): The request URI.
+        params (Optional[Dict[str, str]]): Optional dictionary of query parameters.
+        data (Optional[bytes]): Optional request body, included as a digest.
+
+    Returns:
+        str: The request key.
+    """
+    key = f"{method} {cache_key(uri, params)}"
+    if data:
+        key += " " + hashlib.sha256(data if isinstance(data, bytes) else data.encode("utf-8")).hexdigest()
+    return key
+
+
+class TrafficArchive:
+    """
+    Compact archive of API responses keyed by request.
+
+    The archive is a zip file holding an index.json that maps each request key to its status code and
+    the sha256 digest of its response, and one deflate compressed blob per distinct response under
+    blobs/<digest>. Identical responses are stored once. The base URI of the recorded client is kept so
+    that a replaying client resolves the same request keys without a credentials file.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): The archive file path. An existing archive is loaded.
+        """
+        self.path = path
+        self.baseuri = None
+        self.index = {}
+        self.blobs = {}
+        self.lock = threading.Lock()
+        if os.path.exists(path):
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.index
+
+    def load(self):
+        """
+        Load the index and blobs of the archive file.
+        """
+        with zipfile.ZipFile(self.path, "r") as archive:
+            index = json.loads(archive.read("index.json"))
+            if index.get("version") != ARCHIVE_VERSION:
+                raise ValueError(f"Unsupported traffic archive version {index.get('version')} in {self.path}")
+            blobs = {digest: archive.read(f"blobs/{digest}") for digest in {entry["blob"] for entry in index["requests"].values()}}
+        with self.lock:
+            self.baseuri = index.get("baseuri")
+            self.index = index["requests"]
+            self.blobs = blobs
+        log.debug(f"Loaded {len(self.index)} requests from {self.path}")
+
+    def save(self):
+        """
+        Write the archive file, replacing it atomically.
+        """
+        with self.lock:
+            index = dict(self.index)
+            blobs = dict(self.blobs)
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        handle, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        os.close(handle)
+        try:
+            with zipfile.ZipFile(temp_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+                header = {"version": ARCHIVE_VERSION, "baseuri": self.baseuri, "requests": index}
+                archive.writestr("index.json", json.dumps(header, indent=1, sort_keys=True))
+                for digest, content in blobs.items():
+                    archive.writestr(f"blobs/{digest}", content)
+            os.replace(temp_path, self.path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        log.debug(f"Saved {len(index)} requests and {len(blobs)} responses to {self.path}")
+
+    def add(self, key: str, status_code: int, content: bytes):
+        """
+        Store the response of a request.
+
+        Args:
+            key (str): The request key.
+            status_code (int): The response status code.
+            content (bytes): The response content.
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        with self.lock:
+            self.blobs.setdefault(digest, content)
+            self.index[key] = {"status": status_code, "blob": digest}
+
+    def get(self, key: str) -> tuple:
+        """
+        Get the response of a request.
+
+        Args:
+            key (str): The request key.
+
+        Returns:
+            tuple: The status code and content of the response.
+
+        Raises:
+            ReplayMissError: If the request is not in the archive.
+        """
+        with self.lock:
+            entry = self.index.get(key)
+            if entry is None:
+                raise ReplayMissError(f"{key} not found in traffic archive {self.path}")
+            return entry["status"], self.blobs[entry["blob"]]
+
+    def isolate_cache(self, api):
+        """
+        Replace the response cache of a client with an empty in-memory one.
+
+        Responses served from a cache that outlives the invocation, such as a disk cache, never reach the
+        session, so they would be missing from a recording or answered without the archive on replay.
+
+        Args:
+            api (ClarityLims): The client.
+        """
+        if api.cache is not None:
+            log.debug("Replacing the response cache with an in-memory cache for record and replay")
+            api.cache = ResponseCache()
+
+    def record(self, api):
+        """
+        Record the requests sent by a ClarityLims client.
+
+        Args:
+            api (ClarityLims): The client to record.
+        """
+        self.isolate_cache(api)
+        self.baseuri = api.baseuri
+        api.request_session = RecordingSession(self, api.request_session)
+
+    def replay(self, api):
+        """
+        Answer the requests of a ClarityLims client from the archive without network access.
+
+        Args:
+            api (ClarityLims): The client to replay into.
+        """
+        self.isolate_cache(api)
+        if self.baseuri:
+            api.baseuri = self.baseuri
+        api.request_session = ReplaySession(self)
+
+
+class RecordingSession:
+    """
+    Session wrapper that stores every response in a traffic archive.
+    """
+
+    def __init__(self, archive: TrafficArchive, session: Optional[requests.Session] = None):
+        self.archive = archive
+        self.session = requests.Session() if session is None else session
+
+    def mount(self, prefix: str, adapter):
+        """
+        Mount a transport adapter on the wrapped session.
+        """
+        self.session.mount(prefix, adapter)
+
+    def get(self, uri: str, params: Optional[Dict[str, str]] = None, **kwargs) -> requests.Response:
+        """
+        Send a GET request and record the response.
+        """
+        response = self.session.get(uri, params=params, **kwargs)
+        self.archive.add(request_key("GET", uri, params), response.status_code, response.content)
+        return response
+
+    def post(self, uri: str, data: Optional[bytes] = None, **kwargs) -> requests.Response:
+        """
+        Send a POST request and record the response.
+        """
+        response = self.session.post(uri, data=data, **kwargs)
+        self.archive.add(request_key("POST", uri, data=data), response.status_code, response.content)
+        return response
+
+
+class ReplaySession:
+    """
+    Session stand-in that answers requests from a traffic archive.
+    """
+
+    def __init__(self, archive: TrafficArchive):
+        self.archive = archive
+
+    def mount(self, prefix: str, adapter):
+        """
+        Replayed requests use no transport adapters.
+        """
+
+    def response(self, uri: str, key: str) -> requests.Response:
+        """
+        Build the response of a recorded request.
+        """
+        status_code, content = self.archive.get(key)
+        response = requests.Response()
+        response.status_code = status_code
+        response._content = content  # pylint: disable=protected-access
+        response.url = uri
+        return response
+
+    def get(self, uri: str, params: Optional[Dict[str, str]] = None, **kwargs) -> requests.Response:  # pylint: disable=unused-argument
+        """
+        Answer a GET request from the archive.
+        """
+        return self.response(uri, request_key("GET", uri, params))
+
+    def post(self, uri: str, data: Optional[bytes] = None, **kwargs) -> requests.Response:  # pylint: disable=unused-argument
+        """
+        Answer a POST request from the archive.
+        """
+        return self.response(uri, request_key("POST", uri, data=data))
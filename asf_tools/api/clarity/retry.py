@@ -0,0 +1,168 @@
+"""
+Retry, backoff and circuit breaker policies for the Clarity API client
+"""
+
+import random
+import threading
+import time
+from typing import Optional
+
+import requests
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """
+    Raised when a request is refused because the circuit breaker is open.
+    """
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with jitter for failed requests.
+
+    Timeouts, connection errors and responses with a retryable status code are retried until
+    max_attempts is reached. Only idempotent requests are retried. The default policy makes a single
+    attempt, so retries are opt-in.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 1,
+        backoff_factor: float = 0.5,
+        max_backoff: float = 30,
+        jitter: float = 0.5,
+        retry_status_codes: tuple = (429, 500, 502, 503, 504),
+    ):
+        """
+        Args:
+            max_attempts (int): Total number of attempts per request. The default of 1 disables retries.
+            backoff_factor (float): Delay in seconds before the first retry, doubled for each further retry.
+            max_backoff (float): Upper bound of the delay in seconds.
+            jitter (float): Fraction of the delay that is randomised to spread out retries from parallel requests.
+            retry_status_codes (tuple): Response status codes that are retried.
+        """
+        self.max_attempts = max_attempts
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_status_codes = retry_status_codes
+
+    def backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """
+        Get the delay before the next attempt.
+
+        Args:
+            attempt (int): The number of the attempt that failed, starting at 1.
+            retry_after (Optional[str]): Value of the Retry-After response header, honoured if given in seconds.
+
+        Returns:
+            float: The delay in seconds.
+        """
+        delay = min(self.max_backoff, self.backoff_factor * 2 ** (attempt - 1))
+        delay = random.uniform(delay * (1 - self.jitter), delay)
+        if retry_after is not None and retry_after.isdigit():
+            delay = max(delay, min(self.max_backoff, float(retry_after)))
+        return delay
+
+
+class CircuitBreaker:
+    """
+    Stop sending requests to a server after repeated consecutive failures.
+
+    Once failure_threshold failures are seen the circuit opens and requests are refused with
+    CircuitOpenError. After reset_timeout seconds a single trial request is let through; the
+    circuit closes again if it succeeds and reopens if it fails.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 10, reset_timeout: float = 30):
+        """
+        Args:
+            failure_threshold (int): Consecutive failures that open the circuit.
+            reset_timeout (float): Seconds the circuit stays open before a trial request is allowed.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.lock = threading.Lock()
+
+    def before_request(self, uri: str):
+        """
+        Check a request may be sent, raising CircuitOpenError if not.
+        """
+        with self.lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return
+            raise CircuitOpenError(f"Circuit open after {self.failures} consecutive failures, not requesting {uri}")
+
+    def record_success(self):
+        """
+        Record a successful request, closing the circuit.
+        """
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        """
+        Record a failed request, opening the circuit if the threshold is reached or the trial request failed.
+        """
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class RequestMetrics:
+    """
+    Thread safe counters of request attempts made by the client.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.attempts = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+        self.status_codes = {}
+        self.lock = threading.Lock()
+
+    def increment(self, name: str):
+        """
+        Increment a counter.
+        """
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def record_status(self, status_code: int):
+        """
+        Count a response status code.
+        """
+        with self.lock:
+            self.status_codes[status_code] = self.status_codes.get(status_code, 0) + 1
+
+    def stats(self) -> dict:
+        """
+        Return the counters.
+
+        Returns:
+            dict: The number of requests, attempts, retries, failures, rejected requests and responses per status code.
+        """
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "attempts": self.attempts,
+                "retries": self.retries,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "status_codes": dict(self.status_codes),
+            }
@@ -0,0 +1,158 @@
+"""
+Run scoped identity map of Clarity objects
+"""
+
+import threading
+from collections.abc import MutableMapping
+from typing import Callable, Optional
+
+from asf_tools.api.clarity.models import ClarityBaseModel, Container
+
+
+class EntityCache(MutableMapping):
+    """
+    Thread safe identity map keyed by (model name, id), shared by the run graphs of runs processed together.
+
+    Concurrent misses for the same key run the loader once, and the other callers wait for its result.
+    """
+
+    def __init__(self, objects: Optional[MutableMapping] = None):
+        """
+        Args:
+            objects (Optional[MutableMapping]): The mapping holding the objects. Defaults to a new dict.
+        """
+        self.objects = {} if objects is None else objects
+        self.lock = threading.Lock()
+        self.loading = {}
+
+    def __getitem__(self, key: tuple) -> ClarityBaseModel:
+        with self.lock:
+            return self.objects[key]
+
+    def __setitem__(self, key: tuple, instance: ClarityBaseModel):
+        with self.lock:
+            self.objects[key] = instance
+
+    def __delitem__(self, key: tuple):
+        with self.lock:
+            del self.objects[key]
+
+    def __contains__(self, key: tuple) -> bool:
+        with self.lock:
+            return key in self.objects
+
+    def __iter__(self):
+        with self.lock:
+            return iter(list(self.objects))
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.objects)
+
+    def setdefault(self, key: tuple, default: ClarityBaseModel = None) -> ClarityBaseModel:
+        with self.lock:
+            if key not in self.objects:
+                self.objects[key] = default
+            return self.objects[key]
+
+    def get_or_load(self, key: tuple, loader: Callable) -> ClarityBaseModel:
+        """
+        Get an instance, running the loader if no other thread is loading it already.
+
+        Args:
+            key (tuple): The model name and id of the instance.
+            loader (Callable): Function returning the instance if it is not in the map.
+
+        Returns:
+            ClarityBaseModel: The stored instance.
+        """
+        while True:
+            with self.lock:
+                if key in self.objects:
+                    return self.objects[key]
+                loaded = self.loading.get(key)
+                if loaded is None:
+                    loaded = self.loading[key] = threading.Event()
+                    break
+            # Another thread is loading the key, take its result or load it if that failed
+            loaded.wait()
+
+        try:
+            instance = loader()
+            with self.lock:
+                self.objects[key] = instance
+            return instance
+        finally:
+            with self.lock:
+                del self.loading[key]
+            loaded.set()
+
+
+class RunGraph:
+    """
+    In-memory identity map of the Clarity objects belonging to a single run.
+
+    Objects are keyed by model type and id so that each container, artifact, sample, project,
+    researcher and lab is fetched at most once while the samplesheet sections are built.
+    """
+
+    def __init__(self, run_id: Optional[str] = None, container: Optional[Container] = None, objects: Optional[dict] = None):
+        """
+        Args:
+            run_id (Optional[str]): The run the graph belongs to.
+            container (Optional[Container]): The flowcell container of the run.
+            objects (Optional[MutableMapping]): Identity map shared with other graphs, so that runs processed
+                together fetch common projects, researchers and labs once. A mapping that is not an EntityCache
+                is wrapped in one, so graphs sharing it across threads must be given the same EntityCache.
+        """
+        self.run_id = run_id
+        self.container = container
+        self.pools = []
+        self.sample_ids = []
+        self.lineage_levels = []
+        self.objects = objects if isinstance(objects, EntityCache) else EntityCache(objects)
+
+    def __contains__(self, key: tuple) -> bool:
+        return key in self.objects
+
+    def __len__(self) -> int:
+        return len(self.objects)
+
+    def add(self, model_type: ClarityBaseModel, item_id: str, instance: ClarityBaseModel) -> ClarityBaseModel:
+        """
+        Store an instance under its model type and id, keeping the instance already stored by another thread.
+
+        Returns:
+            ClarityBaseModel: The stored instance.
+        """
+        return self.objects.setdefault((model_type.__name__, item_id), instance)
+
+    def get(self, model_type: ClarityBaseModel, item_id: str, loader: Optional[Callable] = None) -> ClarityBaseModel:
+        """
+        Get an instance from the map, loading and storing it on first use.
+
+        Args:
+            model_type (ClarityBaseModel): The model type of the instance.
+            item_id (str): The id of the instance.
+            loader (Optional[Callable]): Function returning the instance if it is not in the map.
+
+        Returns:
+            ClarityBaseModel: The stored instance.
+
+        Raises:
+            KeyError: If the instance is not in the map and no loader is given.
+        """
+        key = (model_type.__name__, item_id)
+        if loader is None:
+            try:
+                return self.objects[key]
+            except KeyError as err:
+                raise KeyError(f"{model_type.__name__} {item_id} not in run graph") from err
+        return self.objects.get_or_load(key, loader)
+
+    @property
+    def samples(self) -> list:
+        """
+        The unique samples of the run in the order they appear in the pool artifacts.
+        """
+        return [self.objects[("Sample", sample_id)] for sample_id in self.sample_ids]
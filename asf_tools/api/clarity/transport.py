@@ -0,0 +1,93 @@
+"""
+Connection pooling and rate limiting for the Clarity API client
+"""
+
+import math
+import threading
+import time
+from typing import Optional
+
+import requests
+
+
+class RateLimiter:
+    """
+    Thread safe token bucket limiting the rate of requests.
+
+    Tokens are added at rate per second up to burst. Each request takes one token, waiting for the
+    next token if the bucket is empty.
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        """
+        Args:
+            rate (float): Sustained requests per second.
+            burst (Optional[int]): Maximum number of requests sent back to back. Defaults to the rate rounded up.
+        """
+        if rate <= 0:
+            raise ValueError("rate must be greater than zero")
+        self.rate = rate
+        self.burst = math.ceil(rate) if burst is None else burst
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Take a token, sleeping until one is available.
+
+        Returns:
+            float: The seconds spent waiting.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            # A negative balance reserves the next token, so waiting callers are served in order
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+def create_session(pool_size: int = 100, pool_block: bool = False) -> requests.Session:
+    """
+    Create a session with a connection pool of pool_size mounted for both http and https.
+
+    Args:
+        pool_size (int): Maximum number of kept-alive connections per host.
+        pool_block (bool): Wait for a free connection instead of opening extra short-lived ones.
+
+    Returns:
+        requests.Session: The session.
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=pool_block)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+SHARED_SESSIONS = {}
+SHARED_SESSIONS_LOCK = threading.Lock()
+
+
+def shared_session(pool_size: int = 100, pool_block: bool = False) -> requests.Session:
+    """
+    Get the process wide session for a pool configuration, creating it on first use.
+
+    Clients sharing a session reuse each other's kept-alive connections instead of each opening their own.
+
+    Args:
+        pool_size (int): Maximum number of kept-alive connections per host.
+        pool_block (bool): Wait for a free connection instead of opening extra short-lived ones.
+
+    Returns:
+        requests.Session: The shared session.
+    """
+    with SHARED_SESSIONS_LOCK:
+        key = (pool_size, pool_block)
+        if key not in SHARED_SESSIONS:
+            SHARED_SESSIONS[key] = create_session(pool_size, pool_block)
+        return SHARED_SESSIONS[key]
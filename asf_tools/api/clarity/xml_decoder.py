@@ -0,0 +1,92 @@
+"""
+XML decoders for Clarity API responses
+
+Both decoders return the same nested dictionary layout that the Clarity models are built from:
+qualified tag names as keys (e.g. udf:field), attributes as plain keys, element text under #text
+when an element also has attributes or children, and repeated children collected into lists.
+"""
+
+import re
+from xml.etree import ElementTree
+
+import xmltodict
+
+
+NAMESPACE_PATTERN = re.compile(rb'xmlns:([\w.-]+)="([^"]*)"')
+
+
+def parse_xmltodict(xml_data) -> dict:
+    """
+    Decode an XML document with xmltodict.
+
+    Args:
+        xml_data (Union[str, bytes]): The XML data.
+
+    Returns:
+        dict: The decoded document.
+    """
+    return xmltodict.parse(xml_data, process_namespaces=False, attr_prefix="")
+
+
+def parse_etree(xml_data) -> dict:
+    """
+    Decode an XML document with the C ElementTree parser and a single conversion pass.
+
+    The result matches parse_xmltodict except that namespace declarations (xmlns attributes)
+    are not reported, as no model reads them.
+
+    Args:
+        xml_data (Union[str, bytes]): The XML data.
+
+    Returns:
+        dict: The decoded document.
+    """
+    if isinstance(xml_data, str):
+        xml_data = xml_data.encode("utf-8")
+
+    # Map namespace uris back to the prefixes used in the document
+    prefixes = {uri.decode("utf-8"): prefix.decode("utf-8") for prefix, uri in NAMESPACE_PATTERN.findall(xml_data)}
+    names = {}
+
+    def qualify(tag: str) -> str:
+        name = names.get(tag)
+        if name is None:
+            name = tag
+            if tag[0] == "{":
+                uri, local = tag[1:].split("}", 1)
+                prefix = prefixes.get(uri, "")
+                name = f"{prefix}:{local}" if prefix else local
+            names[tag] = name
+        return name
+
+    def convert(elem):
+        item = {qualify(key): value for key, value in elem.attrib.items()} if elem.attrib else None
+        text = elem.text
+        for child in elem:
+            if item is None:
+                item = {}
+            child_name = qualify(child.tag)
+            child_value = convert(child)
+            if child_name not in item:
+                item[child_name] = child_value
+            elif isinstance(item[child_name], list):
+                item[child_name].append(child_value)
+            else:
+                item[child_name] = [item[child_name], child_value]
+            if child.tail:
+                text = (text or "") + child.tail
+        text = (text.strip() if text else None) or None
+        if item is None:
+            return text
+        if text is not None:
+            item["#text"] = text
+        return item
+
+    root = ElementTree.fromstring(xml_data)
+    return {qualify(root.tag): convert(root)}
+
+
+XML_DECODERS = {
+    "xmltodict": parse_xmltodict,
+    "etree": parse_etree,
+}
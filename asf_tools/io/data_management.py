@@ -166,9 +166,9 @@ class DataManagement:
         if not self.storage_interface.exists(data_path):
             raise FileNotFoundError(f"{data_path} does not exist.")
 
-        # collect all sub dirs
+        # collect all sub dirs, bottom up as the order is not needed and the remote walk then streams
         source_paths_list = []
-        for root, dirs, files in self.storage_interface.walk(data_path):  # pylint: disable=unused-variable
+        for root, dirs, files in self.storage_interface.walk(data_path, topdown=False):  # pylint: disable=unused-variable
             if not dirs:
                 source_paths_list.append(root)
 
@@ -6,17 +6,25 @@ import logging
 import os
 import stat
 import subprocess
+import threading
+import time
+from contextlib import contextmanager
 from enum import Enum
+from typing import Optional
 
 from asf_tools.io.utils import check_file_exist, list_directory_names
 from asf_tools.ssh.file_object import FileType
 from asf_tools.ssh.nemo import Nemo
+from asf_tools.ssh.nemo_pool import NemoPool
 
 
 # File permission constants
 PERM777 = stat.S_IRUSR | stat.S_IWUSR | stat.S_IXUSR | stat.S_IRGRP | stat.S_IWGRP | stat.S_IXGRP | stat.S_IROTH | stat.S_IWOTH | stat.S_IXOTH
 PERM666 = stat.S_IRUSR | stat.S_IWUSR | stat.S_IRGRP | stat.S_IWGRP | stat.S_IROTH | stat.S_IWOTH
 
+# Seconds listings and existence checks are cached for by the CLI scans
+SCAN_CACHE_TTL = 60
+
 # Logger setup
 log = logging.getLogger()
 
@@ -30,24 +38,227 @@ class InterfaceType(Enum):
     NEMO = 2
 
 
+class BatchOperationError(RuntimeError):
+    """
+    Raised when an operation of a storage batch fails.
+    """
+
+
+class StorageBatch:
+    """
+    File operations queued by StorageInterface.batch, with the paths they create so that
+    they can be read back before the batch runs.
+    """
+
+    def __init__(self):
+        self.operations = []
+        self.created = set()
+        self.contents = {}
+        self.links = set()
+
+    def add(self, operation: str, *args):
+        """
+        Queue an operation.
+
+        :param operation: The name of the StorageInterface method.
+        :param args: The arguments of the method.
+        """
+        self.operations.append((operation, args))
+        if operation == "make_dirs":
+            path = os.path.normpath(args[0])
+            while path not in self.created and path != os.path.dirname(path):
+                self.created.add(path)
+                path = os.path.dirname(path)
+        elif operation == "write_file":
+            path = os.path.normpath(args[0])
+            self.created.add(path)
+            self.contents[path] = args[1]
+        elif operation == "symlink":
+            path = os.path.normpath(args[1])
+            self.created.add(path)
+            self.contents.pop(path, None)
+            self.links.add(path)
+
+    def clear(self):
+        """
+        Forget the queued operations once they have run.
+        """
+        self.operations = []
+        self.created = set()
+        self.contents = {}
+        self.links = set()
+
+    def exists(self, path: str) -> bool:
+        """
+        Check if a queued operation creates a path.
+        """
+        return os.path.normpath(path) in self.created
+
+    def read_file(self, path: str):
+        """
+        Get the content of a queued write, or None if the file is not written by the batch.
+        """
+        return self.contents.get(os.path.normpath(path))
+
+    def shadows(self, path: str) -> bool:
+        """
+        Check if a path is at or below a queued symbolic link, so its state depends on the batch running.
+        """
+        path = os.path.normpath(path)
+        return any(path == link or path.startswith(link + os.sep) for link in self.links)
+
+
 class StorageInterface:
     """
     A class to provide a unified interface for file and folder operations,
     either locally or remotely via Nemo.
     """
 
-    def __init__(self, interface_type: InterfaceType, **kwargs):
+    def __init__(self, interface_type: InterfaceType, cache_ttl: float = 0, pool_size: int = 1, **kwargs):
         """
         Initialize the StorageInterface.
 
         :param interface_type: The type of interface (LOCAL or NEMO).
+        :param cache_ttl: Seconds directory listings and existence checks are cached for. The cache is
+                          disabled when 0. Writes through the interface invalidate the paths they change.
+        :param pool_size: Number of Nemo connections kept for running operations from several threads
+                          concurrently. A single connection is used when 1.
         :param kwargs: Additional arguments for initializing the Nemo interface.
         """
         self.interface_type = interface_type
+        self.local = threading.local()
+        self.cache_ttl = cache_ttl
+        self.cache = {}
+        self.cache_generation = 0
+        self.cache_lock = threading.Lock()
         if self.interface_type == InterfaceType.LOCAL:
             self.interface = None
         elif self.interface_type == InterfaceType.NEMO:
-            self.interface = Nemo(**kwargs)
+            self.interface = NemoPool(pool_size, **kwargs) if pool_size > 1 else Nemo(**kwargs)
+
+    def cached(self, kind: str, path: str, load, *key):
+        """
+        Get a listing or existence check of a path from the cache, loading it when missing or expired.
+
+        :param kind: The kind of result, which keeps different results for one path apart.
+        :param path: The path the result is about, used for invalidation.
+        :param load: Callable loading the result.
+        :param key: Further arguments the result depends on.
+        :return: The result, with lists copied so that callers can change them.
+        """
+        if self.cache_ttl <= 0:
+            return load()
+
+        cache_key = (kind, os.path.normpath(path)) + key
+        with self.cache_lock:
+            entry = self.cache.get(cache_key)
+            if entry is not None and time.monotonic() - entry[0] < self.cache_ttl:
+                value = entry[1]
+                return list(value) if isinstance(value, list) else value
+            generation = self.cache_generation
+
+        loaded_at = time.monotonic()
+        value = load()
+        with self.cache_lock:
+            # A write invalidating the cache while loading may have changed the result
+            if generation == self.cache_generation:
+                self.cache[cache_key] = (loaded_at, value)
+        return list(value) if isinstance(value, list) else value
+
+    def invalidate(self, path: Optional[str] = None):
+        """
+        Drop the cached results a change to a path can affect.
+
+        The results of the path, of its parents, whose listings and existence may change, and of
+        everything below it are dropped.
+
+        :param path: The changed path. The whole cache is cleared when None.
+        """
+        with self.cache_lock:
+            self.cache_generation += 1
+            if path is None:
+                self.cache.clear()
+                return
+            path = os.path.normpath(path)
+            for cache_key in list(self.cache):
+                cached_path = cache_key[1]
+                if cached_path == path or path.startswith(cached_path.rstrip(os.sep) + os.sep) or cached_path.startswith(path + os.sep):
+                    del self.cache[cache_key]
+
+    def current_batch(self):
+        """
+        Get the batch open in the calling thread, or None.
+        """
+        return getattr(self.local, "batch", None)
+
+    @contextmanager
+    def batch(self):
+        """
+        Queue the write operations of a block and run them together when the block exits.
+
+        make_dirs, write_file, chmod and symlink are queued. exists and read_file see the queued
+        writes, and any other operation runs the queue first. Over NEMO the queue is sent as one
+        remote script, and on LOCAL the operations run in order. If the block raises, the queued
+        operations are discarded and the error is raised unchanged; call flush first to keep writes
+        that must survive a later error. Batches are per thread, and a nested batch joins the outer one.
+
+        :yield: The StorageBatch collecting the operations.
+        :raises BatchOperationError: If a queued operation fails over NEMO. Operations after it do not run.
+        """
+        if self.current_batch() is not None:
+            yield self.current_batch()
+            return
+
+        batch = StorageBatch()
+        self.local.batch = batch
+        try:
+            yield batch
+        finally:
+            self.local.batch = None
+        self.run_batch(batch)
+
+    def flush(self):
+        """
+        Run the operations queued by the batch open in the calling thread, if any.
+        """
+        batch = self.current_batch()
+        if batch is None or not batch.operations:
+            return
+        self.local.batch = None
+        try:
+            self.run_batch(batch)
+        finally:
+            self.local.batch = batch
+
+    def run_batch(self, batch: StorageBatch):
+        """
+        Run the queued operations of a batch.
+
+        :param batch: The batch to run.
+        """
+        operations = batch.operations
+        batch.clear()
+        if not operations:
+            return
+
+        if self.interface_type == InterfaceType.LOCAL:
+            for operation, args in operations:
+                getattr(self, operation)(*args)
+        elif self.interface_type == InterfaceType.NEMO:
+            commands = []
+            for operation, args in operations:
+                if operation == "chmod":
+                    args = (args[0], self.parse_permission_string(args[1])[1])
+                commands.append(self.interface.batch_command(operation, *args))
+
+            statuses, stderr = self.interface.run_batch(commands)
+            for operation, args in operations[: len(statuses)]:
+                self.invalidate(args[1] if operation == "symlink" else args[0])
+            if len(statuses) < len(commands) or statuses[-1] != 0:
+                failed = len(statuses) - 1 if statuses and statuses[-1] != 0 else len(statuses)
+                operation, args = operations[failed]
+                raise BatchOperationError(f"Batch operation {failed + 1} of {len(operations)} failed: {operation} {args[0]}: {stderr}")
+            log.debug(f"Ran a batch of {len(operations)} operations")
 
     def list_directory(self, path):
         """
@@ -56,10 +267,21 @@ class StorageInterface:
         :param path: The path to the directory.
         :return: A list of directory contents.
         """
+        self.flush()
         if self.interface_type == InterfaceType.LOCAL:
-            return os.listdir(path)
+            return self.cached("listdir", path, lambda: os.listdir(path))
         elif self.interface_type == InterfaceType.NEMO:
-            return self.interface.list_directory(path)
+            return [obj.name for obj in self.list_directory_objects(path)]
+
+    def list_directory_objects(self, path):
+        """
+        List the contents of a remote directory as FileObjects.
+
+        :param path: The path to the directory.
+        :return: A list of FileObject instances.
+        """
+        self.flush()
+        return self.cached("objects", path, lambda: self.interface.list_directory_objects(path))
 
     def list_directories_with_links(self, path: str, max_date=None):
         """
@@ -68,11 +290,12 @@ class StorageInterface:
         :param path: The path to the directory.
         :return: A list of directories and their symbolic links.
         """
+        self.flush()
         dirlist = []
         if self.interface_type == InterfaceType.LOCAL:
-            return list_directory_names(path)
+            return self.cached("dirnames", path, lambda: list_directory_names(path))
         elif self.interface_type == InterfaceType.NEMO:
-            dir_objs = self.interface.list_directory_objects(path)
+            dir_objs = self.list_directory_objects(path)
             if max_date:
                 dir_objs = [obj for obj in dir_objs if obj.last_modified >= max_date]
             for obj in dir_objs:
@@ -90,10 +313,17 @@ class StorageInterface:
         :param path: The path to check.
         :return: True if the file or directory exists, False otherwise.
         """
+        batch = self.current_batch()
+        if batch is not None:
+            if batch.exists(path):
+                return True
+            if batch.shadows(path):
+                self.flush()
+
         if self.interface_type == InterfaceType.LOCAL:
-            return os.path.exists(path)
+            return self.cached("exists", path, lambda: os.path.exists(path))
         elif self.interface_type == InterfaceType.NEMO:
-            return self.interface.exists(path)
+            return self.cached("exists", path, lambda: self.interface.exists(path))
 
     def exists_with_pattern(self, path, pattern):
         """
@@ -103,10 +333,11 @@ class StorageInterface:
         :param pattern: The pattern to match.
         :return: True if the file or directory exists and matches the pattern, False otherwise.
         """
+        self.flush()
         if self.interface_type == InterfaceType.LOCAL:
-            return check_file_exist(path, pattern)
+            return self.cached("pattern", path, lambda: check_file_exist(path, pattern), pattern)
         elif self.interface_type == InterfaceType.NEMO:
-            return self.interface.exists_with_pattern(path, pattern)
+            return self.cached("pattern", path, lambda: self.interface.exists_with_pattern(path, pattern), pattern)
 
     def run_command(self, command):
         """
@@ -115,6 +346,9 @@ class StorageInterface:
         :param command: The command to run.
         :return: The result of the command execution.
         """
+        self.flush()
+        # The command may change anything
+        self.invalidate()
         if self.interface_type == InterfaceType.NEMO:
             return self.interface.run_command(command)
         else:
@@ -126,10 +360,16 @@ class StorageInterface:
 
         :param path: The path of the directory to create.
         """
+        batch = self.current_batch()
+        if batch is not None:
+            batch.add("make_dirs", path)
+            return
+
         if self.interface_type == InterfaceType.LOCAL:
             os.makedirs(path, exist_ok=True)
         elif self.interface_type == InterfaceType.NEMO:
             self.interface.make_dirs(path)
+        self.invalidate(path)
 
     def write_file(self, path, content):
         """
@@ -138,11 +378,17 @@ class StorageInterface:
         :param path: The path of the file to write.
         :param content: The content to write to the file.
         """
+        batch = self.current_batch()
+        if batch is not None:
+            batch.add("write_file", path, content)
+            return
+
         if self.interface_type == InterfaceType.LOCAL:
             with open(path, "w", encoding="UTF-8") as f:
                 f.write(content)
         elif self.interface_type == InterfaceType.NEMO:
             self.interface.write_file(path, content)
+        self.invalidate(path)
 
     def read_file(self, path):
         """
@@ -151,6 +397,14 @@ class StorageInterface:
         :param path: The path of the file to read.
         :return: The contents of the file.
         """
+        batch = self.current_batch()
+        if batch is not None:
+            content = batch.read_file(path)
+            if content is not None:
+                return content
+            if batch.shadows(path):
+                self.flush()
+
         if self.interface_type == InterfaceType.LOCAL:
             with open(path, "r", encoding="UTF-8") as f:
                 return f.read()
@@ -206,22 +460,34 @@ class StorageInterface:
         :param path: The path of the file or directory.
         :param permission_string: The permissions to set.
         """
+        batch = self.current_batch()
+        if batch is not None:
+            self.parse_permission_string(permission_string)
+            batch.add("chmod", path, permission_string)
+            return
+
         if self.interface_type == InterfaceType.LOCAL:
             perm, _ = self.parse_permission_string(permission_string)
             os.chmod(path, perm)
         elif self.interface_type == InterfaceType.NEMO:
             _, num_perm = self.parse_permission_string(permission_string)
             self.interface.chmod(path, num_perm)
+        # The listings of the parent carry the permissions
+        self.invalidate(path)
 
-    def walk(self, path):
+    def walk(self, path, topdown=True):
         """
         Walk through a directory and yield all files.
+
+        :param path: The root directory to walk.
+        :param topdown: Yield each directory before its subdirectories.
         """
+        self.flush()
         if self.interface_type == InterfaceType.LOCAL:
-            for root, folders, files in os.walk(path):
+            for root, folders, files in os.walk(path, topdown=topdown):
                 yield root, folders, files
         elif self.interface_type == InterfaceType.NEMO:
-            for root, folders, files in self.interface.walk(path):
+            for root, folders, files in self.interface.walk(path, topdown=topdown):
                 yield root, folders, files
 
     def symlink(self, target, link_name):
@@ -231,8 +497,14 @@ class StorageInterface:
         :param target: The target of the symbolic link.
         :param link_name: The name of the symbolic link.
         """
+        batch = self.current_batch()
+        if batch is not None:
+            batch.add("symlink", target, link_name)
+            return
+
         if self.interface_type == InterfaceType.LOCAL:
             cmd = f"ln -sfn {target} {link_name}"
             subprocess.run(cmd, shell=True, check=True)
         elif self.interface_type == InterfaceType.NEMO:
             self.interface.symlink(target, link_name)
+        self.invalidate(link_name)
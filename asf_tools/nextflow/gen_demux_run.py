@@ -6,6 +6,7 @@ import csv
 import io
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 from asf_tools.api.clarity.clarity_helper_lims import ClarityHelperLims
 from asf_tools.illumina.illumina_utils import extract_illumina_runid_frompath
@@ -33,6 +34,7 @@ def run_cli(
     container_cache: str,
     pipeline_dir: str,
     runs_dir: str,
+    max_workers: int = 1,
 ):
     log.debug("Scanning run folder")
 
@@ -41,27 +43,23 @@ def run_cli(
     log.info(f"Found {len(dir_diff)} completed runs")
 
     # Process runs
-    for run_name in dir_diff:
-        try:
-            process_run(
-                api,
-                storage_interface,
-                run_name,
-                data_type,
-                source_dir,
-                target_dir,
-                samplesheet_only,
-                use_api,
-                nextflow_version,
-                nextflow_cache,
-                nextflow_work,
-                container_cache,
-                pipeline_dir,
-                runs_dir,
-            )
-        except Exception as e:  # pylint: disable=broad-exception-caught
-            # Catch any possible errors generated by the connection to the API, generating the samplesheet or generating the run script
-            log.error(f"Error for {run_name}: {e}")
+    process_runs(
+        api,
+        storage_interface,
+        dir_diff,
+        data_type,
+        source_dir,
+        target_dir,
+        samplesheet_only,
+        use_api,
+        nextflow_version,
+        nextflow_cache,
+        nextflow_work,
+        container_cache,
+        pipeline_dir,
+        runs_dir,
+        max_workers,
+    )
 
     return 0
 
@@ -133,6 +131,63 @@ def check_runs_no_cli(storage_interface: StorageInterface, data_manager: DataMan
     return completed_runs
 
 
+def process_runs(
+    api: ClarityHelperLims,
+    storage_interface: StorageInterface,
+    run_names: list,
+    mode: DataTypeMode,
+    source_dir: str,
+    target_dir: str,
+    samplesheet_only: bool,
+    use_api: bool,
+    nextflow_version: str,
+    nextflow_cache: str,
+    nextflow_work: str,
+    container_cache: str,
+    pipeline_dir: str,
+    run_file_runs_dir: str,
+    max_workers: int = 1,
+) -> dict:
+    """
+    Process several runs with a bounded pool of worker threads.
+
+    The runs share the API client, so its response cache and entity cache serve the projects, researchers
+    and labs common to several runs. An error in one run is logged and does not stop the others.
+
+    Returns:
+        dict: The error message of each run that failed, keyed by run name.
+    """
+
+    def process(run_name):
+        try:
+            process_run(
+                api,
+                storage_interface,
+                run_name,
+                mode,
+                source_dir,
+                target_dir,
+                samplesheet_only,
+                use_api,
+                nextflow_version,
+                nextflow_cache,
+                nextflow_work,
+                container_cache,
+                pipeline_dir,
+                run_file_runs_dir,
+            )
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            # Catch any possible errors generated by the connection to the API, generating the samplesheet or generating the run script
+            log.error(f"Error for {run_name}: {e}")
+            return str(e)
+        return None
+
+    run_names = list(run_names)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        errors = dict(zip(run_names, executor.map(process, run_names)))
+    return {run_name: error for run_name, error in errors.items() if error is not None}
+
+
 def process_run(
     api: ClarityHelperLims,
     storage_interface: StorageInterface,
@@ -156,61 +211,71 @@ def process_run(
     log.info(f"Processing: {run_name}")
     sample_count = 0
 
-    # Create folder
-    folder_path = os.path.join(target_dir, run_name)
-    if samplesheet_only is False and not storage_interface.exists(folder_path):
-        storage_interface.make_dirs(folder_path)
-
-    # Samplesheet path
-    samplesheet_path = os.path.join(folder_path, "samplesheet.csv")
-
-    if use_api is False:
-        # Write default samplesheet
-        sample_count = 1
-        with open(samplesheet_path, "w", encoding="UTF-8") as file:
-            file.write("id,sample_name,group,user,project_id,project_limsid,project_type,reference_genome,data_analysis_type,barcode\n")
-            file.write("sample_01,sample_01,asf,no_name,no_proj,no_lims_proj,no_type,no_ref,no_analysis,unclassified\n")
-    if use_api is True:
-        # Get samplesheet from API
-        sample_dict = get_samplesheet(api, run_name, mode, source_dir)
-
-        # Write samplesheet
-        sample_count, samplesheet = create_samplesheet(sample_dict)
-        samplesheet_content = "\n".join(samplesheet) + "\n"
-        storage_interface.write_file(samplesheet_path, samplesheet_content)
-
-    # Set 666 for the samplesheet
-    storage_interface.chmod(samplesheet_path, "rw-rw-rw-")
-
-    # Generate and write sbatch script
-    if samplesheet_only is False:
-        # Detect muliplexed samples
-        bc_parse_pos = -1
-        if sample_count > 1:
-            bc_parse_pos = 9
-
-        # Extract pipeline parameters
-        pipeline_params = None
-        if use_api is True:
-            pipeline_params = extract_pipeline_params(api, storage_interface, samplesheet_path)
-
-        # Create sbatch script
-        sbatch_script = create_ont_sbatch_text(
-            run_name,
-            pipeline_params,
-            nextflow_version,
-            nextflow_cache,
-            nextflow_work,
-            container_cache,
-            pipeline_dir,
-            run_file_runs_dir,
-            parse_pos=bc_parse_pos,
-        )
-        sbatch_script_path = os.path.join(folder_path, "run_script.sh")
-        storage_interface.write_file(sbatch_script_path, sbatch_script)
-
-        # Set 777 for the run script
-        storage_interface.chmod(sbatch_script_path, "rwxrwxrwx")
+    # Queue the file operations of the run so that they are sent to the storage together
+    with storage_interface.batch():
+        try:
+            # Create folder
+            folder_path = os.path.join(target_dir, run_name)
+            if samplesheet_only is False:
+                storage_interface.make_dirs(folder_path)
+
+            # Samplesheet path
+            samplesheet_path = os.path.join(folder_path, "samplesheet.csv")
+
+            if use_api is False:
+                # Write default samplesheet, to the storage of the target directory like the API samplesheet
+                sample_count = 1
+                storage_interface.write_file(
+                    samplesheet_path,
+                    "id,sample_name,group,user,project_id,project_limsid,project_type,reference_genome,data_analysis_type,barcode\n"
+                    "sample_01,sample_01,asf,no_name,no_proj,no_lims_proj,no_type,no_ref,no_analysis,unclassified\n",
+                )
+            if use_api is True:
+                # Get samplesheet from API
+                sample_dict = get_samplesheet(api, run_name, mode, source_dir)
+
+                # Write samplesheet
+                sample_count, samplesheet = create_samplesheet(sample_dict)
+                samplesheet_content = "\n".join(samplesheet) + "\n"
+                storage_interface.write_file(samplesheet_path, samplesheet_content)
+
+            # Set 666 for the samplesheet
+            storage_interface.chmod(samplesheet_path, "rw-rw-rw-")
+
+            # Generate and write sbatch script
+            if samplesheet_only is False:
+                # Detect muliplexed samples
+                bc_parse_pos = -1
+                if sample_count > 1:
+                    bc_parse_pos = 9
+
+                # Extract pipeline parameters
+                pipeline_params = None
+                if use_api is True:
+                    # Reads back the queued samplesheet
+                    pipeline_params = extract_pipeline_params(api, storage_interface, samplesheet_path)
+
+                # Create sbatch script
+                sbatch_script = create_ont_sbatch_text(
+                    run_name,
+                    pipeline_params,
+                    nextflow_version,
+                    nextflow_cache,
+                    nextflow_work,
+                    container_cache,
+                    pipeline_dir,
+                    run_file_runs_dir,
+                    parse_pos=bc_parse_pos,
+                )
+                sbatch_script_path = os.path.join(folder_path, "run_script.sh")
+                storage_interface.write_file(sbatch_script_path, sbatch_script)
+
+                # Set 777 for the run script
+                storage_interface.chmod(sbatch_script_path, "rwxrwxrwx")
+        except Exception:
+            # Keep the steps done before the error, as they were before the operations were batched
+            storage_interface.flush()
+            raise
 
 
 def get_samplesheet(api, run_name: str, mode: DataTypeMode, source_dir: str) -> dict:
@@ -2,25 +2,42 @@
 Establish an SSH connection to nemo and run commands.
 """
 
+import base64
 import io
 import logging
+import posixpath
+import shlex
+import socket
+import stat
 
 import paramiko
 from fabric import Connection
 from invoke.exceptions import UnexpectedExit
 
-from asf_tools.ssh.file_object import FileObject, FileType
+from asf_tools.ssh.file_object import FileObject
 
 
 log = logging.getLogger(__name__)
 
+# One record per entry of five NUL terminated fields: type, size, mtime, path and link target.
+# Directories that cannot be listed are reported with the type "u" and pruned. -H follows a root that is a
+# symbolic link, as cd and os.walk do.
+FIND_COMMAND = (
+    r"find -H {top} -type d ! \( -readable -executable \) -printf 'u\0%s\0%T@\0%p\0%l\0' -prune"
+    r" -o -printf '%y\0%s\0%T@\0%p\0%l\0'"
+)
+FIND_CHUNK_SIZE = 65536
+FIND_POLL_INTERVAL = 1.0
+SFTP_CHUNK_SIZE = 32768
+BATCH_STATUS_MARKER = "__asf_batch_status__"
+
 
 class Nemo:
     """
     Establish an SSH connection to nemo and run commands.
     """
 
-    def __init__(self, host=None, user=None, key_file=None, key_string=None, password=None):
+    def __init__(self, host=None, user=None, key_file=None, key_string=None, password=None, use_sftp=True):
         """
         Initialize the Nemo connection.
 
@@ -28,6 +45,8 @@ class Nemo:
         :param user: The username to use for the connection.
         :param key_file: The path to the SSH key file (optional).
         :param password: The password for the connection (optional).
+        :param use_sftp: Run file operations over an SFTP channel reused for the session. Shell commands
+                         are used when False or when the server does not offer SFTP.
         """
         # Init
         self.host = host
@@ -35,6 +54,7 @@ class Nemo:
         self.key_file = key_file
         self.key_string = key_string
         self.password = password
+        self.use_sftp = use_sftp
         self.connection = None
 
         # Establish the SSH connection with either key or password
@@ -56,11 +76,29 @@ class Nemo:
     def _parse_private_key(self, key_string: str) -> paramiko.PKey:
         return paramiko.RSAKey.from_private_key(io.StringIO(key_string))
 
+    def sftp(self):
+        """
+        Get the SFTP client of the session, opening it on first use.
+
+        The client is kept by the connection, so every file operation reuses one channel. If the channel
+        cannot be opened, SFTP is disabled for the session and the shell commands are used instead.
+
+        :return: The SFTP client, or None if SFTP is not used.
+        """
+        if not self.use_sftp:
+            return None
+        try:
+            return self.connection.sftp()
+        except (paramiko.SSHException, EOFError) as err:
+            log.warning(f"SFTP is not available on {self.host}, falling back to shell commands: {err}")
+            self.use_sftp = False
+            return None
+
     def disconnect(self):
         """
         Close the SSH connection.
         """
-        # Close the SSH connection
+        # Close the SSH connection and its SFTP channel
         if self.connection:
             self.connection.close()
             self.connection = None
@@ -145,6 +183,14 @@ class Nemo:
         :param path: The path to check.
         :return: True if the file or directory exists, False otherwise.
         """
+        sftp = self.sftp()
+        if sftp is not None:
+            try:
+                sftp.stat(path)
+            except IOError:
+                return False
+            return True
+
         # Check if the path exists
         try:
             self.connection.run(f"test -e {path}", hide=True)
@@ -165,33 +211,126 @@ class Nemo:
         # If output is non-empty, files exist
         return bool(result.stdout.strip())
 
+    def stat(self, path: str) -> paramiko.SFTPAttributes:
+        """
+        Get the status of a file or directory, following symbolic links.
+
+        :param path: The path to query.
+        :return: The attributes of the path, with st_mode, st_size and st_mtime set.
+        :raises FileNotFoundError: If the path does not exist.
+        """
+        sftp = self.sftp()
+        if sftp is not None:
+            return sftp.stat(path)
+        return self._shell_stat(path, "-L")
+
+    def lstat(self, path: str) -> paramiko.SFTPAttributes:
+        """
+        Get the status of a file or directory without following symbolic links.
+
+        :param path: The path to query.
+        :return: The attributes of the path, with st_mode, st_size and st_mtime set.
+        :raises FileNotFoundError: If the path does not exist.
+        """
+        sftp = self.sftp()
+        if sftp is not None:
+            return sftp.lstat(path)
+        return self._shell_stat(path, "")
+
+    def _shell_stat(self, path: str, flags: str) -> paramiko.SFTPAttributes:
+        try:
+            result = self.connection.run(f"stat {flags} -c '%f %s %Y' {path}", hide=True)
+        except UnexpectedExit as err:
+            raise FileNotFoundError(f"{path} does not exist") from err
+        mode, size, mtime = result.stdout.strip().split()
+        attributes = paramiko.SFTPAttributes()
+        attributes.st_mode = int(mode, 16)
+        attributes.st_size = int(size)
+        attributes.st_mtime = int(mtime)
+        return attributes
+
     def make_dirs(self, path: str):
         """
         Create a directory.
 
         :param path: The path of the directory to create.
         """
+        sftp = self.sftp()
+        if sftp is not None:
+            self._sftp_make_dirs(sftp, path.rstrip("/") or "/")
+            return
         self.connection.run(f"mkdir -p {path}", hide=True)
 
+    def _sftp_make_dirs(self, sftp: paramiko.SFTPClient, path: str):
+        # Most directories are created under an existing parent, so try that first
+        try:
+            sftp.mkdir(path)
+            return
+        except IOError:
+            pass
+
+        try:
+            attributes = sftp.stat(path)
+        except FileNotFoundError:
+            parent = posixpath.dirname(path)
+            if parent == path:
+                raise
+            self._sftp_make_dirs(sftp, parent)
+            try:
+                sftp.mkdir(path)
+                return
+            except IOError:
+                # Like mkdir -p, accept a directory created concurrently by another process
+                attributes = sftp.stat(path)
+        if not stat.S_ISDIR(attributes.st_mode):
+            raise FileExistsError(f"{path} exists and is not a directory")
+
     def write_file(self, path: str, content: str):
         """
         Write content to a file.
 
+        Over SFTP the content is written exactly, in chunks, and can be of any size or binary.
+
         :param path: The path of the file to write.
-        :param content: The content to write to the file.
+        :param content: The content to write to the file, as text or bytes.
         """
+        sftp = self.sftp()
+        if sftp is not None:
+            data = content.encode("utf-8") if isinstance(content, str) else content
+            with sftp.open(path, "wb") as file:
+                file.set_pipelined(True)
+                for offset in range(0, len(data), SFTP_CHUNK_SIZE):
+                    file.write(data[offset : offset + SFTP_CHUNK_SIZE])
+            return
+
         # self.connection.run(f'echo "{content}" > {path}', hide=True)
         self.connection.run(f"cat <<'EOF' > {path}\n{content}\nEOF", hide=True)
 
-    def read_file(self, path: str) -> str:
+    def read_file(self, path: str, binary: bool = False):
         """
         Read the contents of a file.
 
+        Over SFTP the file is prefetched and read in chunks and the content is returned exactly. The shell
+        fallback strips surrounding whitespace.
+
         :param path: The path of the file to read.
+        :param binary: Return the content as bytes instead of text.
         :return: The contents of the file.
         """
+        sftp = self.sftp()
+        if sftp is not None:
+            chunks = []
+            with sftp.open(path, "rb") as file:
+                file.prefetch()
+                chunk = file.read(SFTP_CHUNK_SIZE)
+                while chunk:
+                    chunks.append(chunk)
+                    chunk = file.read(SFTP_CHUNK_SIZE)
+            data = b"".join(chunks)
+            return data if binary else data.decode("utf-8")
+
         result = self.connection.run(f"cat {path}", hide=True)
-        return result.stdout.strip()
+        return result.stdout.strip().encode("utf-8") if binary else result.stdout.strip()
 
     def chmod(self, path: str, permissions: str):
         """
@@ -200,8 +339,57 @@ class Nemo:
         :param path: The path of the file or directory.
         :param permissions: The permissions to set.
         """
+        sftp = self.sftp()
+        if sftp is not None:
+            sftp.chmod(path, int(permissions, 8))
+            return
         self.connection.run(f"chmod {permissions} {path}", hide=True)
 
+    @staticmethod
+    def batch_command(operation: str, *args) -> str:
+        """
+        Build the shell command of a storage operation run as part of a batch script.
+
+        :param operation: The operation, one of make_dirs, write_file, chmod or symlink.
+        :param args: The arguments of the operation, as passed to its method.
+        :return: The shell command.
+        """
+        if operation == "make_dirs":
+            return f"mkdir -p {shlex.quote(args[0])}"
+        if operation == "write_file":
+            # Content is passed base64 encoded so that any text or binary content is written exactly
+            path, content = args
+            data = content.encode("utf-8") if isinstance(content, str) else content
+            return f"printf %s {base64.b64encode(data).decode('ascii')} | base64 -d > {shlex.quote(path)}"
+        if operation == "chmod":
+            return f"chmod {args[1]} {shlex.quote(args[0])}"
+        if operation == "symlink":
+            return f"ln -sfn {shlex.quote(args[0])} {shlex.quote(args[1])}"
+        raise ValueError(f"Unsupported batch operation: {operation}")
+
+    def run_batch(self, commands: list) -> tuple:
+        """
+        Run several commands as one remote script, stopping at the first command that fails.
+
+        The script is sent on the standard input of a single shell, so it is not limited by the
+        maximum length of a command line.
+
+        :param commands: The shell commands to run in order.
+        :return: A tuple of the exit status of each command that ran and the stderr output of the script.
+        """
+        lines = []
+        for index, command in enumerate(commands):
+            lines.append(command)
+            lines.append(f'status=$?; echo "{BATCH_STATUS_MARKER} {index} $status"; [ "$status" -eq 0 ] || exit "$status"')
+
+        result = self.connection.run("sh -s", in_stream=io.StringIO("\n".join(lines) + "\n"), hide=True, warn=True)
+        statuses = []
+        for line in result.stdout.splitlines():
+            parts = line.split()
+            if len(parts) == 3 and parts[0] == BATCH_STATUS_MARKER:
+                statuses.append(int(parts[2]))
+        return statuses, result.stderr.strip()
+
     def check_slurm_job_status(self, job_name: str, user_name: str = None) -> str:
         """
         Check the status of a SLURM job.
@@ -230,39 +418,127 @@ class Nemo:
 
         return None
 
-    def walk(self, top: str):
+    def find_entries(self, top: str):
         """
-        Generate the file names in a directory tree by walking the tree over SSH.
+        Stream every entry of a directory tree from a single remote find.
 
-        :param top: The root directory to start walking from.
-        :yield: A 3-tuple (dirpath, dirnames, filenames)
-        """
-        stack = [top]
+        The output is read from the channel in chunks as find produces it, so entries are yielded
+        before the scan of the tree has finished. Directories that cannot be listed are reported with
+        the type "u" and are not descended into. Errors below top, such as a directory that cannot be
+        read or a file removed during the scan, are logged as warnings and the scan carries on.
 
-        while stack:
-            current_dir = stack.pop()
-            dirnames = []
-            filenames = []
+        :param top: The root directory to scan.
+        :yield: A 5-tuple (type, size, mtime, path, link_target) in the pre-order of find, where type is
+                the find %y letter (d, f, l, ...) or "u".
+        :raises RuntimeError: If top does not exist or cannot be read.
+        """
+        channel = self.connection.create_session()
+        try:
+            channel.exec_command(FIND_COMMAND.format(top=shlex.quote(top)))
+            channel.settimeout(FIND_POLL_INTERVAL)
+            buffer = b""
+            pending = b""
+            errors = []
+            fields = []
+            found = False
+            while True:
+                # Drain stderr as it arrives so that it cannot fill the channel window and stall stdout
+                if channel.recv_stderr_ready():
+                    pending = self._log_find_errors(top, pending + channel.recv_stderr(FIND_CHUNK_SIZE), errors)
+                    continue
+                try:
+                    chunk = channel.recv(FIND_CHUNK_SIZE)
+                except socket.timeout:
+                    continue
+                if not chunk:
+                    break
+
+                # Records are NUL terminated fields, the last part is kept until the rest of it arrives
+                *parts, buffer = (buffer + chunk).split(b"\0")
+                for part in parts:
+                    fields.append(part.decode("utf-8", errors="surrogateescape"))
+                    if len(fields) == 5:
+                        # The first record is top itself
+                        if not found and fields[0] == "u":
+                            raise RuntimeError(f"find {top} failed: {top} cannot be read")
+                        found = True
+                        yield fields[0], int(fields[1]), float(fields[2]), fields[3], fields[4]
+                        fields = []
+
+            status = channel.recv_exit_status()
+            while channel.recv_stderr_ready():
+                pending += channel.recv_stderr(FIND_CHUNK_SIZE)
+            self._log_find_errors(top, pending + b"\n", errors)
+            if status != 0 and not found:
+                raise RuntimeError(f"find {top} failed with exit status {status}: {' '.join(errors)}")
+        finally:
+            channel.close()
+
+    @staticmethod
+    def _log_find_errors(top: str, pending: bytes, errors: list) -> bytes:
+        # Log each complete line and keep the last part until the rest of it arrives
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            message = line.decode("utf-8", errors="replace").strip()
+            if message:
+                log.warning(f"find {top}: {message}")
+                errors.append(message)
+        return pending
 
-            try:
-                entries = self.list_directory_objects(current_dir)
-            except UnexpectedExit:
-                continue  # Skip directories that can't be listed
+    def walk(self, top: str, topdown: bool = True):
+        """
+        Generate the file names in a directory tree by walking the tree over SSH.
 
-            for entry in entries:
-                if entry.name in (".", ".."):
-                    continue
+        The whole tree is scanned with one remote find instead of listing each directory, so a walk
+        costs a single round-trip. Directories that cannot be listed are included in the dirnames of
+        their parent but are not yielded.
 
-                full_path = f"{current_dir.rstrip('/')}/{entry.name}"
-                if entry.type == FileType.FOLDER:
-                    dirnames.append(entry.name)
-                    stack.append(full_path)
-                elif entry.type == FileType.FILE:
-                    filenames.append(entry.name)
-                elif entry.type == FileType.LINK:
-                    filenames.append(entry.name)
+        Only a bottom up walk streams. find lists the subtree of a directory before its remaining
+        entries, so a directory is complete only after its subdirectories, and a top down walk holds
+        the whole tree in memory until the scan has finished. Callers that do not rely on the order
+        should pass topdown=False.
 
-            yield current_dir, dirnames, filenames
+        :param top: The root directory to start walking from.
+        :param topdown: Yield each directory before its subdirectories, once the scan has finished. When
+                        False, directories are yielded as soon as the scan of their subtree completes.
+        :yield: A 3-tuple (dirpath, dirnames, filenames)
+        :raises RuntimeError: If top does not exist or cannot be read.
+        """
+        root = top.rstrip("/") or "/"
+        ordered = []
+        open_dirs = []
+
+        for kind, _, _, path, _ in self.find_entries(top):
+            path = path.rstrip("/") or "/"
+            if path == root:
+                if kind == "d":
+                    open_dirs.append((root, (top, [], [])))
+                    ordered.append(open_dirs[-1][1])
+                continue
+
+            # find lists a directory before its contents, so the parent is on the stack of open directories
+            parent, name = posixpath.split(path)
+            while open_dirs and open_dirs[-1][0] != parent:
+                finished = open_dirs.pop()[1]
+                if not topdown:
+                    yield finished
+            if not open_dirs:
+                continue
+
+            _, dirnames, filenames = open_dirs[-1][1]
+            if kind in ("d", "u"):
+                dirnames.append(name)
+                if kind == "d":
+                    open_dirs.append((path, (path, [], [])))
+                    ordered.append(open_dirs[-1][1])
+            elif kind in ("f", "l"):
+                filenames.append(name)
+
+        if topdown:
+            yield from ordered
+        else:
+            while open_dirs:
+                yield open_dirs.pop()[1]
 
     def symlink(self, target: str, link_name: str):
         """
@@ -271,4 +547,16 @@ class Nemo:
         :param target: The target file or directory.
         :param link_name: The name of the symbolic link to create.
         """
+        sftp = self.sftp()
+        if sftp is not None:
+            # Like ln -sfn, replace an existing file or link. Linking into an existing directory is left to ln.
+            try:
+                attributes = sftp.lstat(link_name)
+            except FileNotFoundError:
+                attributes = None
+            if attributes is None or not stat.S_ISDIR(attributes.st_mode):
+                if attributes is not None:
+                    sftp.remove(link_name)
+                sftp.symlink(target, link_name)
+                return
         self.connection.run(f"ln -sfn {target} {link_name}", hide=True)
@@ -0,0 +1,262 @@
+"""
+Keep a pool of SSH connections to nemo and run commands on them concurrently.
+"""
+
+import inspect
+import logging
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Optional
+
+import paramiko
+
+from asf_tools.ssh.nemo import Nemo
+
+
+log = logging.getLogger(__name__)
+
+# Errors that mean the connection itself failed, rather than the remote operation
+CONNECTION_ERRORS = (paramiko.SSHException, paramiko.ssh_exception.NoValidConnectionsError, EOFError, ConnectionError, socket.timeout)
+
+# Operations with side effects that are not safe to run twice after a connection failure
+NOT_RETRIED = {"run_command", "run_batch"}
+
+# Methods bound to one connection, which must not be lent out through the pool
+NOT_PROXIED = {"sftp", "disconnect"}
+
+
+class NemoPool:
+    """
+    Keep several authenticated Nemo connections and lend them to callers running remote operations concurrently.
+
+    Connections are created on demand up to the pool size, and each one connects on its first operation. A
+    connection that was idle for longer than the health check interval is checked before it is lent again,
+    and replaced if its transport has died. A connection that fails during an operation is closed and the
+    operation is retried once on a new one. Connections idle for longer than the idle timeout are closed the
+    next time a connection is acquired; nothing closes them in the background, so call disconnect when done.
+
+    Calling a Nemo method on the pool runs it on a pooled connection, so the pool can stand in for a Nemo.
+    Static helpers such as batch_command are called directly without taking a connection.
+
+    A generator method such as walk holds its connection until it is exhausted or closed. Running pool
+    operations inside such a loop, or inside map, needs a second connection for each level of nesting; once
+    all connections are held, acquire waits for at most the acquire timeout and then raises TimeoutError.
+    """
+
+    def __init__(
+        self,
+        size: int = 4,
+        idle_timeout: float = 300,
+        health_check_interval: float = 30,
+        acquire_timeout: Optional[float] = 600,
+        **kwargs,
+    ):
+        """
+        Initialize the pool.
+
+        :param size: The maximum number of open connections.
+        :param idle_timeout: Seconds after which an unused connection is closed.
+        :param health_check_interval: Seconds of idleness after which a connection is checked before use.
+        :param acquire_timeout: Seconds to wait for a connection when all are in use, None to wait forever.
+        :param kwargs: Arguments for initializing each Nemo connection.
+        """
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self.kwargs = kwargs
+        self.host = kwargs.get("host")
+        self.idle = []
+        self.open_count = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+        # Create the first connection now so that a missing key or password raises here, as with Nemo. Like
+        # Nemo, it does not connect until its first operation.
+        self.idle.append((Nemo(**kwargs), time.monotonic()))
+        self.open_count = 1
+
+    def __getattr__(self, name: str):
+        method = getattr(Nemo, name, None)
+        if name.startswith("_") or name in NOT_PROXIED or not callable(method):
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        if isinstance(inspect.getattr_static(Nemo, name), staticmethod):
+            return method
+        if inspect.isgeneratorfunction(method):
+            return lambda *args, **kwargs: self.iterate(name, *args, **kwargs)
+        return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+
+    @staticmethod
+    def healthy(nemo: Nemo) -> bool:
+        """
+        Check that the transport of a connection is still usable.
+
+        :param nemo: The connection to check.
+        :return: True if the connection is open and responds, or has not been opened yet.
+        """
+        if nemo.connection is None:
+            return False
+        transport = nemo.connection.transport
+        if transport is None:
+            return True
+        if not transport.is_active():
+            return False
+        try:
+            transport.send_ignore()
+        except CONNECTION_ERRORS:
+            return False
+        return True
+
+    def close_expired(self):
+        """
+        Close the connections that have been idle for longer than the idle timeout.
+        """
+        now = time.monotonic()
+        with self.condition:
+            expired = [nemo for nemo, released_at in self.idle if now - released_at >= self.idle_timeout]
+            self.idle = [(nemo, released_at) for nemo, released_at in self.idle if now - released_at < self.idle_timeout]
+            self.open_count -= len(expired)
+            if expired:
+                self.condition.notify_all()
+        for nemo in expired:
+            log.debug(f"Closing connection to {self.host} idle for more than {self.idle_timeout}s")
+            nemo.disconnect()
+
+    def acquire(self) -> Nemo:
+        """
+        Take a connection from the pool, waiting for one to be released if all are in use.
+
+        :return: The connection.
+        :raises TimeoutError: If no connection is released within the acquire timeout.
+        """
+        self.close_expired()
+        deadline = None if self.acquire_timeout is None else time.monotonic() + self.acquire_timeout
+        with self.condition:
+            while True:
+                if self.closed:
+                    raise RuntimeError("The connection pool is closed")
+                if self.idle:
+                    nemo, released_at = self.idle.pop()
+                    break
+                if self.open_count < self.size:
+                    self.open_count += 1
+                    nemo, released_at = None, None
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"No connection to {self.host} released within {self.acquire_timeout}s, all {self.size} are in use")
+                self.condition.wait(remaining)
+
+        try:
+            if nemo is None:
+                nemo = Nemo(**self.kwargs)
+            elif time.monotonic() - released_at >= self.health_check_interval and not self.healthy(nemo):
+                log.warning(f"Connection to {self.host} is no longer active, reconnecting")
+                nemo.disconnect()
+                nemo = Nemo(**self.kwargs)
+        except Exception:
+            with self.condition:
+                self.open_count -= 1
+                self.condition.notify()
+            raise
+        return nemo
+
+    def release(self, nemo: Nemo, broken: bool = False):
+        """
+        Return a connection to the pool.
+
+        :param nemo: The connection.
+        :param broken: Close the connection instead of keeping it, because it failed.
+        """
+        with self.condition:
+            keep = not broken and not self.closed
+            if keep:
+                self.idle.append((nemo, time.monotonic()))
+            else:
+                self.open_count -= 1
+            self.condition.notify()
+        if not keep:
+            nemo.disconnect()
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection for the duration of a block.
+
+        A connection error raised in the block closes the connection instead of returning it to the pool.
+
+        :yield: The connection.
+        """
+        nemo = self.acquire()
+        broken = False
+        try:
+            yield nemo
+        except CONNECTION_ERRORS:
+            broken = True
+            raise
+        finally:
+            self.release(nemo, broken)
+
+    def call(self, method: str, *args, **kwargs):
+        """
+        Run a Nemo method on a pooled connection, retrying once on a new connection if the connection fails.
+
+        :param method: The name of the Nemo method.
+        :return: The result of the method.
+        """
+        attempts = 1 if method in NOT_RETRIED else 2
+        for attempt in range(attempts):
+            try:
+                with self.connection() as nemo:
+                    return getattr(nemo, method)(*args, **kwargs)
+            except CONNECTION_ERRORS as err:
+                if attempt + 1 == attempts:
+                    raise
+                log.warning(f"Connection to {self.host} failed during {method}, retrying on a new connection: {err}")
+        return None
+
+    def iterate(self, method: str, *args, **kwargs):
+        """
+        Run a Nemo generator method, holding a pooled connection until it is exhausted or closed.
+
+        Pool operations run while iterating take further connections, see the class description.
+
+        :param method: The name of the Nemo method.
+        :yield: The items generated by the method.
+        """
+        with self.connection() as nemo:
+            yield from getattr(nemo, method)(*args, **kwargs)
+
+    def map(self, func, items) -> list:
+        """
+        Call func(nemo, item) for each item, running up to the pool size of calls concurrently.
+
+        :param func: The function to call with a connection and an item.
+        :param items: The items.
+        :return: The results, in the order of the items.
+        """
+
+        def run(item):
+            with self.connection() as nemo:
+                return func(nemo, item)
+
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            return list(executor.map(run, items))
+
+    def disconnect(self):
+        """
+        Close the pool. Idle connections are closed now and connections in use when they are released.
+        """
+        with self.condition:
+            self.closed = True
+            idle = self.idle
+            self.idle = []
+            self.open_count -= len(idle)
+            self.condition.notify_all()
+        for nemo, _ in idle:
+            nemo.disconnect()
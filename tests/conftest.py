@@ -0,0 +1,41 @@
+"""
+Shared fixtures for tests
+"""
+
+import time
+
+import pytest
+
+
+class FakeClock:
+    """
+    Stand in for time.monotonic and time.sleep, where sleeping advances the clock instead of waiting
+    """
+
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def monotonic(self):
+        """
+        Return the current fake time
+        """
+        return self.now
+
+    def sleep(self, seconds):
+        """
+        Record the sleep and advance the fake time by it
+        """
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture(name="clock")
+def fixture_clock(monkeypatch):
+    """
+    Replace time.monotonic and time.sleep with a FakeClock for the duration of a test
+    """
+    clock = FakeClock()
+    monkeypatch.setattr(time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(time, "sleep", clock.sleep)
+    return clock
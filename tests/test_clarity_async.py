@@ -0,0 +1,155 @@
+"""
+Clarity async API tests
+"""
+
+# pylint: disable=missing-function-docstring,missing-class-docstring,no-member
+
+import asyncio
+import os
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+from assertpy import assert_that
+
+from asf_tools.api.clarity.async_clarity_lims import AsyncClarityLims
+from asf_tools.api.clarity.clarity_lims import ClarityLims
+from asf_tools.api.clarity.models import Artifact, Lab, Stub
+from tests.mocks.clarity_lims_mock import ClarityLimsMock
+
+
+API_TEST_DATA = "tests/data/api/clarity"
+
+
+# Create class level mock API
+@pytest.fixture(scope="class", autouse=True)
+def mock_endpoints_clarity_api(request):
+    data_file_path = os.path.join(API_TEST_DATA, "mock_data", "data.pkl")
+    lims = ClarityLimsMock(baseuri="https://asf-claritylims.thecrick.org")
+    lims.load_tracked_requests(data_file_path)
+    request.cls.lims = lims
+    yield lims
+
+
+class TestAsyncClarity:
+    def test_clarity_async_get_matches_sync(self):
+        # Setup
+        api = AsyncClarityLims(client=self.lims)
+
+        # Test
+        lab = asyncio.run(api.get_labs(search_id="2"))
+        labs = asyncio.run(api.get_labs())
+
+        # Assert
+        assert_that(lab).is_equal_to(self.lims.get_labs(search_id="2"))
+        assert_that(labs).is_equal_to(self.lims.get_labs())
+
+    def test_clarity_async_expand_stubs_matches_sync(self):
+        # Setup
+        api = AsyncClarityLims(client=self.lims, max_concurrency=4)
+        stubs = self.lims.get_labs()[:5]
+
+        # Test
+        labs = asyncio.run(api.expand_stubs(stubs, Lab))
+
+        # Assert
+        assert_that(labs).is_equal_to(self.lims.expand_stubs(stubs, Lab))
+
+    def test_clarity_async_concurrency_limit(self):
+        # Setup
+        api = AsyncClarityLims(client=ClarityLims(baseuri="https://localhost:8080", username="test", password="test"), max_concurrency=3)
+        lock = threading.Lock()
+        in_flight = [0, 0]
+
+        def expand_stub(stub, expansion_type):  # pylint: disable=unused-argument
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+            time.sleep(0.02)
+            with lock:
+                in_flight[0] -= 1
+            return stub.id
+
+        api.client.expand_stub = expand_stub
+        stubs = [Stub(uri=f"https://localhost:8080/api/v2/labs/{i}") for i in range(12)]
+
+        # Test
+        ids = asyncio.run(api.expand_stubs(stubs, Lab))
+
+        # Assert
+        assert_that(ids).is_equal_to([str(i) for i in range(12)])
+        assert_that(in_flight[1]).is_equal_to(3)
+
+    def test_clarity_async_expand_stubs_batches(self):
+        # Setup
+        api = AsyncClarityLims(client=ClarityLims(baseuri="https://localhost:8080", username="test", password="test"))
+        api.client.batch_retrieve = Mock(side_effect=lambda batch, expansion_type: [stub.id for stub in batch])
+        stubs = [Stub(uri=f"https://localhost:8080/api/v2/artifacts/{i}") for i in range(5)]
+
+        # Test
+        ids = asyncio.run(api.expand_stubs(stubs, Artifact, batch_size=2))
+
+        # Assert
+        assert_that(ids).is_equal_to([str(i) for i in range(5)])
+        assert_that(api.client.batch_retrieve.call_count).is_equal_to(3)
+
+    def test_clarity_async_error_propagates(self):
+        # Setup
+        api = AsyncClarityLims(client=ClarityLims(baseuri="https://localhost:8080", username="test", password="test"))
+        api.client.expand_stub = Mock(side_effect=ValueError("bad stub"))
+
+        # Test and Assert
+        with pytest.raises(ValueError):
+            asyncio.run(api.expand_stubs([Stub(uri="https://localhost:8080/api/v2/labs/1")], Lab))
+
+    def test_clarity_async_get_instances_passes_status_codes(self):
+        # Setup
+        api = AsyncClarityLims(client=ClarityLims(baseuri="https://localhost:8080", username="test", password="test"))
+        api.client.get_instances = Mock(return_value=[])
+
+        # Test
+        asyncio.run(api.get_instances("lab:labs", "lab", Stub, "labs", None, [200, 404]))
+
+        # Assert
+        api.client.get_instances.assert_called_once_with("lab:labs", "lab", Stub, "labs", None, [200, 404])
+
+    def test_clarity_async_lookup_ids_concurrently(self):
+        # Setup
+        api = AsyncClarityLims(client=ClarityLims(baseuri="https://localhost:8080", username="test", password="test"), max_concurrency=4)
+        barrier = threading.Barrier(3, timeout=5)
+
+        def get_samples(search_id=None, expand_stubs=True):
+            if search_id != "S4":
+                barrier.wait()
+            return (search_id, expand_stubs)
+
+        api.client.get_samples = get_samples
+
+        # Test
+        samples = asyncio.run(api.get_samples(search_id=["S1", "S2", "S3"]))
+        sample = asyncio.run(api.get_samples("S4", False))
+
+        # Assert
+        assert_that(samples).is_equal_to([("S1", True), ("S2", True), ("S3", True)])
+        assert_that(sample).is_equal_to(("S4", False))
+
+    def test_clarity_async_semaphore_per_loop(self):
+        # Setup
+        api = AsyncClarityLims(client=ClarityLims(baseuri="https://localhost:8080", username="test", password="test"), max_concurrency=2)
+        api.client.expand_stub = lambda stub, expansion_type: stub.id
+        stubs = [Stub(uri=f"https://localhost:8080/api/v2/labs/{i}") for i in range(6)]
+        results = []
+
+        def expand():
+            results.append(asyncio.run(api.expand_stubs(stubs, Lab)))
+
+        # Test
+        threads = [threading.Thread(target=expand) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        # Assert
+        assert_that(results).is_equal_to([[str(i) for i in range(6)]] * 4)
@@ -0,0 +1,174 @@
+"""
+Clarity API response cache tests
+"""
+
+# pylint: disable=missing-function-docstring,missing-class-docstring,no-member
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+from assertpy import assert_that
+
+from asf_tools.api.clarity.cache import ChainedCache, DiskResponseCache, ResponseCache, cache_key, endpoint_category
+
+
+class TestClarityResponseCache:
+    def test_clarity_cache_key_with_params(self):
+        # Test and Assert
+        assert_that(cache_key("https://localhost/api/v2/labs", {"name": "babs"})).is_equal_to("https://localhost/api/v2/labs?name=babs")
+        assert_that(cache_key("https://localhost/api/v2/labs")).is_equal_to("https://localhost/api/v2/labs")
+
+    def test_clarity_cache_hit_and_miss_counters(self):
+        # Setup
+        cache = ResponseCache()
+        cache.set("a", b"data")
+
+        # Test
+        hit = cache.get("a")
+        miss = cache.get("b")
+
+        # Assert
+        assert_that(hit).is_equal_to(b"data")
+        assert_that(miss).is_none()
+        assert_that(cache.stats()).is_equal_to({"hits": 1, "misses": 1, "entries": 1})
+
+    def test_clarity_cache_lru_eviction(self):
+        # Setup
+        cache = ResponseCache(max_entries=2)
+        cache.set("a", b"1")
+        cache.set("b", b"2")
+
+        # Test
+        cache.get("a")
+        cache.set("c", b"3")
+
+        # Assert
+        assert_that(cache).is_length(2)
+        assert_that(cache.get("a")).is_equal_to(b"1")
+        assert_that(cache.get("b")).is_none()
+        assert_that(cache.get("c")).is_equal_to(b"3")
+
+    @patch("asf_tools.api.clarity.cache.time.monotonic")
+    def test_clarity_cache_ttl_expiry(self, mock_monotonic):
+        # Setup
+        cache = ResponseCache(ttl=10)
+        mock_monotonic.return_value = 100
+        cache.set("a", b"1")
+
+        # Test
+        mock_monotonic.return_value = 105
+        fresh = cache.get("a")
+        mock_monotonic.return_value = 111
+        expired = cache.get("a")
+
+        # Assert
+        assert_that(fresh).is_equal_to(b"1")
+        assert_that(expired).is_none()
+        assert_that(cache).is_empty()
+
+    def test_clarity_cache_clear(self):
+        # Setup
+        cache = ResponseCache()
+        cache.set("a", b"1")
+
+        # Test
+        cache.clear()
+
+        # Assert
+        assert_that(cache).is_empty()
+
+
+class TestClarityDiskResponseCache:
+    @pytest.mark.parametrize(
+        "uri,expected",
+        [
+            ("https://localhost/api/v2/labs/2", "labs"),
+            ("https://localhost/api/v2/configuration/workflows/56", "configuration/workflows"),
+            ("https://localhost/api/v2/reagenttypes?name=N701", "reagenttypes"),
+            ("https://localhost/api/v2/artifacts/2-8332743?state=5959893", "artifacts"),
+        ],
+    )
+    def test_clarity_endpoint_category(self, uri, expected):
+        # Test and Assert
+        assert_that(endpoint_category(uri)).is_equal_to(expected)
+
+    def test_clarity_disk_cache_persists_between_instances(self, tmp_path):
+        # Setup
+        path = os.path.join(tmp_path, "cache", "clarity.sqlite")
+        DiskResponseCache(path).set("https://localhost/api/v2/labs/2", b"<lab/>")
+
+        # Test
+        cache = DiskResponseCache(path)
+        value = cache.get("https://localhost/api/v2/labs/2")
+
+        # Assert
+        assert_that(value).is_equal_to(b"<lab/>")
+        assert_that(cache.stats()).is_equal_to({"hits": 1, "misses": 0, "entries": 1})
+
+    def test_clarity_disk_cache_skips_uncached_types(self, tmp_path):
+        # Setup
+        cache = DiskResponseCache(os.path.join(tmp_path, "clarity.sqlite"))
+
+        # Test
+        cache.set("https://localhost/api/v2/samples/VIV6902A1", b"<sample/>")
+
+        # Assert
+        assert_that(cache.get("https://localhost/api/v2/samples/VIV6902A1")).is_none()
+
+    def test_clarity_disk_cache_ttl_per_type(self, tmp_path):
+        # Setup
+        cache = DiskResponseCache(os.path.join(tmp_path, "clarity.sqlite"), ttls={"labs": 10, "researchers": 100})
+        with patch("asf_tools.api.clarity.cache.time.time", return_value=1000):
+            cache.set("https://localhost/api/v2/labs/2", b"<lab/>")
+            cache.set("https://localhost/api/v2/researchers/4", b"<researcher/>")
+
+        # Test
+        with patch("asf_tools.api.clarity.cache.time.time", return_value=1050):
+            lab = cache.get("https://localhost/api/v2/labs/2")
+            researcher = cache.get("https://localhost/api/v2/researchers/4")
+
+        # Assert
+        assert_that(lab).is_none()
+        assert_that(researcher).is_equal_to(b"<researcher/>")
+        assert_that(cache.stats()["entries"]).is_equal_to(1)
+
+    def test_clarity_disk_cache_eviction_and_clear(self, tmp_path):
+        # Setup
+        cache = DiskResponseCache(os.path.join(tmp_path, "clarity.sqlite"), max_entries=2)
+        for index in range(3):
+            with patch("asf_tools.api.clarity.cache.time.time", return_value=1000 + index):
+                cache.set(f"https://localhost/api/v2/labs/{index}", b"<lab/>")
+
+        # Test and Assert
+        with patch("asf_tools.api.clarity.cache.time.time", return_value=1003):
+            assert_that(cache.get("https://localhost/api/v2/labs/0")).is_none()
+            assert_that(cache.get("https://localhost/api/v2/labs/2")).is_not_none()
+        cache.clear("labs")
+        assert_that(cache.stats()["entries"]).is_equal_to(0)
+
+    def test_clarity_disk_cache_concurrent_writers(self, tmp_path):
+        # Setup
+        cache = DiskResponseCache(os.path.join(tmp_path, "clarity.sqlite"))
+
+        # Test
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda index: cache.set(f"https://localhost/api/v2/labs/{index}", b"<lab/>"), range(50)))
+
+        # Assert
+        assert_that(cache.stats()["entries"]).is_equal_to(50)
+
+    def test_clarity_chained_cache_promotes_hits(self, tmp_path):
+        # Setup
+        memory_cache = ResponseCache()
+        disk_cache = DiskResponseCache(os.path.join(tmp_path, "clarity.sqlite"))
+        disk_cache.set("https://localhost/api/v2/labs/2", b"<lab/>")
+        cache = ChainedCache(memory_cache, disk_cache)
+
+        # Test
+        value = cache.get("https://localhost/api/v2/labs/2")
+
+        # Assert
+        assert_that(value).is_equal_to(b"<lab/>")
+        assert_that(memory_cache.get("https://localhost/api/v2/labs/2")).is_equal_to(b"<lab/>")
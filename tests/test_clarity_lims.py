@@ -11,7 +11,9 @@ from unittest.mock import Mock
 import pytest
 import requests
 from assertpy import assert_that
+from pydantic import ValidationError
 
+from asf_tools.api.clarity.cache import ResponseCache
 from asf_tools.api.clarity.clarity_lims import ClarityLims
 from asf_tools.api.clarity.models import (
     Artifact,
@@ -118,6 +120,29 @@ class TestClarity:
         # Test and Assert
         assert_that(self.api.validate_response("https://localhost:8080/api", mock_response)).is_true()
 
+    def test_clarity_api_get_with_uri_uses_cache(self):
+        """
+        Test repeated requests are served from the response cache
+        """
+
+        # Setup
+        mock_response = Mock(spec=requests.Response)
+        mock_response.status_code = 200
+        mock_response.content = b"<lab/>"
+        api = ClarityLims(baseuri="https://localhost:8080", username="test", password="test", cache=ResponseCache())
+        api.request_session = Mock()
+        api.request_session.get.return_value = mock_response
+
+        # Test
+        first = api.get_with_uri("https://localhost:8080/api/v2/labs", {"name": "babs"})
+        second = api.get_with_uri("https://localhost:8080/api/v2/labs", {"name": "babs"})
+        api.get_with_uri("https://localhost:8080/api/v2/labs", {"name": "other"})
+
+        # Assert
+        assert_that(first).is_equal_to(second)
+        assert_that(api.request_session.get.call_count).is_equal_to(2)
+        assert_that(api.cache.stats()).is_equal_to({"hits": 1, "misses": 2, "entries": 2})
+
     def test_clarity_api_get_params_from_args_with_none(self):
         """
         Get get args with none params
@@ -170,6 +195,86 @@ class TestClarity:
         # Assert
         assert_that(data).is_length(expected_num)
 
+    def test_clarity_api_iter_instances_pipelined_pages(self):
+        """
+        Test pages are followed in order and the next page is requested with the same params
+        """
+
+        # Setup
+        page_1 = (
+            '<lab:labs xmlns:lab="http://genologics.com/ri/lab">'
+            '<lab uri="https://localhost:8080/api/v2/labs/1"><name>a</name></lab>'
+            '<lab uri="https://localhost:8080/api/v2/labs/2"><name>b</name></lab>'
+            '<next-page uri="https://localhost:8080/api/v2/labs?start-index=2&amp;name=x"/>'
+            "</lab:labs>"
+        )
+        page_2 = b'<lab:labs xmlns:lab="http://genologics.com/ri/lab"><lab uri="https://localhost:8080/api/v2/labs/3"><name>c</name></lab></lab:labs>'
+        api = ClarityLims(baseuri="https://localhost:8080", username="test", password="test")
+        api.get = Mock(return_value=page_1)
+        api.get_with_uri = Mock(return_value=page_2)
+
+        # Test
+        iterator = api.iter_instances("lab:labs", "lab", Stub, "labs", {"name": "x"})
+        first = next(iterator)
+        remaining = list(iterator)
+
+        # Assert
+        assert_that(first.id).is_equal_to("1")
+        assert_that([stub.id for stub in remaining]).is_equal_to(["2", "3"])
+        api.get_with_uri.assert_called_once_with("https://localhost:8080/api/v2/labs?start-index=2&name=x", {"name": "x"}, [200])
+
+    def test_clarity_api_get_instances_empty_page(self):
+        """
+        Test an empty list page returns no instances
+        """
+
+        # Setup
+        api = ClarityLims(baseuri="https://localhost:8080", username="test", password="test")
+        api.get = Mock(return_value='<lab:labs xmlns:lab="http://genologics.com/ri/lab"/>')
+
+        # Test and Assert
+        assert_that(api.get_instances("lab:labs", "lab", Stub, "labs")).is_empty()
+
+    @pytest.mark.parametrize(
+        "xml_path,outer_key,inner_key,type_name",
+        [
+            ("artifacts.xml", "art:artifacts", "artifact", Stub),
+            ("samples.xml", "smp:samples", "sample", Stub),
+            ("processes.xml", "prc:processes", "process", Stub),
+            ("researchers.xml", "res:researchers", "researcher", ResearcherStub),
+        ],
+    )
+    def test_clarity_api_trusted_payloads_match_validated(self, xml_path, outer_key, inner_key, type_name):
+        """
+        Test trusted construction gives the same instances as full validation
+        """
+
+        # Setup
+        with open(os.path.join(API_TEST_DATA, "mock_xml", xml_path), "r", encoding="utf-8") as file:
+            xml_content = file.read()
+        api = ClarityLims(baseuri="https://localhost:8080", username="test", password="test", trusted_payloads=True)
+
+        # Test
+        trusted, _ = api.get_single_page_instances(xml_content, outer_key, inner_key, type_name)
+        validated, _ = self.api.get_single_page_instances(xml_content, outer_key, inner_key, type_name)
+
+        # Assert
+        assert_that([item.model_dump() for item in trusted]).is_equal_to([item.model_dump() for item in validated])
+        assert_that(trusted[0].validated()).is_equal_to(validated[0])
+
+    def test_clarity_api_trusted_payloads_fallback_to_validation(self):
+        """
+        Test trusted construction falls back to full validation when a required field is missing
+        """
+
+        # Setup
+        api = ClarityLims(baseuri="https://localhost:8080", username="test", password="test", trusted_payloads=True)
+
+        # Test and Assert
+        assert_that(api.initialise_model).raises(ValidationError).when_called_with(
+            ResearcherStub, {"uri": "https://localhost:8080/api/v2/researchers/4", "first-name": "A"}
+        )
+
     @pytest.mark.parametrize(
         "xml_path,outer_key,type_name,instance_id",
         [
@@ -202,6 +307,106 @@ class TestClarity:
         # Assert
         assert_that(instance.id).is_equal_to(instance_id)
 
+    @pytest.mark.parametrize(
+        "xml_path,outer_key,type_name",
+        [
+            ("project.xml", "prj:project", Project),
+            ("artifact.xml", "art:artifact", Artifact),
+            ("sample.xml", "smp:sample", Sample),
+            ("process.xml", "prc:process", Process),
+        ],
+    )
+    def test_clarity_api_udf_index(self, xml_path, outer_key, type_name):
+        """
+        Test the UDF index matches a scan of the UDF fields
+        """
+
+        # Setup
+        with open(os.path.join(API_TEST_DATA, "mock_xml", xml_path), "r", encoding="utf-8") as file:
+            xml_content = file.read()
+        instance = self.api.get_single_instance(xml_content, outer_key, type_name)
+        name = instance.udf_fields[-1].name
+
+        # Test
+        udfs = instance.udfs
+
+        # Assert
+        assert_that(udfs).is_length(len({item.name for item in instance.udf_fields}))
+        assert_that(instance.get_udf(name)).is_equal_to(next(item.value for item in instance.udf_fields if item.name == name))
+        assert_that(instance.get_udf("Missing")).is_none()
+        assert_that(instance.get_udf("Missing", "")).is_equal_to("")
+        assert_that(instance.udfs).is_same_as(udfs)
+
+    @pytest.mark.parametrize(
+        "xml_path,outer_key,inner_key,type_name,expected_ids",
+        [
+            (
+                "artifacts_batch.xml",
+                "art:details",
+                "art:artifact",
+                Artifact,
+                ["2-8332743?state=5959893", "STR6918A110PA1?state=5982061", "92-8332746?state=5959896"],
+            ),
+            ("samples_batch.xml", "smp:details", "smp:sample", Sample, ["VIV6902A1"]),
+        ],
+    )
+    def test_clarity_api_get_batch_instances(self, xml_path, outer_key, inner_key, type_name, expected_ids):  # pylint: disable=too-many-positional-arguments
+        """
+        Test batch details parsing
+        """
+
+        # Setup
+        with open(os.path.join(API_TEST_DATA, "mock_xml", xml_path), "r", encoding="utf-8") as file:
+            xml_content = file.read()
+
+        # Test
+        instances = self.api.get_batch_instances(xml_content, outer_key, inner_key, type_name)
+
+        # Assert
+        assert_that([instance.id for instance in instances]).is_equal_to(expected_ids)
+        assert_that(all(isinstance(instance, type_name) for instance in instances)).is_true()
+
+    def test_clarity_api_expand_stubs_batch_retrieve(self):
+        """
+        Test expanding stubs through the batch retrieve endpoint keeps input order
+        """
+
+        # Setup
+        with open(os.path.join(API_TEST_DATA, "mock_xml", "artifacts_batch.xml"), "r", encoding="utf-8") as file:
+            xml_content = file.read()
+        stubs = [
+            Stub(uri="https://localhost:8080/api/v2/artifacts/92-8332746?state=5959896"),
+            Stub(uri="https://localhost:8080/api/v2/artifacts/2-8332743"),
+            Stub(uri="https://localhost:8080/api/v2/artifacts/STR6918A110PA1"),
+        ]
+        api = ClarityLims(baseuri="https://localhost:8080", username="test", password="test")
+        api.post_with_uri = Mock(return_value=xml_content)
+
+        # Test
+        artifacts = api.expand_stubs(stubs, Artifact, batch_size=2)
+
+        # Assert
+        assert_that(api.post_with_uri.call_count).is_equal_to(2)
+        uri, body = api.post_with_uri.call_args_list[0].args
+        assert_that(uri).is_equal_to("https://localhost:8080/api/v2/artifacts/batch/retrieve")
+        assert_that(body.decode()).contains('<link uri="https://localhost:8080/api/v2/artifacts/2-8332743" rel="artifacts" />')
+        assert_that([artifact.limsid for artifact in artifacts]).is_equal_to(["92-8332746", "2-8332743", "STR6918A110PA1"])
+
+    def test_clarity_api_batch_retrieve_missing_item(self):
+        """
+        Test a stub missing from the batch response raises
+        """
+
+        # Setup
+        with open(os.path.join(API_TEST_DATA, "mock_xml", "samples_batch.xml"), "r", encoding="utf-8") as file:
+            xml_content = file.read()
+        stubs = [Stub(uri="https://localhost:8080/api/v2/samples/VIV6902A1"), Stub(uri="https://localhost:8080/api/v2/samples/MISSING")]
+        api = ClarityLims(baseuri="https://localhost:8080", username="test", password="test")
+        api.post_with_uri = Mock(return_value=xml_content)
+
+        # Test and Assert
+        assert_that(api.batch_retrieve).raises(KeyError).when_called_with(stubs, Sample)
+
 
 # Create class level mock API
 @pytest.fixture(scope="class", autouse=True)
@@ -286,6 +491,43 @@ class TestClarityEndpoints:
         # Test and Assert
         assert_that(self.lims.expand_stubs(labs, Lab)).is_length(len(labs))
 
+    def test_clarity_api_expand_stubs_concurrent_keeps_order(self):
+        """
+        Test concurrent expansion returns the same ordered results as sequential expansion
+        """
+
+        # Setup
+        labs = self.lims.get_stub_list(Lab, Stub, "labs", "lab:labs", "lab")
+
+        # Test
+        sequential = self.lims.expand_stubs(labs, Lab)
+        concurrent = self.lims.expand_stubs(labs, Lab, max_workers=8)
+
+        # Assert
+        assert_that([lab.id for lab in concurrent]).is_equal_to([lab.id for lab in sequential])
+
+    @pytest.mark.parametrize("max_workers", [1, 4])
+    def test_clarity_api_expand_stubs_propagates_error(self, max_workers):
+        """
+        Test a failing stub raises in both the sequential and concurrent paths
+        """
+
+        # Setup
+        with open(os.path.join(API_TEST_DATA, "mock_xml", "lab.xml"), "r", encoding="utf-8") as file:
+            xml_content = file.read()
+        stubs = [Stub(uri=f"https://localhost:8080/api/v2/labs/{lab_id}") for lab_id in ["1", "bad", "3"]]
+
+        def fake_get(uri, *args, **kwargs):  # pylint: disable=unused-argument
+            if uri.endswith("bad"):
+                raise requests.exceptions.HTTPError(f"{uri} - 404: Not found")
+            return xml_content
+
+        api = ClarityLims(baseuri="https://localhost:8080", username="test", password="test")
+        api.get_with_uri = Mock(side_effect=fake_get)
+
+        # Test and Assert
+        assert_that(api.expand_stubs).raises(requests.exceptions.HTTPError).when_called_with(stubs, Lab, max_workers=max_workers)
+
 
 class TestClarityPrototype(unittest.TestCase):
     """
@@ -0,0 +1,138 @@
+"""
+Clarity mirror tests
+"""
+
+# pylint: disable=missing-function-docstring,missing-class-docstring,no-member
+
+import os
+
+import pytest
+from assertpy import assert_that
+
+from asf_tools.api.clarity.clarity_helper_lims import ClarityHelperLims
+from asf_tools.api.clarity.mirror import ClarityMirror
+from asf_tools.api.clarity.models import Artifact, Process, Project, Sample
+from asf_tools.api.clarity.run_graph import RunGraph
+from asf_tools.database.db import Database
+from tests.utils import FakeClarity
+
+
+BASEURI = "https://asf-claritylims.thecrick.org"
+LISTS = {
+    "projects": ("prj:projects", "prj", "project", "http://genologics.com/ri/project"),
+    "processes": ("prc:processes", "prc", "process", "http://genologics.com/ri/process"),
+    "samples": ("smp:samples", "smp", "sample", "http://genologics.com/ri/sample"),
+}
+
+
+def list_xml(endpoint, item_ids):
+    outer_key, prefix, inner_key, namespace = LISTS[endpoint]
+    items = "".join(f'<{inner_key} limsid="{item_id}" uri="{BASEURI}/api/v2/{endpoint}/{item_id}"/>' for item_id in item_ids)
+    return f'<{outer_key} xmlns:{prefix}="{namespace}">{items}</{outer_key}>'
+
+
+class FakeMirrorClarity(FakeClarity):
+    """
+    Serve the mock XML fixtures for the changed projects and processes
+    """
+
+    def __init__(self):
+        super().__init__(["project", "process", "sample", "artifact"])
+        self.changed = {"projects": ["GOL2"], "processes": ["24-39409"]}
+
+    def respond(self, endpoint, item_id, params):
+        if endpoint == "samples" and not item_id:
+            return list_xml("samples", [f"{params['projectlimsid']}A{index}" for index in range(2)])
+        if not item_id:
+            return list_xml(endpoint, self.changed[endpoint])
+        if endpoint == "samples":
+            return self.fixtures["sample"].replace("VIV6902A1", item_id)
+        if endpoint == "artifacts":
+            return self.fixtures["artifact"].replace("2-8332743", item_id)
+        return self.fixtures[{"projects": "project", "processes": "process"}[endpoint]]
+
+
+@pytest.fixture(name="mirror")
+def fixture_mirror(tmp_path):
+    api = FakeMirrorClarity().attach(ClarityHelperLims(baseuri=BASEURI, username="test", password="test"))
+    return ClarityMirror(api, Database(f"sqlite:///{os.path.join(tmp_path, 'mirror.db')}"))
+
+
+class TestClarityMirror:
+    def test_clarity_mirror_initial_sync(self, mirror):
+        # Test
+        counts = mirror.sync()
+
+        # Assert
+        assert_that(counts).is_equal_to({"Project": 1, "Sample": 2, "Process": 1, "Artifact": 96})
+        assert_that(mirror.ids(Sample)).contains_only("GOL2A0", "GOL2A1")
+        assert_that(mirror.get_watermark("Project")).matches(r"^\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.000Z$")
+        assert_that([params for (uri, params) in mirror.api.fake.requests if uri.endswith("/projects")]).is_equal_to([()])
+
+    def test_clarity_mirror_incremental_sync(self, mirror, monkeypatch):
+        # Setup
+        monkeypatch.setattr(mirror, "now", lambda: "2024-01-01T00:05:00.000Z")
+        mirror.sync()
+        mirror.api.fake.requests.clear()
+        mirror.api.fake.changed = {"projects": ["GOL2"], "processes": []}
+
+        # Test
+        counts = mirror.sync()
+
+        # Assert
+        assert_that(counts).is_equal_to({"Project": 1, "Sample": 2, "Process": 0, "Artifact": 0})
+        assert_that(mirror.api.fake.requests).contains_key(
+            (f"{BASEURI}/api/v2/projects", (("last-modified", "2024-01-01T00:00:00.000Z"),)),
+            (f"{BASEURI}/api/v2/processes", (("last-modified", "2024-01-01T00:00:00.000Z"),)),
+        )
+        assert_that([uri for (uri, _) in mirror.api.fake.requests if "/artifacts/" in uri]).is_empty()
+
+    def test_clarity_mirror_overlap_refetch_idempotent(self, mirror, monkeypatch):
+        # Setup
+        monkeypatch.setattr(mirror, "now", lambda: "2024-01-01T00:00:30.000Z")
+        mirror.overlap = 60
+        mirror.sync()
+        samples = mirror.ids(Sample)
+
+        # Test
+        counts = mirror.sync()
+
+        # Assert
+        assert_that(mirror.get_watermark("Process")).is_equal_to("2023-12-31T23:59:30.000Z")
+        assert_that(counts["Process"]).is_equal_to(1)
+        assert_that(mirror.ids(Sample)).is_equal_to(samples)
+        assert_that(mirror.ids(Artifact)).is_length(96)
+
+    def test_clarity_mirror_local_reads(self, mirror, tmp_path):
+        # Setup
+        mirror.sync()
+        reopened = ClarityMirror(mirror.api, Database(f"sqlite:///{os.path.join(tmp_path, 'mirror.db')}"))
+        mirror.api.fake.requests.clear()
+
+        # Test
+        project = reopened.get(Project, "GOL2")
+        process = reopened.get(Process, "24-39409")
+        artifact = reopened.get(Artifact, "2-142224?state=71176")
+
+        # Assert
+        assert_that(project.name).is_equal_to("TEST18001")
+        assert_that(process.input_output_map).is_length(96)
+        assert_that(artifact.id).starts_with("2-142224")
+        assert_that(reopened.get(Sample, "missing")).is_none()
+        assert_that(mirror.api.fake.requests).is_empty()
+
+    def test_clarity_mirror_entity_cache(self, mirror):
+        # Setup
+        mirror.sync()
+        mirror.api.fake.requests.clear()
+        graph = RunGraph(objects=mirror.entity_cache())
+
+        # Test
+        sample = graph.get(Sample, "GOL2A1", lambda: pytest.fail("sample should be served by the mirror"))
+        project = graph.get(Project, "missing", lambda: "loaded")
+
+        # Assert
+        assert_that(sample.id).is_equal_to("GOL2A1")
+        assert_that(project).is_equal_to("loaded")
+        assert_that(("Project", "missing") in graph).is_true()
+        assert_that(mirror.api.fake.requests).is_empty()
@@ -0,0 +1,114 @@
+"""
+Clarity API profiling hook tests
+"""
+
+# pylint: disable=missing-function-docstring,missing-class-docstring,no-member
+
+import io
+import json
+import os
+
+import requests
+from assertpy import assert_that
+from rich.console import Console
+
+from asf_tools.api.clarity.cache import ResponseCache
+from asf_tools.api.clarity.models import Lab, Stub
+from asf_tools.api.clarity.profiler import ApiProfiler
+from tests.utils import make_labs_api, make_response
+
+
+LABS_XML = b'<lab:labs xmlns:lab="http://genologics.com/ri/lab"><lab uri="https://localhost:8080/api/v2/labs/1"><name>a</name></lab></lab:labs>'
+LAB_XML = b'<lab:lab xmlns:lab="http://genologics.com/ri/lab" uri="https://localhost:8080/api/v2/labs/1"><name>a</name></lab:lab>'
+
+
+def make_api():
+    return make_labs_api(LABS_XML, LAB_XML, cache=ResponseCache())
+
+
+class TestClarityProfiler:
+    def test_clarity_profiler_hooks_receive_request_info(self):
+        # Setup
+        api = make_api()
+        pre, post = [], []
+        api.add_hook("pre_request", lambda info: pre.append(dict(info)))
+        api.add_hook("post_request", lambda info: post.append(dict(info)))
+
+        # Test
+        api.get("labs", {"name": "a"})
+        api.get("labs", {"name": "a"})
+
+        # Assert
+        assert_that(pre).is_length(2)
+        assert_that(pre[0]).contains_entry({"method": "GET"}, {"category": "labs"}, {"status": None})
+        assert_that(post[0]).contains_entry({"status": 200}, {"bytes": len(LABS_XML)}, {"cache_hit": False})
+        assert_that(post[1]).contains_entry({"cache_hit": True}, {"uri": "https://localhost:8080/api/v2/labs?name=a"})
+        assert_that(post[0]["latency"]).is_greater_than_or_equal_to(0)
+
+    def test_clarity_profiler_latency_uses_perf_counter(self, monkeypatch):
+        # Setup
+        api = make_api()
+        post = []
+        api.add_hook("post_request", lambda info: post.append(dict(info)))
+        ticks = iter(range(100))
+        monkeypatch.setattr("asf_tools.api.clarity.clarity_lims.time.perf_counter", lambda: float(next(ticks)))
+
+        # Test
+        api.get("labs/1")
+
+        # Assert
+        assert_that(post[0]["latency"]).is_equal_to(1.0)
+
+    def test_clarity_profiler_records_errors(self):
+        # Setup
+        api = make_api()
+        api.request_session.get.side_effect = None
+        api.request_session.get.return_value = make_response(b"<exception><message>Not found</message></exception>", 404)
+        profiler = ApiProfiler()
+        profiler.attach(api)
+
+        # Test and Assert
+        assert_that(api.get).raises(requests.exceptions.HTTPError).when_called_with("labs/99")
+        assert_that(profiler.summary()["labs"]).contains_entry({"requests": 1}, {"errors": 1})
+
+    def test_clarity_profiler_add_hook_unknown_event(self):
+        # Test and Assert
+        assert_that(make_api().add_hook).raises(ValueError).when_called_with("pre_parse", print)
+
+    def test_clarity_profiler_summary(self):
+        # Setup
+        api = make_api()
+        profiler = ApiProfiler()
+        profiler.attach(api)
+
+        # Test
+        stubs = api.get_instances("lab:labs", "lab", Stub, "labs")
+        api.expand_stubs(stubs, Lab)
+        api.expand_stubs(stubs, Lab)
+        summary = profiler.summary()
+
+        # Assert
+        assert_that(summary).contains_only("labs")
+        assert_that(summary["labs"]).contains_entry({"requests": 3}, {"cache_hits": 1}, {"errors": 0}, {"repeated": 1})
+        assert_that(summary["labs"]["bytes"]).is_equal_to(len(LABS_XML) + 2 * len(LAB_XML))
+        assert_that(summary["labs"]["parse_time"]).is_greater_than(0)
+
+    def test_clarity_profiler_print_and_export(self, tmp_path):
+        # Setup
+        api = make_api()
+        profiler = ApiProfiler()
+        profiler.attach(api)
+        api.get_instances("lab:labs", "lab", Stub, "labs")
+        output = io.StringIO()
+        json_path = os.path.join(tmp_path, "profile.json")
+
+        # Test
+        profiler.print_summary(Console(file=output, width=200))
+        profiler.to_json(json_path)
+
+        # Assert
+        assert_that(output.getvalue()).contains("Clarity API Profile", "labs")
+        with open(json_path, "r", encoding="UTF-8") as file:
+            data = json.load(file)
+        assert_that(data["summary"]["labs"]["requests"]).is_equal_to(1)
+        assert_that(data["requests"][0]["uri"]).is_equal_to("https://localhost:8080/api/v2/labs")
@@ -0,0 +1,171 @@
+"""
+Clarity reagent type index tests
+"""
+
+# pylint: disable=missing-function-docstring,missing-class-docstring,no-member
+
+import logging
+from collections import Counter
+
+import pytest
+from assertpy import assert_that
+
+from asf_tools.api.clarity.clarity_helper_lims import ClarityHelperLims
+
+
+BASEURI = "https://localhost:8080"
+REAGENT_TYPES = {
+    "1": ("N701-N501 (TAAGGCGA-TAGATCGC)", "Illumina", "Sequence", "TAAGGCGA-TAGATCGC"),
+    "2": ("BC01 (AAGAAAGTTGTCGGTGTCTTTGTG)", "Nanopore", "Sequence", "AAGAAAGTTGTCGGTGTCTTTGTG"),
+    "3": ("Broken", "Illumina", "Index", "AAAA"),
+}
+
+
+def reagent_type_xml(item_id):
+    name, category, attribute, value = REAGENT_TYPES[item_id]
+    return (
+        f'<rtp:reagent-type xmlns:rtp="http://genologics.com/ri/reagenttype" uri="{BASEURI}/api/v2/reagenttypes/{item_id}" name="{name}">'
+        f'<special-type name="Index"><attribute name="{attribute}" value="{value}"/></special-type>'
+        f"<reagent-category>{category}</reagent-category></rtp:reagent-type>"
+    )
+
+
+def reagent_types_xml(item_ids):
+    stubs = "".join(f'<reagent-type uri="{BASEURI}/api/v2/reagenttypes/{item_id}" name="{REAGENT_TYPES[item_id][0]}"/>' for item_id in item_ids)
+    return f'<rtp:reagent-types xmlns:rtp="http://genologics.com/ri/reagenttype">{stubs}</rtp:reagent-types>'
+
+
+class FakeReagentTypes:
+    """
+    Serve reagent type XML and count the requests made for each URI
+    """
+
+    def __init__(self):
+        self.requests = Counter()
+
+    def get_with_uri(self, uri, params=None, accept_status_codes=[200]):  # pylint: disable=unused-argument,dangerous-default-value
+        name = (params or {}).get("name")
+        self.requests[uri if name is None else f"{uri}?name={name}"] += 1
+        path = uri.split("/api/v2/reagenttypes")[1]
+        if name is not None:
+            return reagent_types_xml([item_id for item_id, reagent_type in REAGENT_TYPES.items() if reagent_type[0] == name])
+        if path == "":
+            return reagent_types_xml(list(REAGENT_TYPES))
+        return reagent_type_xml(path[1:])
+
+
+@pytest.fixture(name="helper")
+def fixture_helper():
+    api = ClarityHelperLims(baseuri=BASEURI, username="test", password="test")
+    fake = FakeReagentTypes()
+    api.get_with_uri = fake.get_with_uri
+    api.fake = fake
+    return api
+
+
+class TestReagentTypeIndex:
+    def test_reagent_type_index_memoises_lookups(self, helper):
+        # Test
+        first = helper.get_barcode_from_reagenttypes("N701-N501 (TAAGGCGA-TAGATCGC)")
+        second = helper.get_barcode_from_reagenttypes("N701-N501 (TAAGGCGA-TAGATCGC)")
+
+        # Assert
+        assert_that(first).is_equal_to("TAAGGCGA-TAGATCGC")
+        assert_that(second).is_equal_to(first)
+        assert_that(helper.fake.requests).is_length(2)
+        assert_that(max(helper.fake.requests.values())).is_equal_to(1)
+        assert_that(helper.fake.requests).contains_key(f"{BASEURI}/api/v2/reagenttypes?name=N701-N501 (TAAGGCGA-TAGATCGC)")
+
+    def test_reagent_type_index_fallback_warns_on_every_lookup(self, helper, caplog):
+        # Test
+        with caplog.at_level(logging.WARNING):
+            results = [helper.get_barcode_from_reagenttypes("missing"), helper.get_barcode_from_reagenttypes("missing")]
+
+        # Assert
+        assert_that(results).is_equal_to(["missing", "missing"])
+        assert_that([record.levelname for record in caplog.records]).is_equal_to(["WARNING", "WARNING"])
+        assert_that(sum(helper.fake.requests.values())).is_equal_to(1)
+
+    def test_reagent_type_index_ttl_expiry(self, helper, monkeypatch):
+        # Setup
+        now = [1000.0]
+        monkeypatch.setattr("asf_tools.api.clarity.reagent_type_index.time.monotonic", lambda: now[0])
+        helper.reagent_types.ttl = 60
+
+        # Test
+        helper.get_barcode_from_reagenttypes("N701-N501 (TAAGGCGA-TAGATCGC)")
+        now[0] += 30
+        helper.get_barcode_from_reagenttypes("N701-N501 (TAAGGCGA-TAGATCGC)")
+        now[0] += 60
+        helper.get_barcode_from_reagenttypes("N701-N501 (TAAGGCGA-TAGATCGC)")
+
+        # Assert
+        assert_that(sum(helper.fake.requests.values())).is_equal_to(4)
+
+    def test_reagent_type_index_preload(self, helper, caplog):
+        # Test
+        count = helper.reagent_types.preload()
+        helper.fake.requests.clear()
+        with caplog.at_level(logging.WARNING):
+            barcodes = [helper.get_barcode_from_reagenttypes(reagent_type[0]) for reagent_type in REAGENT_TYPES.values()]
+
+        # Assert
+        assert_that(count).is_equal_to(3)
+        assert_that(barcodes).is_equal_to(["TAAGGCGA-TAGATCGC", "AAGAAAGTTGTCGGTGTCTTTGTG", "Broken"])
+        assert_that(helper.fake.requests).is_empty()
+        assert_that(caplog.records).is_length(1)
+
+    def test_reagent_type_index_preload_category(self, helper):
+        # Test
+        count = helper.reagent_types.preload("Nanopore")
+
+        # Assert
+        assert_that(count).is_equal_to(1)
+        assert_that(helper.reagent_types.get("BC01 (AAGAAAGTTGTCGGTGTCTTTGTG)")).is_equal_to(("AAGAAAGTTGTCGGTGTCTTTGTG", None))
+        assert_that(helper.reagent_types.get("N701-N501 (TAAGGCGA-TAGATCGC)")).is_none()
+
+    def test_reagent_type_index_ambiguous_lookup(self, helper, monkeypatch):
+        # Setup
+        monkeypatch.setitem(REAGENT_TYPES, "4", ("BC01 (AAGAAAGTTGTCGGTGTCTTTGTG)", "Nanopore", "Sequence", "AAGAAAGTTGTCGGTGTCTTTGTG"))
+
+        # Test
+        resolved = helper.reagent_types.lookup("BC01 (AAGAAAGTTGTCGGTGTCTTTGTG)")
+
+        # Assert
+        assert_that(resolved).is_equal_to((None, "2 reagent types named 'BC01 (AAGAAAGTTGTCGGTGTCTTTGTG)' in Clarity. Returning fallback barcode."))
+        assert_that(sum(helper.fake.requests.values())).is_equal_to(1)
+
+    def test_reagent_type_index_preload_skips_ambiguous_details(self, helper, monkeypatch):
+        # Setup
+        monkeypatch.setitem(REAGENT_TYPES, "4", ("BC01 (AAGAAAGTTGTCGGTGTCTTTGTG)", "Nanopore", "Sequence", "AAGAAAGTTGTCGGTGTCTTTGTG"))
+
+        # Test
+        count = helper.reagent_types.preload()
+
+        # Assert
+        assert_that(count).is_equal_to(3)
+        assert_that(helper.reagent_types.get("BC01 (AAGAAAGTTGTCGGTGTCTTTGTG)")[0]).is_none()
+        assert_that(helper.fake.requests).does_not_contain_key(f"{BASEURI}/api/v2/reagenttypes/2", f"{BASEURI}/api/v2/reagenttypes/4")
+        assert_that(sum(helper.fake.requests.values())).is_equal_to(3)
+
+    def test_reagent_type_index_lookup_all_preloads_many_names(self, helper):
+        # Test
+        resolved = helper.reagent_types.lookup_all(["N701-N501 (TAAGGCGA-TAGATCGC)", "BC01 (AAGAAAGTTGTCGGTGTCTTTGTG)", "missing"])
+
+        # Assert
+        assert_that(resolved["N701-N501 (TAAGGCGA-TAGATCGC)"]).is_equal_to(("TAAGGCGA-TAGATCGC", None))
+        assert_that(resolved["BC01 (AAGAAAGTTGTCGGTGTCTTTGTG)"]).is_equal_to(("AAGAAAGTTGTCGGTGTCTTTGTG", None))
+        assert_that(resolved["missing"][0]).is_none()
+        assert_that(helper.fake.requests).does_not_contain_key(f"{BASEURI}/api/v2/reagenttypes?name=N701-N501 (TAAGGCGA-TAGATCGC)")
+        assert_that(helper.fake.requests).contains_key(f"{BASEURI}/api/v2/reagenttypes", f"{BASEURI}/api/v2/reagenttypes?name=missing")
+        assert_that(sum(helper.fake.requests.values())).is_equal_to(5)
+
+    def test_reagent_type_index_lookup_all_few_names(self, helper):
+        # Test
+        resolved = helper.reagent_types.lookup_all(["N701-N501 (TAAGGCGA-TAGATCGC)"])
+        helper.reagent_types.lookup_all(["N701-N501 (TAAGGCGA-TAGATCGC)"])
+
+        # Assert
+        assert_that(resolved).is_equal_to({"N701-N501 (TAAGGCGA-TAGATCGC)": ("TAAGGCGA-TAGATCGC", None)})
+        assert_that(helper.fake.requests).does_not_contain_key(f"{BASEURI}/api/v2/reagenttypes/2", f"{BASEURI}/api/v2/reagenttypes/3")
+        assert_that(sum(helper.fake.requests.values())).is_equal_to(3)
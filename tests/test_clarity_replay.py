@@ -0,0 +1,107 @@
+"""
+Clarity API record and replay tests
+"""
+
+# pylint: disable=missing-function-docstring,missing-class-docstring,no-member
+
+import os
+import zipfile
+
+import requests
+from assertpy import assert_that
+
+from asf_tools.api.clarity.cache import DiskResponseCache
+from asf_tools.api.clarity.models import Lab, Stub
+from asf_tools.api.clarity.replay import ReplayMissError, TrafficArchive, request_key
+from tests.utils import make_labs_api
+
+
+BASEURI = "https://localhost:8080"
+LABS_XML = (
+    b'<lab:labs xmlns:lab="http://genologics.com/ri/lab">'
+    b'<lab uri="https://localhost:8080/api/v2/labs/1"><name>a</name></lab>'
+    b'<lab uri="https://localhost:8080/api/v2/labs/2"><name>a</name></lab>'
+    b"</lab:labs>"
+)
+LAB_XML = b'<lab:lab xmlns:lab="http://genologics.com/ri/lab" uri="https://localhost:8080/api/v2/labs/1"><name>a</name></lab:lab>'
+
+
+def make_api(baseuri=BASEURI):
+    return make_labs_api(LABS_XML, LAB_XML, baseuri)
+
+
+class TestClarityReplay:
+    def test_clarity_replay_round_trip(self, tmp_path):
+        # Setup
+        archive_path = os.path.join(tmp_path, "traffic.zip")
+        recorder = make_api()
+        archive = TrafficArchive(archive_path)
+        archive.record(recorder)
+        recorded = recorder.expand_stubs(recorder.get_instances("lab:labs", "lab", Stub, "labs", {"name": "a"}), Lab)
+        archive.save()
+
+        # Test
+        replayer = make_api(baseuri="")
+        replayer.request_session = None
+        TrafficArchive(archive_path).replay(replayer)
+        replayed = replayer.expand_stubs(replayer.get_instances("lab:labs", "lab", Stub, "labs", {"name": "a"}), Lab)
+
+        # Assert
+        assert_that(replayer.baseuri).is_equal_to(BASEURI)
+        assert_that(replayed).is_equal_to(recorded)
+        assert_that(replayer.get).raises(ReplayMissError).when_called_with("labs/3")
+
+    def test_clarity_replay_archive_content_addressed(self, tmp_path):
+        # Setup
+        archive_path = os.path.join(tmp_path, "traffic.zip")
+        api = make_api()
+        archive = TrafficArchive(archive_path)
+        archive.record(api)
+
+        # Test
+        api.get("labs/1")
+        api.get("labs/2")
+        api.post_with_uri(f"{BASEURI}/api/v2/artifacts/batch/retrieve", b"<links/>")
+        archive.save()
+
+        # Assert
+        assert_that(archive).is_length(3)
+        assert_that(request_key("POST", f"{BASEURI}/api/v2/artifacts/batch/retrieve", data=b"<links/>") in archive).is_true()
+        with zipfile.ZipFile(archive_path) as zipped:
+            names = zipped.namelist()
+            assert_that(zipped.getinfo("index.json").compress_type).is_equal_to(zipfile.ZIP_DEFLATED)
+        assert_that(names).contains("index.json")
+        assert_that([name for name in names if name.startswith("blobs/")]).is_length(2)
+
+    def test_clarity_replay_status_codes(self, tmp_path):
+        # Setup
+        archive = TrafficArchive(os.path.join(tmp_path, "traffic.zip"))
+        archive.add(request_key("GET", f"{BASEURI}/api/v2/labs/9"), 404, b"<exception><message>Not found</message></exception>")
+        api = make_api()
+        archive.replay(api)
+
+        # Test and Assert
+        assert_that(api.get).raises(requests.exceptions.HTTPError).when_called_with("labs/9")
+
+    def test_clarity_replay_bypasses_disk_cache(self, tmp_path):
+        # Setup
+        disk_cache = DiskResponseCache(os.path.join(tmp_path, "cache"))
+        warm = make_api()
+        warm.cache = disk_cache
+        warm.get("labs/1")
+        archive_path = os.path.join(tmp_path, "traffic.zip")
+        recorder = make_api()
+        recorder.cache = disk_cache
+
+        # Test
+        archive = TrafficArchive(archive_path)
+        archive.record(recorder)
+        recorder.get("labs/1")
+        replayer = make_api()
+        replayer.cache = disk_cache
+        TrafficArchive(os.path.join(tmp_path, "empty.zip")).replay(replayer)
+
+        # Assert
+        assert_that(request_key("GET", f"{BASEURI}/api/v2/labs/1") in archive).is_true()
+        assert_that(recorder.cache).is_not_same_as(disk_cache)
+        assert_that(replayer.get).raises(ReplayMissError).when_called_with("labs/1")
@@ -0,0 +1,241 @@
+"""
+Clarity API retry and circuit breaker tests
+"""
+
+# pylint: disable=missing-function-docstring,missing-class-docstring,no-member
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+from assertpy import assert_that
+
+from asf_tools.api.clarity.clarity_lims import ClarityLims
+from asf_tools.api.clarity.retry import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+
+class FakeClarityHandler(BaseHTTPRequestHandler):
+    """
+    Serve the next scripted (status code, delay) response for every request
+    """
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        status_code, delay = self.server.responses.pop(0) if self.server.responses else (200, 0)
+        self.server.requests.append(self.path)
+        time.sleep(delay)
+        body = b'<lab:lab xmlns:lab="http://genologics.com/ri/lab"><name>babs</name></lab:lab>'
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+@pytest.fixture(name="fake_server")
+def fixture_fake_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeClarityHandler)
+    server.responses = []
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_api(server, **kwargs):
+    return ClarityLims(baseuri=f"http://127.0.0.1:{server.server_address[1]}", username="test", password="test", **kwargs)
+
+
+class TestClarityRetry:
+    def test_clarity_retry_backoff_grows_and_is_capped(self):
+        # Setup
+        policy = RetryPolicy(backoff_factor=1, max_backoff=5, jitter=0)
+
+        # Test and Assert
+        assert_that([policy.backoff(attempt) for attempt in range(1, 6)]).is_equal_to([1, 2, 4, 5, 5])
+        assert_that(policy.backoff(1, "3")).is_equal_to(3)
+        assert_that(policy.backoff(1, "Wed, 21 Oct 2015 07:28:00 GMT")).is_equal_to(1)
+
+    def test_clarity_retry_backoff_jitter_range(self):
+        # Setup
+        policy = RetryPolicy(backoff_factor=2, jitter=0.5)
+
+        # Test
+        delays = [policy.backoff(2) for _ in range(100)]
+
+        # Assert
+        assert_that(min(delays)).is_greater_than_or_equal_to(2)
+        assert_that(max(delays)).is_less_than_or_equal_to(4)
+
+    def test_clarity_retry_disabled_by_default(self, fake_server):
+        # Setup
+        fake_server.responses = [(503, 0)]
+        api = make_api(fake_server)
+
+        # Test and Assert
+        assert_that(api.get).raises(requests.exceptions.HTTPError).when_called_with("labs/1")
+        assert_that(fake_server.requests).is_length(1)
+        assert_that(api.metrics.retries).is_equal_to(0)
+
+    def test_clarity_retry_server_errors_then_success(self, fake_server):
+        # Setup
+        fake_server.responses = [(503, 0), (429, 0)]
+        api = make_api(fake_server, retry=RetryPolicy(max_attempts=3, backoff_factor=0))
+
+        # Test
+        content = api.get("labs/1")
+
+        # Assert
+        assert_that(content).contains(b"babs")
+        assert_that(fake_server.requests).is_length(3)
+        assert_that(api.metrics.stats()).is_equal_to(
+            {"requests": 1, "attempts": 3, "retries": 2, "failures": 0, "rejected": 0, "status_codes": {503: 1, 429: 1, 200: 1}}
+        )
+
+    def test_clarity_retry_gives_up_after_max_attempts(self, fake_server):
+        # Setup
+        fake_server.responses = [(500, 0), (500, 0), (500, 0)]
+        api = make_api(fake_server, retry=RetryPolicy(max_attempts=2, backoff_factor=0))
+
+        # Test and Assert
+        assert_that(api.get).raises(requests.exceptions.HTTPError).when_called_with("labs/1")
+        assert_that(fake_server.requests).is_length(2)
+        assert_that(api.metrics.failures).is_equal_to(1)
+
+    def test_clarity_retry_client_errors_not_retried(self, fake_server):
+        # Setup
+        fake_server.responses = [(404, 0)]
+        api = make_api(fake_server, retry=RetryPolicy(max_attempts=3, backoff_factor=0))
+
+        # Test and Assert
+        assert_that(api.get).raises(requests.exceptions.HTTPError).when_called_with("labs/1")
+        assert_that(fake_server.requests).is_length(1)
+
+    def test_clarity_retry_timeout_then_success(self, fake_server):
+        # Setup
+        fake_server.responses = [(200, 0.5)]
+        api = make_api(fake_server, retry=RetryPolicy(max_attempts=2, backoff_factor=0))
+        api.API_TIMEOUT = 0.1
+
+        # Test
+        content = api.get("labs/1")
+
+        # Assert
+        assert_that(content).contains(b"babs")
+        assert_that(api.metrics.retries).is_equal_to(1)
+
+    def test_clarity_retry_timeout_raises_when_exhausted(self, fake_server):
+        # Setup
+        fake_server.responses = [(200, 0.5)]
+        api = make_api(fake_server, retry=RetryPolicy(max_attempts=1))
+        api.API_TIMEOUT = 0.1
+
+        # Test and Assert
+        assert_that(api.get).raises(requests.exceptions.Timeout).when_called_with("labs/1")
+
+    def test_clarity_retry_post_not_retried_unless_idempotent(self, fake_server):
+        # Setup
+        api = make_api(fake_server, retry=RetryPolicy(max_attempts=3, backoff_factor=0))
+        responses = [requests.exceptions.ConnectionError("down"), requests.exceptions.ConnectionError("down")]
+
+        def post(uri, **kwargs):  # pylint: disable=unused-argument
+            if responses:
+                raise responses.pop(0)
+            return requests.get(uri, timeout=1)
+
+        api.request_session.post = post
+
+        # Test and Assert
+        assert_that(api.post_with_uri).raises(requests.exceptions.ConnectionError).when_called_with(api.construct_uri("labs/1"), b"")
+        assert_that(api.post_with_uri(api.construct_uri("labs/1"), b"", idempotent=True)).contains(b"babs")
+
+
+class TestClarityCircuitBreaker:
+    def test_clarity_circuit_breaker_disabled_by_default(self, fake_server):
+        # Setup
+        fake_server.responses = [(503, 0)] * 11
+        api = make_api(fake_server)
+
+        # Test
+        for _ in range(11):
+            assert_that(api.get).raises(requests.exceptions.HTTPError).when_called_with("labs/1")
+
+        # Assert
+        assert_that(api.circuit_breaker).is_none()
+        assert_that(api.get("labs/1")).contains(b"babs")
+        assert_that(fake_server.requests).is_length(12)
+        assert_that(api.metrics.rejected).is_equal_to(0)
+
+    def test_clarity_circuit_breaker_opens_and_rejects(self, fake_server):
+        # Setup
+        fake_server.responses = [(503, 0), (503, 0)]
+        api = make_api(fake_server, retry=RetryPolicy(max_attempts=1), circuit_breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+
+        # Test
+        for _ in range(2):
+            assert_that(api.get).raises(requests.exceptions.HTTPError).when_called_with("labs/1")
+
+        # Assert
+        assert_that(api.circuit_breaker.state).is_equal_to(CircuitBreaker.OPEN)
+        assert_that(api.get).raises(CircuitOpenError).when_called_with("labs/1")
+        assert_that(fake_server.requests).is_length(2)
+        assert_that(api.metrics.rejected).is_equal_to(1)
+
+    def test_clarity_circuit_breaker_half_open_trial(self):
+        # Setup
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+
+        # Test
+        breaker.before_request("labs")
+
+        # Assert
+        assert_that(breaker.state).is_equal_to(CircuitBreaker.HALF_OPEN)
+        assert_that(breaker.before_request).raises(CircuitOpenError).when_called_with("labs")
+        breaker.record_success()
+        assert_that(breaker.state).is_equal_to(CircuitBreaker.CLOSED)
+
+    def test_clarity_circuit_breaker_failed_trial_reopens(self):
+        # Setup
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0)
+        breaker.state = CircuitBreaker.HALF_OPEN
+
+        # Test
+        breaker.record_failure()
+
+        # Assert
+        assert_that(breaker.state).is_equal_to(CircuitBreaker.OPEN)
+
+    def test_clarity_circuit_breaker_success_resets_failures(self):
+        # Setup
+        breaker = CircuitBreaker(failure_threshold=2)
+
+        # Test
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+
+        # Assert
+        assert_that(breaker.state).is_equal_to(CircuitBreaker.CLOSED)
+
+    def test_clarity_circuit_breaker_trial_other_error_reopens(self):
+        # Setup
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        api = ClarityLims("http://localhost", username="test", password="test", circuit_breaker=breaker)
+        breaker.record_failure()
+
+        def broken_body(uri, **kwargs):
+            raise requests.exceptions.ChunkedEncodingError("Connection broken")
+
+        # Test
+        assert_that(api.send_request).raises(requests.exceptions.ChunkedEncodingError).when_called_with(broken_body, "http://localhost/api/v2/labs")
+
+        # Assert
+        assert_that(breaker.state).is_equal_to(CircuitBreaker.OPEN)
+        assert_that(api.metrics.stats()["failures"]).is_equal_to(1)
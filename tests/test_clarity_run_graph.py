@@ -0,0 +1,327 @@
+"""
+Clarity run graph tests
+"""
+
+# pylint: disable=missing-function-docstring,missing-class-docstring,no-member
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from assertpy import assert_that
+from requests.exceptions import HTTPError
+
+from asf_tools.api.clarity.clarity_helper_lims import ClarityHelperLims
+from asf_tools.api.clarity.models import Artifact, Lab, Process, Sample, Stub
+from asf_tools.api.clarity.run_graph import EntityCache, RunGraph
+from tests.utils import FakeClarity
+
+
+BASEURI = "https://asf-claritylims.thecrick.org"
+CONTAINERS_XML = (
+    '<con:containers xmlns:con="http://genologics.com/ri/container">'
+    f'<container uri="{BASEURI}/api/v2/containers/27-6876" limsid="27-6876"><name>RUN1</name></container>'
+    "</con:containers>"
+)
+
+
+class FakeRunClarity(FakeClarity):
+    """
+    Serve the fixtures of a run on container RUN1, giving each sample its own id
+    """
+
+    def __init__(self):
+        super().__init__(["container", "artifact", "sample", "project", "researcher", "lab"])
+
+    def respond(self, endpoint, item_id, params):
+        if endpoint == "containers" and not item_id:
+            return CONTAINERS_XML
+        if endpoint == "samples":
+            return self.fixtures["sample"].replace("VIV6902A1", item_id)
+        return super().respond(endpoint, item_id, params)
+
+
+@pytest.fixture(name="helper")
+def fixture_helper():
+    return FakeRunClarity().attach(ClarityHelperLims(baseuri=BASEURI, username="test", password="test"))
+
+
+class TestRunGraph:
+    def test_run_graph_get_and_add(self):
+        # Setup
+        graph = RunGraph("RUN1")
+        lab = Lab(uri=f"{BASEURI}/api/v2/labs/2", name="babs")
+        loads = []
+
+        # Test
+        graph.add(Lab, "2", lab)
+        loaded = graph.get(Stub, "1", lambda: loads.append(1) or Stub(uri=f"{BASEURI}/api/v2/labs/1"))
+        graph.get(Stub, "1", lambda: loads.append(1))
+
+        # Assert
+        assert_that(graph.get(Lab, "2")).is_same_as(lab)
+        assert_that(loaded.id).is_equal_to("1")
+        assert_that(loads).is_length(1)
+        assert_that(graph).is_length(2)
+        assert_that(graph.get).raises(KeyError).when_called_with(Lab, "3")
+
+    def test_run_graph_concurrent_get_loads_once(self):
+        # Setup
+        objects = {}
+        shared = EntityCache(objects)
+        graphs = [RunGraph(f"RUN{index}", objects=shared) for index in range(2)]
+        barrier = threading.Barrier(8)
+        loads = []
+
+        def loader():
+            loads.append(1)
+            time.sleep(0.05)
+            return Lab(uri=f"{BASEURI}/api/v2/labs/2", name="babs")
+
+        def get(index):
+            barrier.wait()
+            return graphs[index % 2].get(Lab, "2", loader)
+
+        # Test
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            labs = list(executor.map(get, range(8)))
+
+        # Assert
+        assert_that(loads).is_length(1)
+        assert_that({id(lab) for lab in labs}).is_length(1)
+        assert_that(objects).contains_key(("Lab", "2"))
+
+    def test_run_graph_concurrent_get_retries_failed_load(self):
+        # Setup
+        graph = RunGraph("RUN1")
+        barrier = threading.Barrier(2)
+        attempts = []
+
+        def loader():
+            attempts.append(1)
+            time.sleep(0.05)
+            if len(attempts) == 1:
+                raise ConnectionError("lims unavailable")
+            return "loaded"
+
+        def get(_):
+            barrier.wait()
+            try:
+                return graph.get(Lab, "2", loader)
+            except ConnectionError:
+                return None
+
+        # Test
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(get, range(2)))
+
+        # Assert
+        assert_that(sorted(results, key=str)).is_equal_to([None, "loaded"])
+        assert_that(attempts).is_length(2)
+
+    def test_run_graph_load(self, helper):
+        # Test
+        graph = helper.load_run_graph("RUN1")
+
+        # Assert
+        assert_that(graph.container.id).is_equal_to("27-6876")
+        assert_that(graph.pools).is_length(96)
+        assert_that(graph.sample_ids).is_equal_to(["VIV6902A1", "VIV6902A2", "VIV6902A3", "VIV6902A4"])
+        assert_that([sample.id for sample in graph.samples]).is_equal_to(graph.sample_ids)
+        assert_that(graph.objects).contains_key(("Project", "VIV6902"), ("Researcher", "5"), ("Lab", "2"))
+        assert_that(max(helper.fake.requests.values())).is_equal_to(1)
+
+    def test_run_graph_load_invalid(self, helper):
+        # Setup
+        helper.get_containers = lambda name: None
+
+        # Test and Assert
+        assert_that(helper.load_run_graph).raises(ValueError).when_called_with(None)
+        assert_that(helper.load_run_graph).raises(KeyError).when_called_with("RUN1")
+
+    def test_run_graph_sections_match_direct_lookups(self, helper):
+        # Setup
+        expected = {}
+        for sample_id in ["VIV6902A1", "VIV6902A2", "VIV6902A3", "VIV6902A4"]:
+            expected.update(helper.get_sample_info(sample_id))
+        helper.fake.requests.clear()
+
+        # Test
+        graph = helper.load_run_graph("RUN1")
+        sample_info = helper.collect_sample_info_from_runid("RUN1", graph)
+        lane_info = helper.get_lane_from_runid("RUN1", graph)
+
+        # Assert
+        assert_that(sample_info).is_equal_to(expected)
+        assert_that(sample_info["VIV6902A2"]).contains_entry({"project_limsid": "GOL2"}, {"group": "shenoya"})
+        assert_that(lane_info["RUN1_E"]["samples"]).is_equal_to(["VIV6902A1", "VIV6902A2", "VIV6902A3", "VIV6902A4"])
+        assert_that(max(helper.fake.requests.values())).is_equal_to(1)
+
+    def test_run_graph_sample_lookups_shared(self, helper):
+        # Setup
+        graph = RunGraph()
+
+        # Test
+        helper.get_sample_info("VIV6902A1", graph)
+        helper.fake.requests.clear()
+        info = helper.get_sample_info("VIV6902A1", graph)
+
+        # Assert
+        assert_that(info).contains_key("VIV6902A1")
+        assert_that(helper.fake.requests).is_empty()
+        assert_that(graph.get(Sample, "VIV6902A1").name).is_not_empty()
+
+    def test_run_graph_lane_map_from_sample_stubs(self, helper):
+        # Test
+        lane_info = helper.get_lane_from_runid("RUN1", max_workers=4)
+
+        # Assert
+        assert_that(lane_info).is_length(8)
+        assert_that(lane_info["RUN1_E"]).contains_entry({"lane": "E"}, {"samples": ["VIV6902A1", "VIV6902A2", "VIV6902A3", "VIV6902A4"]})
+        assert_that([uri for uri, _ in helper.fake.requests if "/samples/" in uri]).is_empty()
+
+    def test_run_graph_shared_entity_cache(self, helper):
+        # Setup
+        helper.entity_cache = {}
+
+        # Test
+        first = helper.load_run_graph("RUN1")
+        helper.fake.requests.clear()
+        second = helper.load_run_graph("RUN1")
+
+        # Assert
+        assert_that(second.objects).is_same_as(first.objects)
+        assert_that(second.sample_ids).is_equal_to(first.sample_ids)
+        assert_that([uri for uri, _ in helper.fake.requests if "/containers" not in uri]).is_empty()
+
+    def test_run_graph_sample_info_bulk(self, helper):
+        # Setup
+        sample_ids = ["VIV6902A1", "VIV6902A2", "VIV6902A3", "VIV6902A4"]
+        expected = {}
+        for sample_id in sample_ids:
+            expected.update(helper.get_sample_info(sample_id))
+        helper.fake.requests.clear()
+
+        # Test
+        sample_info = helper.get_sample_info_bulk(sample_ids + ["VIV6902A1", None])
+
+        # Assert
+        assert_that(sample_info).is_equal_to(expected)
+        assert_that(list(sample_info)).is_equal_to(sample_ids)
+        assert_that(max(helper.fake.requests.values())).is_equal_to(1)
+        assert_that([uri for uri, _ in helper.fake.requests if "/projects/" in uri]).is_length(1)
+        assert_that(sum(helper.fake.requests.values())).is_equal_to(len(sample_ids) + 3)
+
+    @pytest.mark.parametrize("missing", ["get_projects", "get_researchers"])
+    def test_run_graph_sample_info_bulk_failed_submitter_lookup(self, helper, missing):
+        # Setup
+        sample_ids = ["VIV6902A1", "VIV6902A2"]
+        expected = {}
+        for sample_id in sample_ids:
+            expected.update(helper.get_sample_info(sample_id))
+        getter = getattr(helper, missing)
+        failures = [HTTPError("404 Client Error: Not Found")]
+
+        def fail_once(search_id):
+            if failures:
+                raise failures.pop()
+            return getter(search_id=search_id)
+
+        setattr(helper, missing, fail_once)
+
+        # Test
+        graph = RunGraph()
+        sample_info = helper.get_sample_info_bulk(sample_ids, graph)
+
+        # Assert the bulk load skips the failed lookup and get_sample_info fetches it again
+        assert_that(failures).is_empty()
+        assert_that(sample_info).is_equal_to(expected)
+        assert_that(list(graph.objects)).contains(("Project", "VIV6902"), ("Researcher", "5"), ("Lab", "2"))
+
+
+def make_artifact(limsid, samples, parent_process=None, reagent_label=None):
+    data = {
+        "limsid": limsid,
+        "uri": f"{BASEURI}/api/v2/artifacts/{limsid}",
+        "name": limsid,
+        "type": "Analyte",
+        "output_type": "Analyte",
+        "sample": [{"uri": f"{BASEURI}/api/v2/samples/{sample}", "limsid": sample} for sample in samples],
+    }
+    if parent_process is not None:
+        data["parent_process"] = {"uri": f"{BASEURI}/api/v2/processes/{parent_process}", "limsid": parent_process}
+    if reagent_label is not None:
+        data["reagent_label"] = {"name": reagent_label}
+    return Artifact(**data)
+
+
+def make_process(limsid, process_type, input_outputs):
+    return Process(
+        limsid=limsid,
+        uri=f"{BASEURI}/api/v2/processes/{limsid}",
+        type={"uri": f"{BASEURI}/api/v2/processtypes/1", "#text": process_type},
+        date_run="2024-01-01",
+        technician={"uri": f"{BASEURI}/api/v2/researchers/1", "first-name": "a", "last-name": "b"},
+        input_output_map=[
+            {
+                "input": {
+                    "limsid": input_id,
+                    "uri": f"{BASEURI}/api/v2/artifacts/{input_id}",
+                    "post-process-uri": f"{BASEURI}/api/v2/artifacts/{input_id}",
+                    "parent-process": {"uri": f"{BASEURI}/api/v2/processes/{parent}"} if parent else None,
+                },
+                "output": {"limsid": output_id, "uri": f"{BASEURI}/api/v2/artifacts/{output_id}", "output-type": "Analyte"},
+            }
+            for input_id, parent, output_id in input_outputs
+        ],
+    )
+
+
+class TestLineageTraversal:
+    def test_lineage_traversal_levels(self):
+        # Setup
+        # Pool <- Pooling <- Library prep (two samples) <- T Custom Indexing
+        store = {}
+        for instance in [
+            make_process("24-3", "Pooling", [("2-20", "24-2", "2-30"), ("2-21", "24-2", "2-30")]),
+            make_process("24-2", "Library Prep", [("2-10", "24-1", "2-20"), ("2-11", "24-1", "2-21")]),
+            make_process("24-1", "T Custom Indexing", [("2-00", None, "2-10"), ("2-01", None, "2-11")]),
+            make_artifact("2-20", ["S1"], "24-2"),
+            make_artifact("2-21", ["S2"], "24-2"),
+            make_artifact("2-10", ["S1"], "24-1", "BC1 (AAAA)"),
+            make_artifact("2-11", ["S2"], "24-1", "BC2 (CCCC)"),
+            Sample(
+                limsid="S1",
+                uri=f"{BASEURI}/api/v2/samples/S1",
+                name="s1",
+                date_received="2024-01-01",
+                submitter={"uri": f"{BASEURI}/api/v2/researchers/1", "first-name": "a", "last-name": "b"},
+            ),
+            Sample(
+                limsid="S2",
+                uri=f"{BASEURI}/api/v2/samples/S2",
+                name="s2",
+                date_received="2024-01-01",
+                submitter={"uri": f"{BASEURI}/api/v2/researchers/1", "first-name": "a", "last-name": "b"},
+            ),
+        ]:
+            store[instance.id] = instance
+        calls = []
+        api = ClarityHelperLims(baseuri=BASEURI, username="test", password="test")
+
+        def expand_stubs(stubs, expansion_type, **_kwargs):
+            calls.append((expansion_type.__name__, len(stubs)))
+            return [store[stub.id] for stub in stubs]
+
+        api.expand_stubs = expand_stubs
+        graph = RunGraph("RUN1")
+        graph.pools = [make_artifact("2-30", ["S1", "S2"], "24-3")]
+
+        # Test
+        barcodes = api.get_sample_barcode_from_runid("RUN1", get_bc_from_name=True, graph=graph)
+
+        # Assert
+        assert_that(barcodes).is_equal_to({"S1": {"barcode": "BC1 (AAAA)"}, "S2": {"barcode": "BC2 (CCCC)"}})
+        assert_that([level["processes"] for level in graph.lineage_levels]).is_equal_to([1, 1, 1])
+        assert_that(calls).is_equal_to([("Sample", 2), ("Process", 1), ("Artifact", 2), ("Process", 1), ("Artifact", 2), ("Process", 1)])
@@ -0,0 +1,81 @@
+"""
+Clarity API transport tests
+"""
+
+# pylint: disable=missing-function-docstring,missing-class-docstring,no-member
+
+from unittest.mock import Mock
+
+import requests
+from assertpy import assert_that
+
+from asf_tools.api.clarity.clarity_lims import ClarityLims
+from asf_tools.api.clarity.transport import RateLimiter, create_session, shared_session
+
+
+class TestClarityTransport:
+    def test_clarity_transport_rate_limiter_burst_then_rate(self, clock):
+        # Setup
+        limiter = RateLimiter(rate=2, burst=3)
+
+        # Test
+        waits = [limiter.acquire() for _ in range(5)]
+
+        # Assert
+        assert_that(waits).is_equal_to([0.0, 0.0, 0.0, 0.5, 0.5])
+        assert_that(clock.sleeps).is_equal_to([0.5, 0.5])
+
+    def test_clarity_transport_rate_limiter_refills(self, clock):
+        # Setup
+        limiter = RateLimiter(rate=10)
+        for _ in range(10):
+            limiter.acquire()
+
+        # Test
+        clock.now += 0.5
+        waits = [limiter.acquire() for _ in range(6)]
+
+        # Assert
+        assert_that(waits[:5]).is_equal_to([0.0] * 5)
+        assert_that(waits[5]).is_close_to(0.1, 1e-9)
+
+    def test_clarity_transport_rate_limiter_invalid(self):
+        # Test and Assert
+        assert_that(RateLimiter).raises(ValueError).when_called_with(0)
+
+    def test_clarity_transport_session_mounts_all_schemes(self):
+        # Test
+        session = create_session(pool_size=8)
+
+        # Assert
+        adapter = session.get_adapter("https://asf-claritylims.thecrick.org/api/v2")
+        assert_that(adapter).is_same_as(session.get_adapter("http://localhost:8080"))
+        assert_that(adapter._pool_maxsize).is_equal_to(8)  # pylint: disable=protected-access
+
+    def test_clarity_transport_shared_session(self):
+        # Test
+        first = ClarityLims(baseuri="https://localhost:8080", username="test", password="test", share_session=True, pool_size=12)
+        second = ClarityLims(baseuri="https://localhost:8080", username="test", password="test", share_session=True, pool_size=12)
+        own = ClarityLims(baseuri="https://localhost:8080", username="test", password="test", pool_size=12)
+
+        # Assert
+        assert_that(first.request_session).is_same_as(second.request_session)
+        assert_that(first.request_session).is_same_as(shared_session(12))
+        assert_that(own.request_session).is_not_same_as(first.request_session)
+
+    def test_clarity_transport_client_rate_limits_attempts(self):
+        # Setup
+        api = ClarityLims(baseuri="https://localhost:8080", username="test", password="test", rate_limit=5)
+        api.rate_limiter = Mock()
+        response = Mock(spec=requests.Response)
+        response.status_code = 200
+        response.content = b'<lab:lab xmlns:lab="http://genologics.com/ri/lab"><name>babs</name></lab:lab>'
+        api.request_session = Mock()
+        api.request_session.get.return_value = response
+
+        # Test
+        api.get("labs/1")
+        api.get("labs/2")
+
+        # Assert
+        assert_that(api.rate_limiter.acquire.call_count).is_equal_to(2)
@@ -0,0 +1,105 @@
+"""
+Clarity XML decoder tests
+"""
+
+# pylint: disable=missing-function-docstring,missing-class-docstring,no-member
+
+import glob
+import os
+
+import pytest
+from assertpy import assert_that
+
+from asf_tools.api.clarity.clarity_lims import ClarityLims
+from asf_tools.api.clarity.models import Artifact, Container, Process, Project, Sample, Stub
+from asf_tools.api.clarity.xml_decoder import XML_DECODERS, parse_etree, parse_xmltodict
+
+
+API_TEST_DATA = "tests/data/api/clarity"
+MOCK_XML_FILES = sorted(glob.glob(os.path.join(API_TEST_DATA, "mock_xml", "*.xml")))
+
+
+def strip_namespace_declarations(data):
+    if isinstance(data, dict):
+        return {key: strip_namespace_declarations(value) for key, value in data.items() if not key.startswith("xmlns")}
+    if isinstance(data, list):
+        return [strip_namespace_declarations(item) for item in data]
+    return data
+
+
+def read_xml(file_name):
+    with open(os.path.join(API_TEST_DATA, "mock_xml", file_name), "rb") as file:
+        return file.read()
+
+
+class TestClarityXmlDecoder:
+    @pytest.mark.parametrize("xml_path", MOCK_XML_FILES)
+    def test_clarity_xml_decoder_etree_matches_xmltodict(self, xml_path):
+        # Setup
+        with open(xml_path, "rb") as file:
+            xml_content = file.read()
+
+        # Test
+        expected = strip_namespace_declarations(parse_xmltodict(xml_content))
+        result = parse_etree(xml_content)
+
+        # Assert
+        assert_that(result).is_equal_to(expected)
+
+    def test_clarity_xml_decoder_etree_accepts_str(self):
+        # Test
+        result = parse_etree('<lab:lab xmlns:lab="http://genologics.com/ri/lab" uri="u"><name> babs </name><empty/></lab:lab>')
+
+        # Assert
+        assert_that(result).is_equal_to({"lab:lab": {"uri": "u", "name": "babs", "empty": None}})
+
+    @pytest.mark.parametrize(
+        "xml_path,outer_key,type_name",
+        [
+            ("artifact.xml", "art:artifact", Artifact),
+            ("sample.xml", "smp:sample", Sample),
+            ("process.xml", "prc:process", Process),
+            ("container.xml", "con:container", Container),
+            ("project.xml", "prj:project", Project),
+        ],
+    )
+    def test_clarity_xml_decoder_models_match(self, xml_path, outer_key, type_name):
+        # Setup
+        xml_content = read_xml(xml_path)
+        default_api = ClarityLims(baseuri="https://localhost:8080")
+        etree_api = ClarityLims(baseuri="https://localhost:8080", xml_decoder="etree")
+
+        # Test
+        expected = default_api.get_single_instance(xml_content, outer_key, type_name)
+        result = etree_api.get_single_instance(xml_content, outer_key, type_name)
+
+        # Assert
+        assert_that(result).is_equal_to(expected)
+
+    def test_clarity_xml_decoder_stub_pages_match(self):
+        # Setup
+        xml_content = read_xml("artifacts.xml")
+        default_api = ClarityLims(baseuri="https://localhost:8080")
+        etree_api = ClarityLims(baseuri="https://localhost:8080", xml_decoder="etree")
+
+        # Test
+        expected, _ = default_api.get_single_page_instances(xml_content, "art:artifacts", "artifact", Stub)
+        result, _ = etree_api.get_single_page_instances(xml_content, "art:artifacts", "artifact", Stub)
+
+        # Assert
+        assert_that(result).is_equal_to(expected)
+
+    @pytest.mark.only_run_with_direct_target
+    @pytest.mark.parametrize("decoder", list(XML_DECODERS))
+    @pytest.mark.parametrize("xml_path", ["artifacts.xml", "process.xml", "protocol.xml"])
+    def test_clarity_xml_decoder_benchmark(self, benchmark, decoder, xml_path):
+        """
+        Compare decoders on the recorded mock XML, run with -k benchmark
+        """
+
+        # Setup
+        xml_content = read_xml(xml_path)
+        benchmark.group = xml_path
+
+        # Test and Assert
+        assert_that(benchmark(XML_DECODERS[decoder], xml_content)).is_not_empty()
@@ -62,6 +62,35 @@ class TestCli:
 
         assert_that(result.exit_code).is_equal_to(2)
 
+    @pytest.mark.parametrize(
+        "flags,message",
+        [
+            (["--api_cache", "cache_dir", "--record_api", "traffic.zip"], "--api_cache cannot be used with --record_api or --replay_api"),
+            (["--refresh_api_cache"], "--refresh_api_cache requires --api_cache"),
+        ],
+    )
+    def test_cli_command_pipeline_gen_demux_run_invalid_api_flags(self, flags, message):
+        """Test gen demux run rejects API cache flags that would be ignored or bypass record and replay"""
+
+        # Init
+        params = {
+            "source_dir": TEST_ONT_RUN_SOURCE_PATH,
+            "target_dir": self.tmp_dir,
+            "mode": "ont",
+            "pipeline_dir": TEST_ONT_PIPELINE_PATH,
+            "nextflow_cache": "/.nextflow/",
+            "container_cache": "/sing/",
+            "nextflow_work": "/work/",
+            "runs_dir": TEST_ONT_RUN_SOURCE_PATH,
+        }
+
+        # Test
+        result = self.invoke_cli(["pipeline", "gen-demux-run"] + self.assemble_params(params) + flags)
+
+        # Assert
+        assert_that(result.exit_code).is_equal_to(2)
+        assert_that(result.output).contains(message)
+
     # @mock.patch("asf_tools.nextflow.gen_demux_run.GenDemuxRun", autospec=True)
     # def test_cli_command_pipeline_ont_gen_demux_run(self, mock_obj):
     #     """Test pipeline ont gen demux run"""
@@ -10,7 +10,9 @@ from unittest.mock import MagicMock, patch
 import pytest
 from assertpy import assert_that
 
-from asf_tools.io.storage_interface import InterfaceType, StorageInterface
+from asf_tools.io import storage_interface as storage_interface_module
+from asf_tools.io.storage_interface import BatchOperationError, InterfaceType, StorageInterface
+from tests.utils import run_command_locally
 
 
 class TestStorageInterface:
@@ -55,7 +57,7 @@ class TestStorageInterface:
         mock_result.ok = True
         MockConnection().run.return_value = mock_result
 
-        storage_interface = StorageInterface(InterfaceType.NEMO, host="login.nemo.thecrick.org", user="user", password="password")
+        storage_interface = StorageInterface(InterfaceType.NEMO, host="login.nemo.thecrick.org", user="user", password="password", use_sftp=False)
         result = storage_interface.exists("~")
 
         MockConnection().run.assert_called_once_with("test -e ~", hide=True)
@@ -135,13 +137,13 @@ class TestStorageInterface:
 
     @patch("asf_tools.ssh.nemo.Connection")
     def test_storage_mock_make_dirs_nemo(self, MockConnection):
-        storage_interface = StorageInterface(InterfaceType.NEMO, host="login.nemo.thecrick.org", user="user", password="password")
+        storage_interface = StorageInterface(InterfaceType.NEMO, host="login.nemo.thecrick.org", user="user", password="password", use_sftp=False)
         storage_interface.make_dirs("/some/new/directory")
         MockConnection().run.assert_called_once_with("mkdir -p /some/new/directory", hide=True)
 
     @patch("asf_tools.ssh.nemo.Connection")
     def test_storage_mock_write_file_nemo(self, MockConnection):
-        storage_interface = StorageInterface(InterfaceType.NEMO, host="login.nemo.thecrick.org", user="user", password="password")
+        storage_interface = StorageInterface(InterfaceType.NEMO, host="login.nemo.thecrick.org", user="user", password="password", use_sftp=False)
         storage_interface.write_file("/some/path/to/file.txt", "file content")
         MockConnection().run.assert_called_once_with("cat <<'EOF' > /some/path/to/file.txt\nfile content\nEOF", hide=True)
 
@@ -151,7 +153,7 @@ class TestStorageInterface:
         mock_result.stdout.strip.return_value = "file content"
         MockConnection().run.return_value = mock_result
 
-        storage_interface = StorageInterface(InterfaceType.NEMO, host="login.nemo.thecrick.org", user="user", password="password")
+        storage_interface = StorageInterface(InterfaceType.NEMO, host="login.nemo.thecrick.org", user="user", password="password", use_sftp=False)
         content = storage_interface.read_file("/some/path/to/file.txt")
 
         MockConnection().run.assert_called_once_with("cat /some/path/to/file.txt", hide=True)
@@ -172,7 +174,7 @@ class TestStorageInterface:
 
     @patch("asf_tools.ssh.nemo.Connection")
     def test_storage_mock_chmod_nemo(self, MockConnection):
-        storage_interface = StorageInterface(InterfaceType.NEMO, host="login.nemo.thecrick.org", user="user", password="password")
+        storage_interface = StorageInterface(InterfaceType.NEMO, host="login.nemo.thecrick.org", user="user", password="password", use_sftp=False)
         storage_interface.chmod("/some/path/to/file.txt", "rwxr-xr--")
         MockConnection().run.assert_called_once_with("chmod 754 /some/path/to/file.txt", hide=True)
 
@@ -182,6 +184,208 @@ class TestStorageInterface:
         storage_interface.chmod("/some/path/to/file.txt", "rwxr-xr--")
         mock_chmod.assert_called_once_with("/some/path/to/file.txt", 0o754)
 
+    def test_storage_batch_local(self, tmp_path):
+        storage_interface = StorageInterface(InterfaceType.LOCAL)
+        folder_path = os.path.join(tmp_path, "run01", "logs")
+        file_path = os.path.join(folder_path, "samplesheet.csv")
+
+        with storage_interface.batch() as batch:
+            storage_interface.make_dirs(folder_path)
+            storage_interface.write_file(file_path, "id,barcode\n")
+            storage_interface.chmod(file_path, "rw-rw-rw-")
+
+            assert_that(batch.operations).is_length(3)
+            assert_that(os.path.exists(folder_path)).is_false()
+            assert_that(storage_interface.exists(os.path.join(tmp_path, "run01"))).is_true()
+            assert_that(storage_interface.exists(os.path.join(tmp_path, "run02"))).is_false()
+            assert_that(storage_interface.read_file(file_path)).is_equal_to("id,barcode\n")
+
+        assert_that(batch.operations).is_empty()
+        with open(file_path, "r", encoding="UTF-8") as f:
+            assert_that(f.read()).is_equal_to("id,barcode\n")
+        assert_that(os.stat(file_path).st_mode & 0o777).is_equal_to(0o666)
+
+    def test_storage_batch_flushes_before_other_operations(self, tmp_path):
+        storage_interface = StorageInterface(InterfaceType.LOCAL)
+        link_path = os.path.join(tmp_path, "link")
+
+        with storage_interface.batch() as batch:
+            storage_interface.make_dirs(os.path.join(tmp_path, "target", "sub"))
+            storage_interface.symlink(os.path.join(tmp_path, "target"), link_path)
+            listing = storage_interface.list_directory(tmp_path)
+            assert_that(batch.operations).is_empty()
+            storage_interface.make_dirs(os.path.join(tmp_path, "later"))
+            assert_that(storage_interface.exists(os.path.join(link_path, "sub"))).is_true()
+
+        assert_that(listing).contains_only("target", "link")
+        assert_that(os.path.isdir(os.path.join(tmp_path, "later"))).is_true()
+
+    def test_storage_batch_discards_queued_operations_on_error(self, tmp_path):
+        storage_interface = StorageInterface(InterfaceType.LOCAL)
+
+        with pytest.raises(KeyError):
+            with storage_interface.batch():
+                storage_interface.make_dirs(os.path.join(tmp_path, "run01"))
+                storage_interface.flush()
+                storage_interface.make_dirs(os.path.join(tmp_path, "run02"))
+                raise KeyError("run_id does not exist")
+
+        assert_that(os.path.isdir(os.path.join(tmp_path, "run01"))).is_true()
+        assert_that(os.path.exists(os.path.join(tmp_path, "run02"))).is_false()
+        assert_that(storage_interface.current_batch()).is_none()
+
+    @patch("asf_tools.ssh.nemo.Connection")
+    def test_storage_batch_nemo_keeps_block_error(self, MockConnection, tmp_path):
+        MockConnection().run.side_effect = run_command_locally
+        storage_interface = StorageInterface(InterfaceType.NEMO, host="login.nemo.thecrick.org", user="user", password="password")
+
+        with pytest.raises(KeyError):
+            with storage_interface.batch():
+                storage_interface.chmod(os.path.join(tmp_path, "missing"), "rwxrwxrwx")
+                raise KeyError("run_id does not exist")
+
+        MockConnection().run.assert_not_called()
+
+    @patch("asf_tools.ssh.nemo.Connection")
+    def test_storage_batch_nemo_single_round_trip(self, MockConnection, tmp_path):
+        MockConnection().run.side_effect = run_command_locally
+        storage_interface = StorageInterface(InterfaceType.NEMO, host="login.nemo.thecrick.org", user="user", password="password")
+        folder_path = os.path.join(tmp_path, "run 01")
+        content = "id,barcode\n\nsample_01,  \n"
+
+        with storage_interface.batch():
+            storage_interface.make_dirs(folder_path)
+            storage_interface.write_file(os.path.join(folder_path, "samplesheet.csv"), content)
+            storage_interface.chmod(os.path.join(folder_path, "samplesheet.csv"), "rw-rw-rw-")
+            storage_interface.symlink(folder_path, os.path.join(tmp_path, "latest"))
+
+        MockConnection().run.assert_called_once()
+        assert_that(MockConnection().run.call_args[0][0]).is_equal_to("sh -s")
+        with open(os.path.join(tmp_path, "latest", "samplesheet.csv"), "r", encoding="UTF-8") as f:
+            assert_that(f.read()).is_equal_to(content)
+        assert_that(os.stat(os.path.join(folder_path, "samplesheet.csv")).st_mode & 0o777).is_equal_to(0o666)
+
+    @patch("asf_tools.ssh.nemo.Connection")
+    def test_storage_batch_nemo_failure(self, MockConnection, tmp_path):
+        MockConnection().run.side_effect = run_command_locally
+        storage_interface = StorageInterface(InterfaceType.NEMO, host="login.nemo.thecrick.org", user="user", password="password")
+
+        def run():
+            with storage_interface.batch():
+                storage_interface.make_dirs(os.path.join(tmp_path, "run01"))
+                storage_interface.chmod(os.path.join(tmp_path, "missing"), "rwxrwxrwx")
+                storage_interface.make_dirs(os.path.join(tmp_path, "run02"))
+
+        assert_that(run).raises(BatchOperationError).when_called_with().contains("operation 2 of 3 failed: chmod")
+        assert_that(os.path.isdir(os.path.join(tmp_path, "run01"))).is_true()
+        assert_that(os.path.exists(os.path.join(tmp_path, "run02"))).is_false()
+
+    def test_storage_cache_local(self, tmp_path, monkeypatch):
+        storage_interface = StorageInterface(InterfaceType.LOCAL, cache_ttl=60)
+        listdir = MagicMock(side_effect=os.listdir)
+        monkeypatch.setattr(storage_interface_module.os, "listdir", listdir)
+        os.makedirs(os.path.join(tmp_path, "run01"))
+
+        first = storage_interface.list_directory(tmp_path)
+        first.append("changed by caller")
+        second = storage_interface.list_directory(tmp_path)
+        assert_that(storage_interface.exists(os.path.join(tmp_path, "run02"))).is_false()
+        storage_interface.make_dirs(os.path.join(tmp_path, "run02", "logs"))
+        third = storage_interface.list_directory(tmp_path)
+
+        assert_that(second).is_equal_to(["run01"])
+        assert_that(third).contains_only("run01", "run02")
+        assert_that(storage_interface.exists(os.path.join(tmp_path, "run02"))).is_true()
+        assert_that(listdir.call_count).is_equal_to(2)
+
+    def test_storage_cache_invalidation(self, tmp_path):
+        storage_interface = StorageInterface(InterfaceType.LOCAL, cache_ttl=60)
+        file_path = os.path.join(tmp_path, "run01", "samplesheet.csv")
+        os.makedirs(os.path.join(tmp_path, "run01"))
+        os.makedirs(os.path.join(tmp_path, "run02"))
+
+        assert_that(storage_interface.exists(file_path)).is_false()
+        assert_that(storage_interface.exists_with_pattern(os.path.join(tmp_path, "run01"), r".*\.csv")).is_false()
+        assert_that(storage_interface.exists(os.path.join(tmp_path, "run02"))).is_true()
+        os.rmdir(os.path.join(tmp_path, "run02"))
+        storage_interface.write_file(file_path, "id\n")
+
+        assert_that(storage_interface.exists(file_path)).is_true()
+        assert_that(storage_interface.exists_with_pattern(os.path.join(tmp_path, "run01"), r".*\.csv")).is_true()
+        assert_that(storage_interface.exists(os.path.join(tmp_path, "run02"))).is_true()
+        storage_interface.run_command("true")
+        assert_that(storage_interface.exists(os.path.join(tmp_path, "run02"))).is_false()
+
+    def test_storage_cache_expires(self, tmp_path, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(storage_interface_module.time, "monotonic", lambda: now[0])
+        storage_interface = StorageInterface(InterfaceType.LOCAL, cache_ttl=5)
+
+        assert_that(storage_interface.exists(os.path.join(tmp_path, "run01"))).is_false()
+        os.makedirs(os.path.join(tmp_path, "run01"))
+        now[0] += 4
+        cached = storage_interface.exists(os.path.join(tmp_path, "run01"))
+        now[0] += 2
+
+        assert_that(cached).is_false()
+        assert_that(storage_interface.exists(os.path.join(tmp_path, "run01"))).is_true()
+
+    def test_storage_cache_disabled_by_default(self, tmp_path):
+        storage_interface = StorageInterface(InterfaceType.LOCAL)
+
+        assert_that(storage_interface.exists(os.path.join(tmp_path, "run01"))).is_false()
+        os.makedirs(os.path.join(tmp_path, "run01"))
+
+        assert_that(storage_interface.exists(os.path.join(tmp_path, "run01"))).is_true()
+        assert_that(storage_interface.cache).is_empty()
+
+    @patch("asf_tools.ssh.nemo.Connection")
+    def test_storage_cache_nemo(self, MockConnection):
+        mock_result = MagicMock()
+        mock_result.stdout.strip.return_value = (
+            "total 8\n"
+            "drwxr-xr-x 2 user group 4096 2023-10-01 12:34 run01\n"
+            "lrwxrwxrwx 1 user group 1234 2023-10-01 12:34 run02 -> /some/target/run02"
+        )
+        mock_result.stdout.splitlines.return_value = ["__asf_batch_status__ 0 0"]
+        MockConnection().run.return_value = mock_result
+        MockConnection().sftp.return_value.stat.side_effect = FileNotFoundError
+        storage_interface = StorageInterface(InterfaceType.NEMO, cache_ttl=60, host="login.nemo.thecrick.org", user="user", password="password")
+
+        dirnames = storage_interface.list_directories_with_links("/data/runs")
+        names = storage_interface.list_directory("/data/runs")
+        storage_interface.exists("/data/runs/run03")
+        storage_interface.exists("/data/runs/run03")
+        with storage_interface.batch():
+            storage_interface.make_dirs("/data/runs/run03")
+        storage_interface.list_directory("/data/runs")
+        storage_interface.exists("/data/runs/run03")
+
+        assert_that(dirnames).is_equal_to(["run01", "run02"])
+        assert_that(names).is_equal_to(["run01", "run02"])
+        assert_that([call[0][0] for call in MockConnection().run.call_args_list]).is_equal_to(
+            ["cd /data/runs && ls -la --time-style=long-iso", "sh -s", "cd /data/runs && ls -la --time-style=long-iso"]
+        )
+        assert_that(MockConnection().sftp.return_value.stat.call_count).is_equal_to(2)
+
+    @patch("asf_tools.ssh.nemo.Connection")
+    def test_storage_cache_nemo_chmod(self, MockConnection):
+        mock_result = MagicMock()
+        mock_result.stdout.strip.return_value = "total 4\n-rw-r--r-- 1 user group 12 2023-10-01 12:34 samplesheet.csv"
+        mock_result.stdout.splitlines.return_value = ["__asf_batch_status__ 0 0"]
+        MockConnection().run.return_value = mock_result
+        storage_interface = StorageInterface(InterfaceType.NEMO, cache_ttl=60, host="login.nemo.thecrick.org", user="user", password="password")
+
+        storage_interface.list_directory_objects("/data/run01")
+        storage_interface.chmod("/data/run01/samplesheet.csv", "rw-rw-rw-")
+        storage_interface.list_directory_objects("/data/run01")
+        with storage_interface.batch():
+            storage_interface.chmod("/data/run01/samplesheet.csv", "rw-rw-rw-")
+        storage_interface.list_directory_objects("/data/run01")
+
+        listings = [call for call in MockConnection().run.call_args_list if call[0][0].startswith("cd /data/run01")]
+        assert_that(listings).is_length(3)
+
     @pytest.mark.only_run_with_direct_target
     def test_storage_integration_list_directory_local(self):
         # Init
@@ -6,6 +6,7 @@ Tests for ont gen demux run
 
 import os
 import stat
+from unittest.mock import patch
 
 import pytest
 from assertpy import assert_that
@@ -13,9 +14,10 @@ from assertpy import assert_that
 from asf_tools.api.clarity.clarity_helper_lims import ClarityHelperLims
 from asf_tools.io.data_management import DataManagement, DataTypeMode
 from asf_tools.io.storage_interface import InterfaceType, StorageInterface
-from asf_tools.nextflow.gen_demux_run import check_runs_no_cli, create_ont_sbatch_text, extract_pipeline_params, run_cli
+from asf_tools.nextflow.gen_demux_run import check_runs_no_cli, create_ont_sbatch_text, extract_pipeline_params, process_runs, run_cli
 from asf_tools.nextflow.utils import create_sbatch_header
 from tests.mocks.clarity_helper_lims_mock import ClarityHelperLimsMock
+from tests.utils import run_command_locally
 
 
 TEST_ONT_RUN_SOURCE_PATH = "tests/data/ont/runs"
@@ -380,6 +382,182 @@ class TestGenDemuxRun:
         # Assertion
         assert_that(content).is_equal_to(expected_content)
 
+    def test_ont_gen_demux_process_runs_concurrent_isolates_errors(self, tmp_path, monkeypatch):
+        # Setup
+        storage_interface = StorageInterface(InterfaceType.LOCAL)
+        sample = {
+            "sample_name": "sample_01",
+            "group": "asf",
+            "user": "no_name",
+            "project_id": "no_proj",
+            "project_limsid": "no_lims_proj",
+            "project_type": "no_type",
+            "reference_genome": None,
+            "data_analysis_type": "no_analysis",
+            "barcode": None,
+        }
+
+        def collect_samplesheet_info(_, run_name, *_args, **_kwargs):
+            if run_name == "run02":
+                raise KeyError("run_id does not exist")
+            return {f"{run_name}_01": sample}
+
+        monkeypatch.setattr(ClarityHelperLims, "collect_samplesheet_info", collect_samplesheet_info)
+        monkeypatch.setattr(ClarityHelperLims, "get_pipeline_params", lambda *args, **kwargs: {})
+
+        # Test
+        errors = process_runs(
+            self.api,
+            storage_interface,
+            ["run01", "run02", "run04"],
+            DataTypeMode.ONT,
+            TEST_ONT_RUN_SOURCE_PATH,
+            tmp_path,
+            False,
+            True,
+            None,
+            ".nextflow",
+            "work",
+            "sing",
+            TEST_ONT_PIPELINE_PATH,
+            "runs",
+            max_workers=3,
+        )
+
+        # Assert
+        assert_that(errors).is_equal_to({"run02": "'run_id does not exist'"})
+        for run_name in ["run01", "run04"]:
+            with open(os.path.join(tmp_path, run_name, "samplesheet.csv"), "r", encoding="UTF-8") as f:
+                assert_that(f.read()).contains(f"{run_name}_01,sample_01")
+            assert_that(os.path.exists(os.path.join(tmp_path, run_name, "run_script.sh"))).is_true()
+        assert_that(os.path.exists(os.path.join(tmp_path, "run02", "run_script.sh"))).is_false()
+
+    @patch("asf_tools.ssh.nemo.Connection")
+    def test_ont_gen_demux_process_runs_nemo_single_round_trip(self, mock_connection, tmp_path):
+        # Setup
+        mock_connection().run.side_effect = run_command_locally
+        storage_interface = StorageInterface(InterfaceType.NEMO, host="login.nemo.thecrick.org", user="user", password="password")
+
+        # Test
+        errors = process_runs(
+            None,
+            storage_interface,
+            ["run01"],
+            DataTypeMode.ONT,
+            TEST_ONT_RUN_SOURCE_PATH,
+            str(tmp_path),
+            False,
+            False,
+            None,
+            ".nextflow",
+            "work",
+            "sing",
+            TEST_ONT_PIPELINE_PATH,
+            "runs",
+        )
+
+        # Assert
+        assert_that(errors).is_empty()
+        mock_connection().run.assert_called_once()
+        script_path = os.path.join(tmp_path, "run01", "run_script.sh")
+        assert_that(os.stat(script_path).st_mode & 0o777).is_equal_to(0o777)
+        with open(os.path.join(tmp_path, "run01", "samplesheet.csv"), "r", encoding="UTF-8") as f:
+            assert_that(f.read()).contains("sample_01,sample_01,asf")
+
+    def test_ont_gen_demux_process_runs_keeps_partial_run_on_error(self, tmp_path, monkeypatch):
+        # Setup
+        storage_interface = StorageInterface(InterfaceType.LOCAL)
+        sample = {
+            "sample_name": "sample_01",
+            "group": "asf",
+            "user": "no_name",
+            "project_id": "no_proj",
+            "project_limsid": "no_lims_proj",
+            "project_type": "no_type",
+            "reference_genome": None,
+            "data_analysis_type": "no_analysis",
+            "barcode": None,
+        }
+
+        def collect_samplesheet_info(_, run_name, *_args, **_kwargs):
+            if run_name == "run01":
+                raise KeyError("run_id does not exist")
+            return {f"{run_name}_01": sample}
+
+        def get_pipeline_params(*_args, **_kwargs):
+            raise ConnectionError("lims unavailable")
+
+        monkeypatch.setattr(ClarityHelperLims, "collect_samplesheet_info", collect_samplesheet_info)
+        monkeypatch.setattr(ClarityHelperLims, "get_pipeline_params", get_pipeline_params)
+
+        # Test
+        errors = process_runs(
+            self.api,
+            storage_interface,
+            ["run01", "run02"],
+            DataTypeMode.ONT,
+            TEST_ONT_RUN_SOURCE_PATH,
+            tmp_path,
+            False,
+            True,
+            None,
+            ".nextflow",
+            "work",
+            "sing",
+            TEST_ONT_PIPELINE_PATH,
+            "runs",
+        )
+
+        # Assert the folder is created before the samplesheet lookup and the samplesheet before the pipeline lookup
+        assert_that(errors).is_equal_to({"run01": "'run_id does not exist'", "run02": "lims unavailable"})
+        assert_that(os.listdir(os.path.join(tmp_path, "run01"))).is_empty()
+        assert_that(os.listdir(os.path.join(tmp_path, "run02"))).is_equal_to(["samplesheet.csv"])
+        assert_that(os.stat(os.path.join(tmp_path, "run02", "samplesheet.csv")).st_mode & 0o777).is_equal_to(0o666)
+
+    @patch("asf_tools.ssh.nemo.Connection")
+    def test_ont_gen_demux_process_runs_nemo_api_single_round_trip(self, mock_connection, tmp_path, monkeypatch):
+        # Setup
+        mock_connection().run.side_effect = run_command_locally
+        storage_interface = StorageInterface(InterfaceType.NEMO, host="login.nemo.thecrick.org", user="user", password="password")
+        sample = {
+            "sample_name": "sample_01",
+            "group": "asf",
+            "user": "no_name",
+            "project_id": "no_proj",
+            "project_limsid": "no_lims_proj",
+            "project_type": "no_type",
+            "reference_genome": None,
+            "data_analysis_type": "no_analysis",
+            "barcode": None,
+        }
+        monkeypatch.setattr(ClarityHelperLims, "collect_samplesheet_info", lambda *args, **kwargs: {"run01_01": sample})
+        monkeypatch.setattr(ClarityHelperLims, "get_pipeline_params", lambda *args, **kwargs: {})
+
+        # Test
+        errors = process_runs(
+            self.api,
+            storage_interface,
+            ["run01"],
+            DataTypeMode.ONT,
+            TEST_ONT_RUN_SOURCE_PATH,
+            str(tmp_path),
+            False,
+            True,
+            None,
+            ".nextflow",
+            "work",
+            "sing",
+            TEST_ONT_PIPELINE_PATH,
+            "runs",
+        )
+
+        # Assert
+        assert_that(errors).is_empty()
+        mock_connection().run.assert_called_once()
+        with open(os.path.join(tmp_path, "run01", "samplesheet.csv"), "r", encoding="UTF-8") as f:
+            assert_that(f.read()).contains("run01_01,sample_01,asf")
+        assert_that(os.path.exists(os.path.join(tmp_path, "run01", "run_script.sh"))).is_true()
+
     def test_ont_gen_demux_run_extract_pipeline_params_isvalid(self, tmp_path):
 
         # Setup
@@ -4,13 +4,133 @@ Tests for the Nemo module.
 
 # pylint: disable=missing-function-docstring,missing-class-docstring,invalid-name
 
+import io
+import os
+import stat
+import subprocess
 from unittest.mock import MagicMock, patch
 
+import paramiko
 from assertpy import assert_that
 
 from asf_tools.ssh.nemo import Nemo
 
 
+class FakeSFTPFile(io.BytesIO):
+    def __init__(self, sftp, path, mode, data=b""):
+        super().__init__(data)
+        self.sftp = sftp
+        self.path = path
+        self.mode = mode
+
+    def set_pipelined(self, pipelined=True):
+        self.sftp.pipelined = pipelined
+
+    def prefetch(self):
+        self.sftp.prefetched = True
+
+    def close(self):
+        if "w" in self.mode:
+            self.sftp.files[self.path] = self.getvalue()
+        super().close()
+
+
+class FakeSFTP:
+    """
+    In memory SFTP client holding files, directories and links by path
+    """
+
+    def __init__(self):
+        self.files = {}
+        self.dirs = {"/"}
+        self.links = {}
+        self.chmods = {}
+        self.denied = set()
+        self.pipelined = False
+        self.prefetched = False
+
+    def lstat(self, path):
+        attributes = paramiko.SFTPAttributes()
+        if path in self.denied:
+            raise PermissionError(path)
+        if path in self.links:
+            attributes.st_mode = stat.S_IFLNK | 0o777
+        elif path in self.dirs:
+            attributes.st_mode = stat.S_IFDIR | 0o755
+        elif path in self.files:
+            attributes.st_mode = stat.S_IFREG | 0o644
+            attributes.st_size = len(self.files[path])
+        else:
+            raise FileNotFoundError(path)
+        return attributes
+
+    def stat(self, path):
+        return self.lstat(self.links.get(path, path))
+
+    def mkdir(self, path):
+        if path in self.dirs or path in self.files or (path.rsplit("/", 1)[0] or "/") not in self.dirs:
+            raise IOError(path)
+        self.dirs.add(path)
+
+    def open(self, path, mode):
+        if "r" in mode:
+            return FakeSFTPFile(self, path, mode, self.files[path])
+        return FakeSFTPFile(self, path, mode)
+
+    def chmod(self, path, mode):
+        self.chmods[path] = mode
+
+    def remove(self, path):
+        self.links.pop(path, None)
+        self.files.pop(path, None)
+
+    def symlink(self, source, dest):
+        if dest in self.links or dest in self.files:
+            raise IOError(dest)
+        self.links[dest] = source
+
+
+class FakeChannel:
+    """
+    SSH channel serving fixed output, or the output of the command run in a local shell
+    """
+
+    def __init__(self, stdout=None, stderr=b"", status=0, chunk_size=7):
+        self.stdout = stdout
+        self.stderr = stderr
+        self.status = status
+        self.chunk_size = chunk_size
+        self.command = None
+        self.chunks = []
+        self.closed = False
+
+    def exec_command(self, command):
+        self.command = command
+        if self.stdout is None:
+            result = subprocess.run(command, shell=True, capture_output=True, check=False)
+            self.stdout, self.stderr, self.status = result.stdout, result.stderr, result.returncode
+        self.chunks = [self.stdout[i : i + self.chunk_size] for i in range(0, len(self.stdout), self.chunk_size)]
+
+    def settimeout(self, timeout):
+        pass
+
+    def recv(self, size):  # pylint: disable=unused-argument
+        return self.chunks.pop(0) if self.chunks else b""
+
+    def recv_stderr_ready(self):
+        return bool(self.stderr)
+
+    def recv_stderr(self, size):
+        data, self.stderr = self.stderr[:size], self.stderr[size:]
+        return data
+
+    def recv_exit_status(self):
+        return self.status
+
+    def close(self):
+        self.closed = True
+
+
 class TestNemoConnection:
 
     @patch("asf_tools.ssh.nemo.Connection")
@@ -100,7 +220,7 @@ class TestNemoConnection:
         mock_result.ok = True
         MockConnection().run.return_value = mock_result
 
-        nemo = Nemo(host="login.nemo.thecrick.org", user="user", password="password")
+        nemo = Nemo(host="login.nemo.thecrick.org", user="user", password="password", use_sftp=False)
         result = nemo.exists("~")
 
         MockConnection().run.assert_called_once_with("test -e ~", hide=True)
@@ -120,13 +240,13 @@ class TestNemoConnection:
 
     @patch("asf_tools.ssh.nemo.Connection")
     def test_nemo_make_dirs(self, MockConnection):
-        nemo = Nemo(host="login.nemo.thecrick.org", user="user", password="password")
+        nemo = Nemo(host="login.nemo.thecrick.org", user="user", password="password", use_sftp=False)
         nemo.make_dirs("/some/new/directory")
         MockConnection().run.assert_called_once_with("mkdir -p /some/new/directory", hide=True)
 
     @patch("asf_tools.ssh.nemo.Connection")
     def test_nemo_write_file(self, MockConnection):
-        nemo = Nemo(host="login.nemo.thecrick.org", user="user", password="password")
+        nemo = Nemo(host="login.nemo.thecrick.org", user="user", password="password", use_sftp=False)
         nemo.write_file("/some/path/to/file.txt", "file content")
         MockConnection().run.assert_called_once_with("cat <<'EOF' > /some/path/to/file.txt\nfile content\nEOF", hide=True)
 
@@ -136,7 +256,7 @@ class TestNemoConnection:
         mock_result.stdout.strip.return_value = "file content"
         MockConnection().run.return_value = mock_result
 
-        nemo = Nemo(host="login.nemo.thecrick.org", user="user", password="password")
+        nemo = Nemo(host="login.nemo.thecrick.org", user="user", password="password", use_sftp=False)
         content = nemo.read_file("/some/path/to/file.txt")
 
         MockConnection().run.assert_called_once_with("cat /some/path/to/file.txt", hide=True)
@@ -144,10 +264,219 @@ class TestNemoConnection:
 
     @patch("asf_tools.ssh.nemo.Connection")
     def test_nemo_chmod(self, MockConnection):
-        nemo = Nemo(host="login.nemo.thecrick.org", user="user", password="password")
+        nemo = Nemo(host="login.nemo.thecrick.org", user="user", password="password", use_sftp=False)
         nemo.chmod("/some/path/to/file.txt", "755")
         MockConnection().run.assert_called_once_with("chmod 755 /some/path/to/file.txt", hide=True)
 
+    @patch("asf_tools.ssh.nemo.Connection")
+    def test_nemo_sftp_exists(self, MockConnection):
+        sftp = FakeSFTP()
+        sftp.files["/data/file.txt"] = b""
+        MockConnection().sftp.return_value = sftp
+
+        nemo = Nemo(host="login.nemo.thecrick.org", user="user", password="password")
+
+        assert_that(nemo.exists("/data/file.txt")).is_true()
+        assert_that(nemo.exists("/data/missing.txt")).is_false()
+        assert_that(nemo.stat("/data/file.txt").st_size).is_equal_to(0)
+        MockConnection().run.assert_not_called()
+
+    @patch("asf_tools.ssh.nemo.Connection")
+    def test_nemo_sftp_exists_permission_denied(self, MockConnection):
+        sftp = FakeSFTP()
+        sftp.denied.add("/data/private/file.txt")
+        MockConnection().sftp.return_value = sftp
+
+        nemo = Nemo(host="login.nemo.thecrick.org", user="user", password="password")
+
+        assert_that(nemo.exists("/data/private/file.txt")).is_false()
+
+    @patch("asf_tools.ssh.nemo.Connection")
+    def test_nemo_sftp_write_and_read_file(self, MockConnection):
+        sftp = FakeSFTP()
+        MockConnection().sftp.return_value = sftp
+        content = "Lane,Sample_ID\n" * 10000 + "  \n\n"
+
+        nemo = Nemo(host="login.nemo.thecrick.org", user="user", password="password")
+        nemo.write_file("/data/samplesheet.csv", content)
+        nemo.write_file("/data/report.bin", b"\x00\xff\n")
+
+        assert_that(nemo.read_file("/data/samplesheet.csv")).is_equal_to(content)
+        assert_that(nemo.read_file("/data/report.bin", binary=True)).is_equal_to(b"\x00\xff\n")
+        assert_that(sftp.pipelined).is_true()
+        assert_that(sftp.prefetched).is_true()
+        MockConnection().run.assert_not_called()
+
+    @patch("asf_tools.ssh.nemo.Connection")
+    def test_nemo_sftp_make_dirs(self, MockConnection):
+        sftp = FakeSFTP()
+        sftp.dirs.add("/data")
+        MockConnection().sftp.return_value = sftp
+
+        nemo = Nemo(host="login.nemo.thecrick.org", user="user", password="password")
+        nemo.make_dirs("/data/run1/fastq/")
+        nemo.make_dirs("/data/run1")
+
+        assert_that(sftp.dirs).contains("/data/run1", "/data/run1/fastq")
+        sftp.files["/data/file.txt"] = b""
+        assert_that(nemo.make_dirs).raises(FileExistsError).when_called_with("/data/file.txt")
+
+    @patch("asf_tools.ssh.nemo.Connection")
+    def test_nemo_sftp_make_dirs_concurrent_parent(self, MockConnection):
+        sftp = FakeSFTP()
+        sftp.dirs.add("/data")
+        mkdir = sftp.mkdir
+
+        def racing_mkdir(path):
+            # Another worker creates the directory once its parent exists, just before this one does
+            if path == "/data/runs/run1" and "/data/runs" in sftp.dirs:
+                sftp.dirs.add(path)
+                raise IOError(path)
+            mkdir(path)
+
+        sftp.mkdir = racing_mkdir
+        MockConnection().sftp.return_value = sftp
+
+        nemo = Nemo(host="login.nemo.thecrick.org", user="user", password="password")
+        nemo.make_dirs("/data/runs/run1")
+
+        assert_that(sftp.dirs).contains("/data/runs", "/data/runs/run1")
+
+    @patch("asf_tools.ssh.nemo.Connection")
+    def test_nemo_sftp_chmod_and_symlink(self, MockConnection):
+        sftp = FakeSFTP()
+        sftp.links["/data/link"] = "/old/target"
+        MockConnection().sftp.return_value = sftp
+
+        nemo = Nemo(host="login.nemo.thecrick.org", user="user", password="password")
+        nemo.chmod("/data/run.sh", "755")
+        nemo.symlink("/new/target", "/data/link")
+
+        assert_that(sftp.chmods).is_equal_to({"/data/run.sh": 0o755})
+        assert_that(sftp.links).is_equal_to({"/data/link": "/new/target"})
+        assert_that(stat.S_ISLNK(nemo.lstat("/data/link").st_mode)).is_true()
+        MockConnection().run.assert_not_called()
+
+    @patch("asf_tools.ssh.nemo.Connection")
+    def test_nemo_sftp_fallback(self, MockConnection):
+        MockConnection().sftp.side_effect = paramiko.SSHException("subsystem request failed")
+
+        nemo = Nemo(host="login.nemo.thecrick.org", user="user", password="password")
+        nemo.make_dirs("/some/new/directory")
+        nemo.chmod("/some/new/directory", "755")
+
+        assert_that(nemo.use_sftp).is_false()
+        MockConnection().sftp.assert_called_once()
+        assert_that(MockConnection().run.call_args_list[0][0][0]).is_equal_to("mkdir -p /some/new/directory")
+        assert_that(MockConnection().run.call_args_list[1][0][0]).is_equal_to("chmod 755 /some/new/directory")
+
+    @patch("asf_tools.ssh.nemo.Connection")
+    def test_nemo_find_entries(self, MockConnection):
+        output = b"d\x004096\x001700000000.5\x00/data\x00\x00l\x0012\x001700000001.0\x00/data/link\x00../target\x00"
+        channel = FakeChannel(output)
+        MockConnection().create_session.return_value = channel
+
+        nemo = Nemo(host="login.nemo.thecrick.org", user="user", password="password")
+        entries = list(nemo.find_entries("/data"))
+
+        assert_that(channel.command).starts_with("find -H /data ")
+        assert_that(channel.closed).is_true()
+        assert_that(entries).is_equal_to([("d", 4096, 1700000000.5, "/data", ""), ("l", 12, 1700000001.0, "/data/link", "../target")])
+
+    @patch("asf_tools.ssh.nemo.Connection")
+    def test_nemo_walk(self, MockConnection):
+        records = [
+            ("d", "/data/"),
+            ("f", "/data/file.txt"),
+            ("d", "/data/run1"),
+            ("d", "/data/run1/fastq"),
+            ("f", "/data/run1/fastq/sample 1.fastq.gz"),
+            ("l", "/data/run1/samplesheet.csv"),
+            ("u", "/data/locked"),
+            ("d", "/data/run2"),
+            ("p", "/data/run2/fifo"),
+        ]
+        output = b"".join(f"{kind}\x000\x000.0\x00{path}\x00\x00".encode() for kind, path in records)
+        MockConnection().create_session.return_value = FakeChannel(output)
+
+        nemo = Nemo(host="login.nemo.thecrick.org", user="user", password="password")
+        result = list(nemo.walk("/data/"))
+
+        MockConnection().create_session.assert_called_once()
+        MockConnection().run.assert_not_called()
+        assert_that(result).is_equal_to(
+            [
+                ("/data/", ["run1", "locked", "run2"], ["file.txt"]),
+                ("/data/run1", ["fastq"], ["samplesheet.csv"]),
+                ("/data/run1/fastq", [], ["sample 1.fastq.gz"]),
+                ("/data/run2", [], []),
+            ]
+        )
+
+    @patch("asf_tools.ssh.nemo.Connection")
+    def test_nemo_walk_bottom_up(self, MockConnection):
+        records = [("d", "/data"), ("d", "/data/run1"), ("f", "/data/run1/a.txt"), ("d", "/data/run2")]
+        output = b"".join(f"{kind}\x000\x000.0\x00{path}\x00\x00".encode() for kind, path in records)
+        MockConnection().create_session.return_value = FakeChannel(output)
+
+        nemo = Nemo(host="login.nemo.thecrick.org", user="user", password="password")
+        result = [root for root, _, _ in nemo.walk("/data", topdown=False)]
+
+        assert_that(result).is_equal_to(["/data/run1", "/data/run2", "/data"])
+
+    @patch("asf_tools.ssh.nemo.Connection")
+    def test_nemo_walk_missing_top(self, MockConnection):
+        channel = FakeChannel(b"", stderr=b"find: '/missing': No such file or directory\n", status=1)
+        MockConnection().create_session.return_value = channel
+
+        nemo = Nemo(host="login.nemo.thecrick.org", user="user", password="password")
+
+        assert_that(lambda: list(nemo.walk("/missing"))).raises(RuntimeError).when_called_with().contains("No such file or directory")
+        assert_that(channel.closed).is_true()
+
+    @patch("asf_tools.ssh.nemo.Connection")
+    def test_nemo_walk_unreadable_subdirectory(self, MockConnection, caplog):
+        records = [("d", "/data"), ("d", "/data/run1"), ("d", "/data/run1/tmp"), ("f", "/data/run1/a.txt"), ("d", "/data/run2")]
+        output = b"".join(f"{kind}\x000\x000.0\x00{path}\x00\x00".encode() for kind, path in records)
+        stderr = b"find: '/data/run1/tmp': Permission denied\nfind: '/data/run1/gone.txt': No such file or directory\n"
+        MockConnection().create_session.return_value = FakeChannel(output, stderr=stderr, status=1)
+
+        nemo = Nemo(host="login.nemo.thecrick.org", user="user", password="password")
+        result = list(nemo.walk("/data"))
+
+        assert_that(result).is_equal_to(
+            [
+                ("/data", ["run1", "run2"], []),
+                ("/data/run1", ["tmp"], ["a.txt"]),
+                ("/data/run1/tmp", [], []),
+                ("/data/run2", [], []),
+            ]
+        )
+        assert_that(caplog.text).contains("/data/run1/tmp': Permission denied", "/data/run1/gone.txt': No such file or directory")
+
+    @patch("asf_tools.ssh.nemo.Connection")
+    def test_nemo_walk_unreadable_top(self, MockConnection):
+        output = b"u\x000\x000.0\x00/data\x00\x00"
+        MockConnection().create_session.return_value = FakeChannel(output)
+
+        nemo = Nemo(host="login.nemo.thecrick.org", user="user", password="password")
+
+        assert_that(lambda: list(nemo.walk("/data"))).raises(RuntimeError).when_called_with().contains("cannot be read")
+
+    @patch("asf_tools.ssh.nemo.Connection")
+    def test_nemo_walk_symlinked_top(self, MockConnection, tmp_path):
+        os.makedirs(os.path.join(tmp_path, "data", "run1"))
+        with open(os.path.join(tmp_path, "data", "run1", "samplesheet.csv"), "w", encoding="UTF-8") as file:
+            file.write("id\n")
+        os.symlink(os.path.join(tmp_path, "data"), os.path.join(tmp_path, "link"))
+        MockConnection().create_session.return_value = FakeChannel()
+
+        nemo = Nemo(host="login.nemo.thecrick.org", user="user", password="password")
+        result = list(nemo.walk(os.path.join(tmp_path, "link")))
+
+        assert_that(result).is_equal_to(list(os.walk(os.path.join(tmp_path, "link"))))
+        assert_that(result).is_length(2)
+
     # def test_nemo_check_slurm_job_status(self):
     #     # Load key from file into memory
     #     with open("/Users/cheshic/.ssh/svc_asf", "r") as key_file:
@@ -0,0 +1,188 @@
+"""
+Tests for the Nemo connection pool.
+"""
+
+# pylint: disable=missing-function-docstring,missing-class-docstring,invalid-name
+
+import threading
+from unittest.mock import MagicMock, patch
+
+import paramiko
+import pytest
+from assertpy import assert_that
+
+from asf_tools.io.storage_interface import InterfaceType, StorageInterface
+from asf_tools.ssh.nemo_pool import NemoPool
+
+
+@pytest.fixture(name="MockConnection")
+def fixture_mock_connection():
+    with patch("asf_tools.ssh.nemo.Connection") as MockConnection:
+        MockConnection.side_effect = lambda **kwargs: MagicMock()
+        yield MockConnection
+
+
+class TestNemoPool:
+
+    def test_nemo_pool_invalid(self, MockConnection):  # pylint: disable=unused-argument
+        assert_that(NemoPool).raises(ValueError).when_called_with(0, host="login.nemo.thecrick.org", user="user", password="password")
+        assert_that(NemoPool).raises(ValueError).when_called_with(2, host="login.nemo.thecrick.org", user="user")
+
+    def test_nemo_pool_reuses_connections(self, MockConnection):
+        pool = NemoPool(2, host="login.nemo.thecrick.org", user="user", password="password")
+
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            pass
+
+        assert_that(second).is_same_as(first)
+        assert_that(MockConnection.call_count).is_equal_to(1)
+
+    def test_nemo_pool_concurrent_connections(self, MockConnection):
+        pool = NemoPool(3, host="login.nemo.thecrick.org", user="user", password="password")
+        barrier = threading.Barrier(3, timeout=5)
+
+        def check(nemo, item):
+            barrier.wait()
+            return nemo, item
+
+        results = pool.map(check, ["run01", "run02", "run03"])
+
+        assert_that([item for _, item in results]).is_equal_to(["run01", "run02", "run03"])
+        assert_that({id(nemo) for nemo, _ in results}).is_length(3)
+        assert_that(MockConnection.call_count).is_equal_to(3)
+        assert_that(pool.open_count).is_equal_to(3)
+
+    def test_nemo_pool_waits_for_release(self, MockConnection):  # pylint: disable=unused-argument
+        pool = NemoPool(1, host="login.nemo.thecrick.org", user="user", password="password")
+        first = pool.acquire()
+        acquired = []
+
+        thread = threading.Thread(target=lambda: acquired.append(pool.acquire()))
+        thread.start()
+        thread.join(0.1)
+        waiting = thread.is_alive()
+        pool.release(first)
+        thread.join(5)
+
+        assert_that(waiting).is_true()
+        assert_that(acquired).is_equal_to([first])
+
+    def test_nemo_pool_health_check(self, MockConnection, clock):  # pylint: disable=unused-argument
+        pool = NemoPool(2, health_check_interval=30, host="login.nemo.thecrick.org", user="user", password="password")
+        stale = pool.acquire()
+        stale.connection.transport.is_active.return_value = False
+        stale_connection = stale.connection
+        pool.release(stale)
+
+        recent = pool.acquire()
+        pool.release(recent)
+        clock.now += 60
+        replaced = pool.acquire()
+
+        assert_that(recent).is_same_as(stale)
+        assert_that(replaced).is_not_same_as(stale)
+        stale_connection.close.assert_called_once()
+        assert_that(pool.open_count).is_equal_to(1)
+
+    def test_nemo_pool_reconnect_on_failure(self, MockConnection):  # pylint: disable=unused-argument
+        pool = NemoPool(2, host="login.nemo.thecrick.org", user="user", password="password", use_sftp=False)
+        broken = pool.acquire()
+        broken.connection.run.side_effect = paramiko.SSHException("Connection reset")
+        broken_connection = broken.connection
+        pool.release(broken)
+
+        result = pool.exists("/data/run01")
+
+        assert_that(result).is_true()
+        broken_connection.close.assert_called_once()
+        assert_that(pool.open_count).is_equal_to(1)
+
+    def test_nemo_pool_run_command_not_retried(self, MockConnection):  # pylint: disable=unused-argument
+        pool = NemoPool(2, host="login.nemo.thecrick.org", user="user", password="password")
+        broken = pool.acquire()
+        broken.connection.run.side_effect = paramiko.SSHException("Connection reset")
+        pool.release(broken)
+
+        assert_that(pool.run_command).raises(paramiko.SSHException).when_called_with("sbatch run_script.sh")
+        assert_that(pool.open_count).is_equal_to(0)
+
+    def test_nemo_pool_idle_timeout(self, MockConnection, clock):  # pylint: disable=unused-argument
+        pool = NemoPool(2, idle_timeout=300, host="login.nemo.thecrick.org", user="user", password="password")
+        first = pool.acquire()
+        first_connection = first.connection
+        pool.release(first)
+
+        clock.now += 301
+        second = pool.acquire()
+
+        assert_that(second).is_not_same_as(first)
+        first_connection.close.assert_called_once()
+        assert_that(pool.open_count).is_equal_to(1)
+
+    def test_nemo_pool_walk_holds_connection(self, MockConnection):  # pylint: disable=unused-argument
+        pool = NemoPool(1, host="login.nemo.thecrick.org", user="user", password="password")
+        nemo = pool.acquire()
+        nemo.connection.create_session.return_value.recv.side_effect = [b"d\x000\x000.0\x00/data\x00\x00", b""]
+        nemo.connection.create_session.return_value.recv_stderr_ready.return_value = False
+        nemo.connection.create_session.return_value.recv_exit_status.return_value = 0
+        pool.release(nemo)
+
+        walk = pool.walk("/data")
+        result = next(walk)
+        in_use = not pool.idle
+        walk.close()
+
+        assert_that(result).is_equal_to(("/data", [], []))
+        assert_that(in_use).is_true()
+        assert_that(pool.idle).is_length(1)
+
+    def test_nemo_pool_disconnect(self, MockConnection):  # pylint: disable=unused-argument
+        pool = NemoPool(2, host="login.nemo.thecrick.org", user="user", password="password")
+        idle = pool.acquire()
+        in_use = pool.acquire()
+        connections = [idle.connection, in_use.connection]
+        pool.release(idle)
+
+        pool.disconnect()
+        pool.release(in_use)
+
+        connections[0].close.assert_called_once()
+        connections[1].close.assert_called_once()
+        assert_that(pool.open_count).is_equal_to(0)
+        assert_that(pool.acquire).raises(RuntimeError).when_called_with()
+
+    def test_nemo_pool_storage_interface(self, MockConnection):  # pylint: disable=unused-argument
+        storage_interface = StorageInterface(InterfaceType.NEMO, pool_size=4, host="login.nemo.thecrick.org", user="user", password="password")
+
+        assert_that(storage_interface.interface).is_instance_of(NemoPool)
+        assert_that(storage_interface.exists("/data/run01")).is_true()
+
+    def test_nemo_pool_static_helpers_take_no_connection(self, MockConnection):  # pylint: disable=unused-argument
+        pool = NemoPool(1, host="login.nemo.thecrick.org", user="user", password="password")
+        held = pool.acquire()
+
+        command = pool.batch_command("make_dirs", "/data/run 01")
+
+        assert_that(command).is_equal_to("mkdir -p '/data/run 01'")
+        assert_that(pool.idle).is_empty()
+        assert_that(pool.open_count).is_equal_to(1)
+        assert_that(hasattr(pool, "sftp")).is_false()
+        pool.release(held)
+
+    def test_nemo_pool_acquire_timeout(self, MockConnection):
+        pool = NemoPool(1, acquire_timeout=0.1, host="login.nemo.thecrick.org", user="user", password="password")
+        nemo = pool.acquire()
+        nemo.connection.create_session.return_value.recv.side_effect = [b"d\x000\x000.0\x00/data\x00\x00", b""]
+        nemo.connection.create_session.return_value.recv_stderr_ready.return_value = False
+        nemo.connection.create_session.return_value.recv_exit_status.return_value = 0
+        pool.release(nemo)
+
+        def nested():
+            for root, _, _ in pool.walk("/data"):
+                pool.exists(root)
+
+        assert_that(nested).raises(TimeoutError).when_called_with()
+        assert_that(pool.idle).is_length(1)
+        assert_that(MockConnection.call_count).is_equal_to(1)
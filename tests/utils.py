@@ -5,7 +5,18 @@ Helper functions for tests
 """
 
 import functools
+import os
+import subprocess
 import tempfile
+from collections import Counter
+from unittest.mock import MagicMock, Mock
+
+import requests
+
+from asf_tools.api.clarity.clarity_lims import ClarityLims
+
+
+CLARITY_MOCK_XML = "tests/data/api/clarity/mock_xml"
 
 
 def with_temporary_folder(func):
@@ -35,3 +46,77 @@ def with_temporary_file(func):
             return func(*args, tmpfile, **kwargs)
 
     return wrapper
+
+
+def run_command_locally(command, in_stream=None, **kwargs):  # pylint: disable=unused-argument
+    """
+    Stand in for a fabric Connection.run that runs the command in a local shell,
+    returning a result with the stdout, stderr and exit code of the command
+    """
+    stdin = in_stream.read() if in_stream is not None else None
+    result = subprocess.run(command, shell=True, input=stdin, capture_output=True, text=True, check=False)
+    return MagicMock(stdout=result.stdout, stderr=result.stderr, exited=result.returncode)
+
+
+def read_mock_xml(name):
+    """
+    Read a Clarity XML fixture from the mock_xml test data
+    """
+    with open(os.path.join(CLARITY_MOCK_XML, name), "r", encoding="utf-8") as file:
+        return file.read()
+
+
+class FakeClarity:
+    """
+    Stand in for ClarityLims.get_with_uri that serves the named mock XML fixtures and counts the
+    requests made for each URI and set of query parameters. Subclasses override respond to serve
+    other content.
+    """
+
+    def __init__(self, fixtures):
+        self.requests = Counter()
+        self.fixtures = {name: read_mock_xml(f"{name}.xml") for name in fixtures}
+
+    def attach(self, api):
+        """
+        Route the requests of a client to the fake and keep the fake on the client as api.fake
+        """
+        api.get_with_uri = self.get_with_uri
+        api.fake = self
+        return api
+
+    def get_with_uri(self, uri, params=None, accept_status_codes=[200]):  # pylint: disable=unused-argument,dangerous-default-value
+        """
+        Count the request and return the content respond gives for its endpoint, id and parameters
+        """
+        self.requests[(uri, tuple(sorted((params or {}).items())))] += 1
+        endpoint, _, item_id = uri.split("/api/v2/")[1].partition("/")
+        return self.respond(endpoint, item_id, params or {})
+
+    def respond(self, endpoint, item_id, params):  # pylint: disable=unused-argument
+        """
+        Get the content of a request, by default the fixture named after the singular of the endpoint
+        """
+        return self.fixtures[endpoint[:-1]]
+
+
+def make_response(content, status_code=200):
+    """
+    Mock requests.Response with the given content and status code
+    """
+    response = Mock(spec=requests.Response)
+    response.status_code = status_code
+    response.content = content
+    return response
+
+
+def make_labs_api(labs_xml, lab_xml, baseuri="https://localhost:8080", **kwargs):
+    """
+    ClarityLims with a mocked session that answers a GET of the labs list with labs_xml, any other GET
+    with lab_xml and every POST with an empty document. Keyword arguments are passed to ClarityLims.
+    """
+    api = ClarityLims(baseuri=baseuri, username="test", password="test", **kwargs)
+    api.request_session = Mock()
+    api.request_session.get.side_effect = lambda uri, **_: make_response(labs_xml if uri.endswith("/labs") else lab_xml)
+    api.request_session.post.side_effect = lambda uri, **_: make_response(b"<ok/>")
+    return api